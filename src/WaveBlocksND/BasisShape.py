@@ -7,15 +7,29 @@ This file contains the abstract class for representing basis shapes.
 @license: Modified BSD License
 """
 
+from numpy import zeros, array, asarray, ndarray, vstack, eye, int32, integer, issubdtype
+
+from LRUCache import LRUCache
+from Utils import multi_index_lookup_table, multi_index_lookup
+
 __all__ = ["BasisShape"]
 
 
+# The process-wide cache of set operations, keyed by the basis shape hashes
+_set_operations = LRUCache(maxsize=64)
+
+
 class BasisShape(object):
     r"""This class defines the abstract interface to basis shapes.
     A basis shape is essentially all information and operations
     related to the set :math:`\mathfrak{K}` of multi-indices :math:`k`.
 
     Basis shapes must be immutable objects.
+
+    All multi-indices :math:`k \in \mathfrak{K}` are stored in a compact
+    integer table where row :math:`\mu(k)` contains :math:`k`. The linear
+    order :math:`\mu` is the lexicographical one. Look ups of whole arrays
+    of multi-indices are vectorized.
     """
 
     def __init__(self):
@@ -43,35 +57,234 @@ class BasisShape(object):
         raise NotImplementedError("No custom hash function defined.")
 
 
+    def __getitem__(self, k):
+        r"""Make map look ups.
+
+        :param k: Either a multi-index :math:`k` given as tuple or list, a linear index
+                  :math:`\mu` given as integer, an integer ndarray of shape :math:`(M, D)`
+                  containing many multi-indices or an integer ndarray of shape :math:`(M,)`
+                  containing many linear indices.
+        :return: The linear index :math:`\mu(k)` or the multi-index :math:`k`. In the
+                 vectorized cases an ndarray with :math:`\mu(k)` or ``-1`` if :math:`k`
+                 is not part of the shape respectively an ndarray of shape :math:`(M, D)`.
+        """
+        if isinstance(k, ndarray):
+            if k.ndim == 2:
+                return self.find(k)
+            elif k.ndim == 1 and issubdtype(k.dtype, integer):
+                return self._indices[k,:]
+        elif type(k) is tuple or type(k) is list:
+            k = tuple(k)
+            assert len(k) == self._dimension
+            mu = self.find(array([k]))[0]
+            if mu >= 0:
+                return int(mu)
+            return None
+        elif isinstance(k, (int, integer)):
+            if 0 <= k < self._basissize:
+                return tuple(self._indices[k,:].tolist())
+            return None
+        raise IndexError("Wrong index type")
+
+
     def __contains__(self, k):
         r"""
         Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
 
-        :raise: :py:class:`NotImplementedError` Abstract interface.
+        :param k: The multi-index :math:`k` we want to test.
+        :type k: tuple
         """
-        raise NotImplementedError("'BasisShape' is an abstract interface.")
+        assert len(tuple(k)) == self._dimension
+        return bool(self.find(array([tuple(k)]))[0] >= 0)
 
 
     def __iter__(self):
-        r"""Implements iteration over the multi-indices :math:`k` of the non-extended
-        basis set :math:`\mathfrak{K}`.
+        r"""Implements iteration over the multi-indices :math:`k`
+        of the basis set :math:`\mathfrak{K}` in linear order.
 
-        :raise: :py:class:`NotImplementedError` Abstract interface.
+        If you need a special iteration scheme, use :py:meth:`get_node_iterator`.
         """
-        raise NotImplementedError("'BasisShape' is an abstract interface.")
+        return ( tuple(k) for k in self._indices.tolist() )
 
 
     def contains(self, k):
         r"""
         Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
 
-        :param k: The multi-index we want to test.
+        :param k: The multi-index we want to test or an integer ndarray
+                  of shape :math:`(M, D)` containing many multi-indices.
         :type k: tuple
-        :raise: :py:class:`NotImplementedError` Abstract interface.
+        :return: A boolean or in the vectorized case a boolean ndarray of shape :math:`(M,)`.
         """
+        if isinstance(k, ndarray) and k.ndim == 2:
+            return self.find(k) >= 0
         return k in self
 
 
+    def _set_index_table(self, indices):
+        r"""Store the table of all multi-indices :math:`k \in \mathfrak{K}`
+        and build the data structures for fast look ups.
+
+        :param indices: The multi-indices in linear order.
+        :type indices: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)`.
+        """
+        self._indices = array(indices, dtype=int32).reshape(-1, self._dimension)
+        self._indices.flags.writeable = False
+
+        # The basis size
+        self._basissize = self._indices.shape[0]
+
+        self._build_lookup()
+
+        # The neighbour tables are built on first use
+        self._neighbour_tables = None
+
+
+    def _build_lookup(self):
+        r"""Build the data structure used by :py:meth:`find`.
+        """
+        self._lookup = multi_index_lookup_table(self._indices)
+
+
+    def find(self, indices):
+        r"""Look up the linear indices :math:`\mu(k)` of many multi-indices at once.
+
+        :param indices: The multi-indices :math:`k` to look up.
+        :type indices: An integer ndarray of shape :math:`(M, D)`.
+        :return: An integer ndarray of shape :math:`(M,)` containing :math:`\mu(k)`
+                 or ``-1`` if :math:`k` is not part of the basis shape.
+        """
+        indices = asarray(indices, dtype=integer).reshape(-1, self._dimension)
+        return multi_index_lookup(self._lookup, indices)
+
+
+    def get_index_table(self):
+        r"""Return all multi-indices :math:`k \in \mathfrak{K}` as a read-only table.
+
+        :return: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)` where row
+                 :math:`\mu(k)` contains the multi-index :math:`k`.
+        """
+        return self._indices
+
+
+    def get_neighbour_table(self, selection=None):
+        r"""Return the linear indices of all direct neighbours :math:`k \pm e_d` of all
+        multi-indices :math:`k \in \mathfrak{K}`. The tables are computed only once.
+
+        :param selection: Whether to return the ``forward`` or ``backward`` neighbours.
+                          The values ``all`` and ``None`` (default) return both tables.
+        :type selection: string
+        :return: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)` where entry :math:`(\mu(k), d)`
+                 is :math:`\mu(k \pm e_d)` or ``-1`` if this multi-index is not part of the shape.
+                 Both tables are returned as a tuple ``(forward, backward)`` if requested.
+        """
+        if self._neighbour_tables is None:
+            D = self._dimension
+            I = eye(D, dtype=integer)
+
+            forward = zeros((self._basissize, D), dtype=integer)
+            backward = zeros((self._basissize, D), dtype=integer)
+
+            for d in xrange(D):
+                forward[:,d] = self.find(self._indices + I[d,:])
+                backward[:,d] = self.find(self._indices - I[d,:])
+
+            forward.flags.writeable = False
+            backward.flags.writeable = False
+            self._neighbour_tables = (forward, backward)
+
+        if selection == "forward":
+            return self._neighbour_tables[0]
+        elif selection == "backward":
+            return self._neighbour_tables[1]
+        elif selection in ("all", None):
+            return self._neighbour_tables
+        else:
+            raise ValueError("Unknown neighbour selection: "+str(selection))
+
+
+    def union(self, other):
+        r"""Compute the union :math:`\mathfrak{K} \cup \mathfrak{K}^\prime` of two basis shapes.
+
+        :param other: The basis shape :math:`\mathfrak{K}^\prime`.
+        :return: The new basis shape and two integer ndarrays containing the linear indices
+                 of all :math:`k \in \mathfrak{K}` respectively :math:`k \in \mathfrak{K}^\prime`
+                 within the new shape.
+        """
+        return self._get_set_operation("union", other)
+
+
+    def intersection(self, other):
+        r"""Compute the intersection :math:`\mathfrak{K} \cap \mathfrak{K}^\prime` of two basis shapes.
+
+        :param other: The basis shape :math:`\mathfrak{K}^\prime`.
+        :return: The new basis shape and two integer ndarrays containing the linear indices
+                 within :math:`\mathfrak{K}` respectively :math:`\mathfrak{K}^\prime` of all
+                 multi-indices of the new shape.
+        """
+        return self._get_set_operation("intersection", other)
+
+
+    def difference(self, other):
+        r"""Compute the difference :math:`\mathfrak{K} \setminus \mathfrak{K}^\prime` of two basis shapes.
+
+        :param other: The basis shape :math:`\mathfrak{K}^\prime`.
+        :return: The new basis shape and an integer ndarray containing the linear indices
+                 within :math:`\mathfrak{K}` of all multi-indices of the new shape.
+        """
+        return self._get_set_operation("difference", other)
+
+
+    def _get_set_operation(self, operation, other):
+        r"""Look up the result of a set operation in the cache or compute it.
+        If the resulting set equals one of the operands, this shape is returned.
+        """
+        if not self._dimension == other.get_dimension():
+            raise ValueError("Basis shapes of different dimensions.")
+
+        key = (operation, hash(self), hash(other))
+        result = _set_operations.get(key)
+
+        if result is None:
+            from SupportShape import SupportShape
+            D = self._dimension
+            mu = other.find(self._indices)
+
+            if operation == "union":
+                # Multi-indices only part of the other shape
+                new = other.get_index_table()[self.find(other.get_index_table()) < 0,:]
+                if new.shape[0] == 0:
+                    shape = self
+                elif (mu >= 0).all():
+                    shape = other
+                else:
+                    shape = SupportShape(D, vstack([self._indices, new]))
+                result = (shape, shape.find(self._indices), shape.find(other.get_index_table()))
+
+            elif operation == "intersection":
+                if (mu >= 0).all():
+                    shape = self
+                elif (mu >= 0).sum() == other.get_basis_size():
+                    shape = other
+                else:
+                    shape = SupportShape(D, self._indices[mu >= 0,:])
+                result = (shape, self.find(shape.get_index_table()), other.find(shape.get_index_table()))
+
+            elif operation == "difference":
+                if (mu < 0).all():
+                    shape = self
+                else:
+                    shape = SupportShape(D, self._indices[mu < 0,:])
+                result = (shape, self.find(shape.get_index_table()))
+
+            else:
+                raise ValueError("Unknown set operation: "+str(operation))
+
+            _set_operations.put(key, result)
+
+        return result
+
+
     def get_dimension(self):
         r"""
         Returns the dimension :math:`D` of the basis shape :math:`\mathfrak{K}`.
@@ -121,18 +334,57 @@ class BasisShape(object):
         raise NotImplementedError("'BasisShape' is an abstract interface.")
 
 
-    def get_neighbours(self, k, direction=None):
+    def get_neighbours(self, k, selection=None, direction=None):
         r"""
         Returns a list of all multi-indices that are neighbours of a given
-        multi-index :math:`k`. A direct neighbours is defines as
+        multi-index :math:`k`. A direct neighbour is defined as
         :math:`(k_0, \ldots, k_d \pm 1, \ldots, k_{D-1}) \forall d \in [0 \ldots D-1]`.
 
-        :param k: The multi-index of which we want to get the neighbours.
+        :param k: The multi-index of which we want to get the neighbours or an
+                  integer ndarray of shape :math:`(M, D)` containing many multi-indices.
         :type k: tuple
+        :param selection:
+        :type selection: string with fixed values ``forward``, ``backward`` or ``all``.
+                         The values ``all`` is equivalent to the value ``None`` (default).
         :param direction: The direction :math:`0 \leq d < D` in which we want to find
                           the neighbours :math:`k \pm e_d`.
         :type direction: int
-        :return: A list containing the pairs :math:`(d, k^\prime)`.
-        :raise: :py:class:`NotImplementedError` Abstract interface.
+        :return: A list containing the pairs :math:`(d, k^\prime)`. In the vectorized
+                 case a list of pairs :math:`(d, \mu(k^\prime))` where the integer
+                 ndarrays contain ``-1`` if :math:`k^\prime` is not part of the shape.
         """
-        raise NotImplementedError("'BasisShape' is an abstract interface.")
+        vectorized = isinstance(k, ndarray) and k.ndim == 2
+
+        if vectorized:
+            ki = asarray(k, dtype=integer)
+        else:
+            assert len(tuple(k)) == self._dimension
+            ki = array([tuple(k)], dtype=integer)
+
+        I = eye(self._dimension, dtype=integer)
+
+        if direction is not None:
+            directions = [ direction ]
+        else:
+            directions = xrange(self._dimension)
+
+        # All potential backward and forward neighbours
+        candidates = []
+        for d in directions:
+            if selection in ("backward", "all", None):
+                candidates.append((d, ki - I[d,:]))
+            if selection in ("forward", "all", None):
+                candidates.append((d, ki + I[d,:]))
+
+        if len(candidates) == 0:
+            return []
+
+        M = ki.shape[0]
+        mu = self.find(array([ c for d, c in candidates ]).reshape(-1, self._dimension))
+        mu = mu.reshape(-1, M)
+
+        if vectorized:
+            return [ (d, mu[i,:]) for i, (d, c) in enumerate(candidates) ]
+
+        # Keep only the valid ones
+        return [ (d, tuple(c[0,:].tolist())) for i, (d, c) in enumerate(candidates) if mu[i,0] >= 0 ]
@@ -0,0 +1,85 @@
+"""The WaveBlocks Project
+
+This file contains a class for adapting the basis shapes of
+Hagedorn wavepackets to the support of their coefficients.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import zeros, eye, vstack, prod, abs, integer
+
+from BlockFactory import BlockFactory
+
+__all__ = ["BasisShapeAdaptor"]
+
+
+class BasisShapeAdaptor(object):
+    r"""This class adapts the basis shapes :math:`\mathfrak{K}_i` of the components
+    :math:`\Phi_i` of a Hagedorn wavepacket :math:`\Psi` to the coefficients :math:`c^i`.
+    The new shape is the smallest limited hyperbolic cut shape which contains all
+    multi-indices :math:`k` with :math:`|c^i_k| > \text{tol}` together with a safety margin
+    of :math:`m` forward neighbours :math:`k + j e_d, 1 \leq j \leq m` in every direction.
+    Depending on the coefficients this prunes or grows the basis shapes.
+    """
+
+    def __init__(self, tolerance=1e-12, margin=2):
+        r"""
+        :param tolerance: The threshold :math:`\text{tol}` below which coefficients are negligible.
+        :param margin: The number :math:`m` of neighbours kept beyond the support.
+        """
+        self._tolerance = tolerance
+        self._margin = margin
+
+
+    def compute_basis_shape(self, basis_shape, coefficients):
+        r"""Compute the adapted basis shape for a single component.
+
+        :param basis_shape: The current basis shape :math:`\mathfrak{K}`.
+        :param coefficients: The coefficients :math:`c` ordered like :math:`\mathfrak{K}`.
+        :type coefficients: An ndarray of shape :math:`(|\mathfrak{K}|, 1)`.
+        :return: The new basis shape :math:`\mathfrak{K}^\prime`.
+        """
+        D = basis_shape.get_dimension()
+        indices = basis_shape.get_index_table()
+
+        support = indices[abs(coefficients[:,0]) > self._tolerance,:]
+
+        # Keep at least the ground state phi_0
+        if support.shape[0] == 0:
+            support = zeros((1,D), dtype=integer)
+
+        # Add the safety margin of neighbours in all directions
+        I = eye(D, dtype=integer)
+        extended = vstack([support] + [ support + j*I[d,:] for d in xrange(D) for j in xrange(1, self._margin+1) ])
+
+        sparsity = int(prod(1 + extended, axis=1).max())
+        limits = tuple((extended.max(axis=0) + 1).tolist())
+
+        return BlockFactory().create_basis_shape({"type": "LimitedHyperbolicCutShape",
+                                                  "dimension": D,
+                                                  "K": sparsity,
+                                                  "limits": limits})
+
+
+    def adapt(self, packet):
+        r"""Adapt the basis shapes of all components :math:`\Phi_i` of a wavepacket
+        in-place. Coefficients outside of the new shapes are dropped.
+
+        :param packet: The wavepacket :math:`\Psi`.
+        :type packet: A :py:class:`HagedornWavepacketBase` subclass instance.
+        :return: A list of tuples :math:`(i, \mathfrak{K}_i, \mathfrak{K}^\prime_i)` for
+                 all components whose basis shapes changed.
+        """
+        events = []
+
+        for component in xrange(packet.get_number_components()):
+            old_shape = packet.get_basis_shapes(component=component)
+            new_shape = self.compute_basis_shape(old_shape, packet.get_coefficients(component=component, copy=False))
+
+            if not hash(new_shape) == hash(old_shape):
+                packet.set_basis_shapes(new_shape, component=component)
+                events.append((component, old_shape, new_shape))
+
+        return events
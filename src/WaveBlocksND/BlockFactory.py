@@ -8,10 +8,21 @@ This file contains a the block factory.
 """
 
 from copy import deepcopy
+from numpy import ndarray
+
+from LRUCache import LRUCache
+import GlobalDefaults as GD
 
 __all__ = ["BlockFactory"]
 
 
+# The process-wide registry of shared basis shape instances
+_basis_shapes = LRUCache(maxsize=GD.basis_shape_cache_size)
+
+# The process-wide registry of shared quadrature rule instances
+_quadrature_rules = LRUCache(maxsize=GD.quadrature_rule_cache_size)
+
+
 class BlockFactory(object):
     """A factory to create instances of various classes
     based on a simple description ``dict``.
@@ -35,6 +46,21 @@ class BlockFactory(object):
 
 
     def create_basis_shape(self, description):
+        r"""Create a basis shape from its description. Basis shapes are immutable,
+        hence identical shapes are created only once and then shared through a
+        process-wide registry bounded by the total size of their index tables.
+        """
+        key = self._get_description_key(description)
+        BS = _basis_shapes.get(key)
+
+        if BS is None:
+            BS = self._create_basis_shape(description)
+            _basis_shapes.put(key, BS, size=BS.get_basis_size()*BS.get_dimension())
+
+        return BS
+
+
+    def _create_basis_shape(self, description):
         try:
             bs_type = description["type"]
         except:
@@ -52,12 +78,52 @@ class BlockFactory(object):
             D = description["dimension"]
             BS = HyperbolicCutShape(D, K)
 
+        elif bs_type == "LimitedHyperbolicCutShape":
+            from LimitedHyperbolicCutShape import LimitedHyperbolicCutShape
+            K = description["K"]
+            D = description["dimension"]
+            limits = description["limits"]
+            BS = LimitedHyperbolicCutShape(D, K, limits)
+
+        elif bs_type == "SupportShape":
+            from SupportShape import SupportShape
+            D = description["dimension"]
+            indices = description["indices"]
+            BS = SupportShape(D, indices)
+
         else:
             raise ValueError("Unknown basis shape type "+str(bs_type))
 
         return BS
 
 
+    def _get_description_key(self, description):
+        r"""Turn a description ``dict`` into a hashable key.
+        """
+        def freeze(value):
+            if isinstance(value, (list, tuple, ndarray)):
+                return tuple([ freeze(item) for item in value ])
+            if isinstance(value, dict):
+                return tuple([ (name, freeze(item)) for name, item in sorted(value.items()) ])
+            return value
+
+        return freeze(description)
+
+
+    def get_basis_shape_cache(self):
+        r""":return: The :py:class:`LRUCache` sharing the basis shapes between all users.
+                 Use it to inspect the usage statistics or to change the bound.
+        """
+        return _basis_shapes
+
+
+    def get_quadrature_rule_cache(self):
+        r""":return: The :py:class:`LRUCache` sharing the quadrature rules between all users.
+                 Use it to inspect the usage statistics or to change the bound.
+        """
+        return _quadrature_rules
+
+
     def create_wavepacket(self, description):
 
         wp_type = description["type"]
@@ -177,6 +243,11 @@ class BlockFactory(object):
             QR = self.create_quadrature_rule(description["qr"])
             QE = DirectHomogeneousQuadrature(QR)
 
+        elif qe_type == "SumFactorizedQuadrature":
+            from SumFactorizedQuadrature import SumFactorizedQuadrature
+            QR = self.create_quadrature_rule(description["qr"])
+            QE = SumFactorizedQuadrature(QR)
+
         elif qe_type == "DirectInhomogeneousQuadrature":
             from DirectInhomogeneousQuadrature import DirectInhomogeneousQuadrature
             QR = self.create_quadrature_rule(description["qr"])
@@ -191,6 +262,10 @@ class BlockFactory(object):
             from SymbolicIntegral import SymbolicIntegral
             QE = SymbolicIntegral()
 
+        elif qe_type == "RecursiveIntegral":
+            from RecursiveIntegral import RecursiveIntegral
+            QE = RecursiveIntegral()
+
         else:
             raise ValueError("Unknown quadrature type "+str(qe_type))
 
@@ -198,6 +273,24 @@ class BlockFactory(object):
 
 
     def create_quadrature_rule(self, description):
+        r"""Create a quadrature rule from its description. Identical rules are
+        created only once and then shared through a process-wide registry
+        bounded by the total size of their nodes. Shared rules are read-only:
+        their node and weight arrays are not writeable and all getters of
+        nodes, weights and options return copies.
+        """
+        key = self._get_description_key(description)
+        QR = _quadrature_rules.get(key)
+
+        if QR is None:
+            QR = self._create_quadrature_rule(description)
+            QR._set_read_only()
+            _quadrature_rules.put(key, QR, size=QR.get_number_nodes()*QR.get_dimension())
+
+        return QR
+
+
+    def _create_quadrature_rule(self, description):
         qr_type = description["type"]
 
         if description.has_key("options"):
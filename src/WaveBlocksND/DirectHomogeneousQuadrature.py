@@ -9,7 +9,7 @@ Here we handle the homogeneous case.
 @license: Modified BSD License
 """
 
-from numpy import zeros, ones, squeeze, conjugate, dot, einsum
+from numpy import zeros, ones, squeeze, conjugate, dot, imag, vstack, ix_, complexfloating
 from scipy.linalg import sqrtm, inv #, svd, diagsvd
 
 from DirectQuadrature import DirectQuadrature
@@ -103,19 +103,34 @@ class DirectHomogeneousQuadrature(DirectQuadrature):
         :param cols: A list of all :math:`j` with :math:`0 \leq j \leq N`
                      selecting the :math:`\Phi_j` for which we precompute values.
         """
-        # Evaluate only the bases we need
+        # Evaluate only the bases we need. All components share the same parameter set,
+        # hence we evaluate the basis functions once over the union of their basis shapes.
         N  = self._packet.get_number_components()
         bases = [ None for n in xrange(N) ]
 
-        for row in rows:
-            if bases[row] is None:
-                bases[row] = self._packet.evaluate_basis_at(self._nodes, component=row, prefactor=False)
+        components = sorted(set(rows) | set(cols))
+        shapes = self._packet.get_basis_shapes()
 
-        for col in cols:
-            if bases[col] is None:
-                bases[col] = self._packet.evaluate_basis_at(self._nodes, component=col, prefactor=False)
+        shape = shapes[components[0]]
+        for component in components[1:]:
+            shape = shape.union(shapes[component])[0]
+
+        phi = self._packet.evaluate_basis_at(self._nodes, component=components[0], prefactor=False, basis_shape=shape)
+
+        # The linear indices of each component basis shape within the union
+        indices = [ None for n in xrange(N) ]
+
+        for component in components:
+            if hash(shapes[component]) == hash(shape):
+                bases[component] = phi
+            else:
+                indices[component] = shape.union(shapes[component])[2]
+                bases[component] = phi[indices[component],:]
 
         self._bases = bases
+        self._phi = phi
+        self._indices = indices
+        self._components = components
 
         # Operator
         q, p, Q, P, S = self._packet.get_parameters()
@@ -127,6 +142,10 @@ class DirectHomogeneousQuadrature(DirectQuadrature):
         assert type(self._values) is tuple
         assert len(self._values) == N**2
 
+        # For diagonal operators all blocks are assembled at once
+        self._diagonal = not any([ self._values[r*N+c].any() for r in components for c in components if not r == c ])
+        self._blocks = None
+
         # Coefficients
         self._coeffs = self._packet.get_coefficients()
 
@@ -179,8 +198,47 @@ class DirectHomogeneousQuadrature(DirectQuadrature):
         D = self._packet.get_dimension()
         eps = self._packet.get_eps()
         N  = self._packet.get_number_components()
+
+        if self._diagonal is True and len(self._components) > 1:
+            if not row == col:
+                return zeros((self._bases[row].shape[0], self._bases[col].shape[0]), dtype=complexfloating)
+            if self._blocks is None:
+                self._blocks = self._assemble_diagonal_blocks()
+            return self._blocks[row]
+
         # Main part of the integrand
         factor = (eps**D * self._weights * self._values[row*N + col]).reshape((-1,))
         # Sum up matrices over all quadrature nodes
-        M = einsum("k,ik,jk", factor, conjugate(self._bases[row]), self._bases[col])
+        hermitian = (row == col and not imag(factor).any())
+        M = self.assemble_matrix(factor, self._bases[row], self._bases[col], hermitian=hermitian)
         return M
+
+
+    def _assemble_diagonal_blocks(self):
+        r"""Compute the diagonal blocks :math:`\langle \Phi_i | f_{i,i} | \Phi_i \rangle` of
+        a diagonal operator for all prepared components :math:`i` by a single matrix-matrix
+        product over the basis functions of the union of all basis shapes.
+
+        :return: A dict mapping the component :math:`i` to its block.
+        """
+        D = self._packet.get_dimension()
+        eps = self._packet.get_eps()
+        N  = self._packet.get_number_components()
+
+        phi = self._phi
+        cphi = conjugate(phi)
+        size = phi.shape[0]
+
+        # Stack the weighted 'bra' bases of all components
+        factors = [ (eps**D * self._weights * self._values[c*N + c]).reshape((-1,)) for c in self._components ]
+        M = dot(vstack([ cphi * factor for factor in factors ]), phi.T)
+
+        # Restrict each block to the basis shape of its component
+        blocks = {}
+        for i, c in enumerate(self._components):
+            Mc = M[i*size:(i+1)*size,:]
+            if self._indices[c] is not None:
+                Mc = Mc[ix_(self._indices[c], self._indices[c])]
+            blocks[c] = Mc
+
+        return blocks
@@ -9,7 +9,7 @@ Here we handle the inhomogeneous case.
 @license: Modified BSD License
 """
 
-from numpy import zeros, ones, squeeze, imag, conjugate, dot, ndarray, einsum
+from numpy import zeros, ones, squeeze, imag, conjugate, dot, ndarray
 from scipy import exp
 from scipy.linalg import sqrtm, inv, det
 
@@ -94,6 +94,7 @@ class DirectInhomogeneousQuadrature(DirectQuadrature):
             else:
                 self._operator = operator
         self._eval_at_once = eval_at_once
+        self.reset_operator_cache()
 
 
     def prepare(self, rows, cols):
@@ -106,6 +107,9 @@ class DirectInhomogeneousQuadrature(DirectQuadrature):
         :param cols: A list of all :math:`j` with :math:`0 \leq j \leq N`
                      selecting the :math:`\Phi^\prime_j` for which we precompute values.
         """
+        # The parameters may have changed since the last call
+        self.reset_operator_cache()
+
         # Coefficients
         self._coeffbra = self._pacbra.get_coefficients()
         self._coeffket = self._packet.get_coefficients()
@@ -177,7 +181,6 @@ class DirectInhomogeneousQuadrature(DirectQuadrature):
         :return: A complex valued matrix of shape :math:`|\mathfrak{K}_i| \times |\mathfrak{K}^\prime_j|`.
         """
         D = self._packet.get_dimension()
-        N = self._packet.get_number_components()
         eps = self._packet.get_eps()
         # Mix wavepacket parameters
         Pibra = self._pacbra.get_parameters(component=row)
@@ -187,19 +190,16 @@ class DirectInhomogeneousQuadrature(DirectQuadrature):
         nodes = self.transform_nodes(Pibra, Piket, eps)
         basisr = self._pacbra.evaluate_basis_at(nodes, component=row, prefactor=True)
         basisc = self._packet.evaluate_basis_at(nodes, component=col, prefactor=True)
-        # Operator should support the component notation for efficiency
-        if self._eval_at_once is True:
-            # TODO: Sure, this is inefficient, but we can not do better right now.
-            values = self._operator(nodes, Pimix[0])[row*N+col]
-        else:
-            values = self._operator(nodes, Pimix[0], entry=(row,col))
+        # Operator values, shared by all blocks with the same nodes
+        values = self.evaluate_operator(nodes, Pimix[0], row, col)
         # Recheck what we got
         assert type(values) is ndarray
         assert values.shape == (1,self._QR.get_number_nodes())
         # Main part of the integrand
         factor = (eps**D * values * self._weights * det(Pimix[1])).reshape((-1,))
         # Sum up matrices over all quadrature nodes
-        M = einsum("k,ik,jk", factor, conjugate(basisr), basisc)
+        hermitian = (self._pacbra is self._packet and row == col and not imag(factor).any())
+        M = self.assemble_matrix(factor, basisr, basisc, hermitian=hermitian)
         # Compute global phase difference
         phase = exp(1.0j/eps**2 * (Piket[4]-conjugate(Pibra[4])))
         return phase * M
@@ -8,7 +8,8 @@ and matrix elements by using standard quadrature rules.
 @license: Modified BSD License
 """
 
-from numpy import squeeze, transpose, conjugate, dot
+from numpy import squeeze, transpose, conjugate, dot, real, triu
+from scipy.linalg.blas import zher2k
 
 from Quadrature import Quadrature
 
@@ -28,6 +29,31 @@ class DirectQuadrature(Quadrature):
         raise NotImplementedError("'DirectQuadrature' is an abstract interface.")
 
 
+    def assemble_matrix(self, factor, basisr, basisc, hermitian=False):
+        r"""Sum up the matrices :math:`f(\gamma_k) \overline{\phi_i(\gamma_k)} \phi_j(\gamma_k)`
+        over all quadrature nodes :math:`\gamma_k`. The weighted 'bra' basis is formed
+        once and the sum is computed by a single matrix-matrix product.
+
+        :param factor: The integrand factors :math:`f(\gamma_k)` including the quadrature weights.
+        :type factor: An ndarray of shape :math:`(|\Gamma|,)`.
+        :param basisr: The 'bra' basis functions evaluated at the nodes.
+        :param basisc: The 'ket' basis functions evaluated at the nodes.
+        :param hermitian: Whether the result is Hermitian. In this case both bases have to be
+                          the same and the factors real. Only one triangle is computed then.
+        :type hermitian: Boolean, default is ``False``.
+        :return: A complex valued matrix of shape :math:`|\mathfrak{K}_i| \times |\mathfrak{K}_j|`.
+        """
+        cbasisr = conjugate(basisr)
+
+        if hermitian is True:
+            # Compute the upper triangle only, as a rank-2k update of the form
+            # 1/2 (f B^*) (B^*)^H + 1/2 (B^*) (f B^*)^H and mirror it afterwards
+            M = triu(zher2k(0.5, cbasisr * real(factor), cbasisr))
+            return M + conjugate(triu(M, 1).T)
+        else:
+            return dot(cbasisr * factor, basisc.T)
+
+
     def perform_quadrature(self, row, col):
         r"""Evaluates by numerical steepest descent the integral
         :math:`\langle \Phi_i | f | \Phi^\prime_j \rangle` for a polynomial
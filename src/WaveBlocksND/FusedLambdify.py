@@ -0,0 +1,80 @@
+"""The WaveBlocks Project
+
+This file contains code for compiling a whole set of symbolic
+expressions into a single numerical function which evaluates
+all of them at once and shares all common subexpressions.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from __future__ import division
+
+import sympy
+import numpy
+
+try:
+    from sympy.printing.lambdarepr import NumPyPrinter as Printer
+except ImportError:
+    from sympy.printing.lambdarepr import LambdaPrinter as Printer
+
+__all__ = ["lambdify_fused"]
+
+
+def lambdify_fused(variables, expressions, dtype=None):
+    r"""Turn the symbolic expressions :math:`f_0(x), \ldots, f_{M-1}(x)` into a single
+    numerical function. The common subexpressions get extracted by ``sympy.cse`` and
+    are evaluated only once per call. All results are written into one preallocated
+    array, constant expressions get broadcast over all nodes.
+
+    :param variables: The variables :math:`x` the expressions depend on. The order matters!
+    :type variables: A list of `Sympy` symbols.
+    :param expressions: The expressions :math:`f_i(x)` to evaluate.
+    :type expressions: A list of `Sympy` expressions or a `Sympy` matrix.
+    :param dtype: The data type of the output array. (Default is ``None`` which means
+                  to use a real type unless an expression contains complex numbers
+                  or the nodes are complex.)
+    :return: A function which takes one ndarray of nodes per variable and
+             returns an ndarray of shape :math:`(M, |\Gamma|)`.
+    """
+    expressions = [ sympy.sympify(expression) for expression in expressions ]
+    replacements, reduced = sympy.cse(expressions, symbols=sympy.numbered_symbols("_cse"))
+
+    # Collect the namespace lambdify sets up for each single expression
+    arguments = list(variables) + [ symbol for symbol, subexpression in replacements ]
+    namespace = {}
+    for expression in [ subexpression for symbol, subexpression in replacements ] + list(reduced):
+        namespace.update(sympy.lambdify(arguments, expression, "numpy").__globals__)
+
+    # Generate the source code of the fused kernel
+    printer = Printer()
+    signature = [ printer.doprint(variable) for variable in variables ] + ["_out"]
+    source = ["def _kernel(" + ", ".join(signature) + "):"]
+    for symbol, subexpression in replacements:
+        source.append("    " + printer.doprint(symbol) + " = " + printer.doprint(subexpression))
+    for index, expression in enumerate(reduced):
+        source.append("    _out[" + str(index) + ",:] = " + printer.doprint(expression))
+    source.append("    return _out")
+
+    exec compile("\n".join(source), "<lambdify_fused>", "exec", division.compiler_flag) in namespace
+    kernel = namespace["_kernel"]
+    size = len(reduced)
+
+    # Real nodes give real values unless an expression contains complex numbers
+    if dtype is None:
+        real = not any([ expression.has(sympy.I) or
+                         any([ not number.is_real for number in expression.atoms(sympy.Number) ])
+                         for expression in expressions ])
+        basetype = numpy.floating if real else numpy.complexfloating
+
+    def fused(*nodes):
+        nodes = [ numpy.reshape(node, -1) for node in nodes ]
+        n = max([1] + [ node.shape[0] for node in nodes ])
+        if dtype is None:
+            out = numpy.empty((size, n), dtype=numpy.result_type(basetype, *nodes))
+        else:
+            out = numpy.empty((size, n), dtype=dtype)
+        return kernel(*(nodes + [out]))
+
+    return fused
@@ -8,15 +8,26 @@ This file contains the class for Gauss-Hermite quadrature.
 """
 
 from copy import deepcopy
-from numpy import zeros, floating, real
-from scipy import pi, exp, sqrt
+from numpy import (zeros, ones, zeros_like, floating, real, array, arange, where,
+                   hstack, sort, floor, abs, log1p)
+from scipy import pi, exp, sqrt, sin, cos
 from scipy.special.orthogonal import h_roots
 
 from QuadratureRule import QuadratureRule
+from LRUCache import LRUCache
 
 __all__ = ["GaussHermiteQR"]
 
 
+# The nodes and weights computed so far, keyed by order and method
+_rules = LRUCache(maxsize=64)
+
+# The first zeros of the Airy function Ai
+_airy_zeros = array([-2.338107410459762, -4.087949444130970, -5.520559828095551, -6.786708090071759,
+                     -7.944133587120853, -9.022650853340980, -10.040174341558084, -11.008524303733262,
+                     -11.936015563236262, -12.828776752865757])
+
+
 class GaussHermiteQR(QuadratureRule):
     r"""This class implements a Gauss-Hermite quadrature rule.
     """
@@ -28,6 +39,12 @@ class GaussHermiteQR(QuadratureRule):
                       From theory we know that a Gauss quadrature rule
                       of order :math:`k` is exact for polynomials up to
                       degree :math:`2 k - 1`.
+        :param options: The option ``method`` selects how the nodes and weights are computed.
+                        The default ``"eigenvalue"`` uses the classical eigenvalue approach while
+                        ``"newton"`` refines asymptotic guesses by Newton's method. This takes time
+                        linear in the order and yields accurate weights also for orders of about
+                        1000 and above.
+                        Results are cached per order.
 
         :raise: :py:class:`ValueError` if the ``order`` is not 1 or above.
         """
@@ -44,20 +61,33 @@ class GaussHermiteQR(QuadratureRule):
         # Set the options
         self._options = options
 
-        nodes, weights = h_roots(self._order)
+        # The method used to compute the nodes and weights
+        if self["method"] is not None:
+            method = self["method"]
+        else:
+            method = "eigenvalue"
+
+        key = (self._order, method)
+        rule = _rules.get(key)
+
+        if rule is None:
+            if method == "eigenvalue":
+                rule = self._compute_rule_eigenvalue()
+            elif method == "newton":
+                rule = self._compute_rule_newton()
+            else:
+                raise ValueError("Unknown method '"+str(method)+"' for computing Gauss-Hermite rules.")
+            _rules.put(key, rule)
+
+        nodes, weights = rule
 
         # The number of nodes in this quadrature rule
         self._number_nodes = nodes.size
 
-        # We deal with real values only, but the array we get from h_roots is of complex dtype
-        h = self._hermite_recursion(real(nodes))[-1,:]
-        weights = 1.0/((h**2) * self._order)
-
         # The quadrature nodes \gamma.
         self._nodes = nodes.reshape((1,self._number_nodes))
         # The quadrature weights \omega.
-        self._weights = weights
-        self._weights = self._weights.reshape((1,self._number_nodes))
+        self._weights = weights.reshape((1,self._number_nodes))
 
 
     def __str__(self):
@@ -94,6 +124,165 @@ class GaussHermiteQR(QuadratureRule):
         return self._weights.copy()
 
 
+    def _compute_rule_eigenvalue(self):
+        r"""Compute the nodes and weights by the classical eigenvalue method.
+
+        :return: Two ndarrays containing the nodes and the weights.
+        """
+        nodes, weights = h_roots(self._order)
+
+        # We deal with real values only, but the array we get from h_roots is of complex dtype
+        h = self._hermite_recursion(real(nodes))[-1,:]
+        weights = 1.0/((h**2) * self._order)
+
+        return nodes, weights
+
+
+    def _compute_rule_newton(self, terms=30, maxiter=10):
+        r"""Compute the nodes and weights by refining asymptotic initial guesses
+        for the non-negative nodes with Newton's method. The Hermite function
+        :math:`h_n` is evaluated near each node by a local Taylor expansion obtained
+        from the differential equation :math:`h_n^{''} = (x^2 - 2n - 1) h_n`.
+        Sweeping from the origin to the largest node, each expansion is centered
+        at the previous node. (See A. Glaser, X. Liu and V. Rokhlin, *A fast
+        algorithm for the calculation of the roots of special functions*,
+        SIAM J. Sci. Comput., 29 (2007), pp. 1420-1438.) The cost per node is
+        constant, hence the whole rule takes :math:`\mathcal{O}(n)` operations.
+
+        :param terms: The highest power of the Taylor expansions.
+        :param maxiter: The maximal number of Newton iterations per node.
+        :return: Two ndarrays containing the nodes and the weights.
+        """
+        n = self._order
+
+        # The asymptotic expansions are not accurate for small orders
+        if n < 20:
+            return self._compute_rule_eigenvalue()
+
+        x = self._initial_guesses(n)
+        derivatives = zeros_like(x)
+
+        # Values at the origin from |h_{2m}(0)| = pi**(-1/4) sqrt((2m-1)!! / (2m)!!)
+        h0 = pi**(-0.25) * exp(0.5 * log1p(-0.5 / arange(1, n//2+1)).sum())
+        if n % 2 == 0:
+            x0, h, dh = 0.0, h0, 0.0
+            first = 0
+        else:
+            # The origin is a node and h_n^'(0) = sqrt(2n) h_{n-1}(0)
+            x0, h, dh = 0.0, 0.0, sqrt(2.0*n) * h0
+            derivatives[0] = dh
+            first = 1
+
+        for i in xrange(first, x.size):
+            c = self._taylor_coefficients(x0, h, dh, 2.0*n+1.0, terms)
+
+            t = x[i] - x0
+            for j in xrange(maxiter):
+                u, du = self._taylor_evaluate(c, t)
+                dt = u / du
+                t = t - dt
+                if abs(dt) <= 4e-16 * abs(x0 + t):
+                    break
+
+            h, dh = self._taylor_evaluate(c, t)
+            x0 = x0 + t
+            x[i] = x0
+            derivatives[i] = dh
+
+        # The weights 1 / (n h_{n-1}^2) where h_n^' = sqrt(2n) h_{n-1} at the nodes
+        weights = 2.0 / derivatives**2
+
+        # Mirror to the negative nodes
+        if n % 2 == 1:
+            nodes = hstack([-x[:0:-1], x])
+            weights = hstack([weights[:0:-1], weights])
+        else:
+            nodes = hstack([-x[::-1], x])
+            weights = hstack([weights[::-1], weights])
+
+        return nodes, weights
+
+
+    def _taylor_coefficients(self, x0, h, dh, lam, terms):
+        r"""Compute the Taylor coefficients :math:`c_k` of the solution :math:`u` of
+        :math:`u^{''} = (x^2 - \lambda) u` around :math:`x_0` from the recursion
+        :math:`(k+2)(k+1) c_{k+2} = (x_0^2 - \lambda) c_k + 2 x_0 c_{k-1} + c_{k-2}`.
+
+        :param x0: The center :math:`x_0` of the expansion.
+        :param h: The value :math:`u(x_0)`.
+        :param dh: The derivative :math:`u^{'}(x_0)`.
+        :param lam: The constant :math:`\lambda`.
+        :param terms: The highest power of the expansion.
+        :return: A list with the coefficients :math:`c_0, \ldots, c_{terms}`.
+        """
+        c = [0.0, 0.0, h, dh]
+        q = x0**2 - lam
+        for k in xrange(terms-1):
+            c.append((q * c[k+2] + 2.0 * x0 * c[k+1] + c[k]) / ((k+2.0) * (k+1.0)))
+        return c[2:]
+
+
+    def _taylor_evaluate(self, c, t):
+        r"""Evaluate a Taylor expansion and its derivative by Horner's scheme.
+
+        :param c: The coefficients :math:`c_k` of the expansion.
+        :param t: The distance :math:`t` from the center of the expansion.
+        :return: The values :math:`u(x_0 + t)` and :math:`u^{'}(x_0 + t)`.
+        """
+        u = c[-1]
+        du = 0.0
+        for ck in reversed(c[:-1]):
+            du = du * t + u
+            u = u * t + ck
+        return u, du
+
+
+    def _initial_guesses(self, n):
+        r"""Compute initial guesses for the non-negative nodes by the asymptotic
+        formulas of Tricomi in the bulk and of Gatteschi near the largest node.
+        (See L. Gatteschi, *Asymptotics and bounds for the zeros of Laguerre
+        polynomials: a survey*, J. Comput. Appl. Math., 144 (2002), pp. 7-27.)
+
+        :param n: The order :math:`n \geq 20` of the rule.
+        :return: An ndarray with the guesses in ascending order.
+        """
+        # The positive nodes are the roots of generalized Laguerre polynomials in x^2
+        if n % 2 == 1:
+            m = (n-1) // 2
+            a = 0.5
+        else:
+            m = n // 2
+            a = -0.5
+        nu = 4*m + 2*a + 2
+        k = arange(1, m+1)
+
+        # Tricomi's formula, accurate in the bulk
+        T = 0.5 * pi * ones(m)
+        rhs = (4*m - 4*k + 3) / nu * pi
+        for i in xrange(7):
+            T = T - (T - sin(T) - rhs) / (1.0 - cos(T))
+        t = cos(0.5*T)**2
+        xbulk = sqrt(nu*t - (5.0/(4*(1-t)**2) - 1.0/(1-t) - 1 + 3*a**2) / (3*nu))
+
+        # Gatteschi's formula involving the zeros of the Airy function, accurate near the edge
+        s = 3.0/8.0 * pi * (4*k - 1)
+        ai = -s**(2.0/3.0) * (1 + 5.0/48*s**-2 - 5.0/36*s**-4 + 77125.0/82944*s**-6
+                              - 108056875.0/6967296*s**-8 + 162375596875.0/334430208*s**-10)
+        l = min(m, _airy_zeros.size)
+        ai[:l] = _airy_zeros[:l]
+        xedge = sqrt(abs(nu + 2**(2.0/3)*ai*nu**(1.0/3) + 0.2*2**(4.0/3)*ai**2*nu**(-1.0/3)
+                         + (11.0/35 - a**2 - 12.0/175*ai**3) / nu
+                         + (16.0/1575*ai + 92.0/7875*ai**4) * 2**(2.0/3)*nu**(-5.0/3)
+                         - (15152.0/3031875*ai**5 + 1088.0/121275*ai**2) * 2**(1.0/3)*nu**(-7.0/3)))
+
+        x = where(arange(m) < int(floor(0.4985*n)), sort(xbulk), sort(xedge))
+
+        if n % 2 == 1:
+            x = hstack([0.0, x])
+
+        return x
+
+
     def _hermite_recursion(self, nodes):
         r"""Evaluate the Hermite functions recursively up to the order :math:`R` on the given nodes.
 
@@ -10,8 +10,9 @@ states phi_0 of the 'bra' and the 'ket'.
 @license: Modified BSD License
 """
 
-from numpy import squeeze, conjugate, sqrt, ones, zeros, complexfloating, pi, dot, transpose
-from scipy.linalg import inv, det
+from numpy import (array, squeeze, conjugate, sqrt, ones, zeros, prod, einsum,
+                   complexfloating, pi, newaxis)
+from numpy.linalg import inv, det, solve, eigvals
 from scipy import exp
 
 from Quadrature import Quadrature
@@ -105,23 +106,15 @@ class GaussianIntegral(Quadrature):
 
         .. math::
             \langle \phi_{\underline{0}} | \phi_{\underline{0}} \rangle
-            & = \int C \exp\left(-\frac{1}{2} \underline{x}^{\mathrm{T}} \mathbf{A} \underline{x}
+            & = \int C \exp\left(-\underline{x}^{\mathrm{T}} \mathbf{A} \underline{x}
                            +\underline{b}^{\mathrm{T}} \underline{x}
                            + c
                      \right) \mathrm{d}\underline{x} \\
-            & = C \sqrt{\frac{\left(2\pi\right)^D}{\det \mathbf{A}}}
-              \exp\left(-\frac{1}{2} \underline{b}^{\mathrm{T}} \mathbf{A}^{-\mathrm{H}} \underline{b}\right)
+            & = C \sqrt{\frac{\pi^D}{\det \mathbf{A}}}
+              \exp\left(\frac{1}{4} \underline{b}^{\mathrm{T}} \mathbf{A}^{-1} \underline{b}\right)
               \exp\left(c\right)
 
-        In a first step we combine the exponential parts of both wavepackets into
-        :math:`\underline{x}^{\mathrm{H}} \mathbf{A} \underline{x} + \underline{b}^{\mathrm{T}} \underline{x} + c`.
-        Then we transform :math:`\mathbf{A}`, :math:`\underline{b}` and :math:`c`
-        such that this matches the integrand above. The necessary transformations read:
-
-        .. math::
-            \mathbf{A}^{\prime} &= -2 \frac{i}{\varepsilon^2} \mathbf{A} \\
-            \underline{b}^{\prime} &= \frac{i}{\varepsilon^2} \underline{b} \\
-            c &= \frac{i}{\varepsilon^2} c
+        This is the special case :math:`J = J^\prime = 1` of :py:meth:`exact_result_gauss_stacked`.
 
         Note that this is an internal method and usually there is no
         reason to call it from outside.
@@ -132,42 +125,61 @@ class GaussianIntegral(Quadrature):
         :param eps: The semi-classical scaling parameter :math:`\varepsilon`.
         :return: The value of the integral :math:`\langle \phi_{\underline{0}} | \phi_{\underline{0}} \rangle`.
         """
-        qr, pr, Qr, Pr = Pibra
-        qc, pc, Qc, Pc = Piket
+        Pibras = [ array(item, dtype=complexfloating)[newaxis,...] for item in Pibra ]
+        Pikets = [ array(item, dtype=complexfloating)[newaxis,...] for item in Piket ]
+        return self.exact_result_gauss_stacked(Pibras, Pikets, D, eps)[0,0]
+
+
+    def exact_result_gauss_stacked(self, Pibras, Pikets, D, eps):
+        r"""Compute the overlap integrals :math:`\langle \phi_{\underline{0}} | \phi_{\underline{0}} \rangle`
+        of the groundstates of all pairs of :math:`J` bra and :math:`J^\prime` ket parameter sets at once.
+
+        In a first step we combine the exponential parts of both groundstates into
+        :math:`-\underline{x}^{\mathrm{T}} \mathbf{A} \underline{x} + \underline{b}^{\mathrm{T}} \underline{x} + c`
+        where with :math:`G = P Q^{-1}` we have:
+
+        .. math::
+            \mathbf{A} &= -\frac{i}{2\varepsilon^2} \left(G_2 - \overline{G_1}\right) \\
+            \underline{b} &= \frac{i}{\varepsilon^2} \left(\overline{G_1} q_1 - G_2 q_2 + p_2 - p_1\right) \\
+            c &= \frac{i}{2\varepsilon^2} \left(q_2^{\mathrm{T}} G_2 q_2 - q_1^{\mathrm{T}} \overline{G_1} q_1\right)
+               - \frac{i}{\varepsilon^2} \left(p_2^{\mathrm{T}} q_2 - p_1^{\mathrm{T}} q_1\right)
+
+        All small linear algebra operations act on whole stacks of matrices.
+        The square root of :math:`\det \mathbf{A}` is taken over the eigenvalues
+        of :math:`\mathbf{A}` which all have positive real part.
+
+        :param Pibras: The stacked parameters :math:`q_1,p_1,Q_1,P_1` of the bras as arrays
+                       of shapes :math:`(J,D,1)`, :math:`(J,D,1)`, :math:`(J,D,D)` and :math:`(J,D,D)`.
+        :param Pikets: The stacked parameters :math:`q_2,p_2,Q_2,P_2` of the kets as arrays
+                       of shapes :math:`(J^\prime,D,1)`, :math:`(J^\prime,D,1)`, :math:`(J^\prime,D,D)` and :math:`(J^\prime,D,D)`.
+        :param D: The space dimension :math:`D` the packets have.
+        :param eps: The semi-classical scaling parameter :math:`\varepsilon`.
+        :return: A complex valued matrix of shape :math:`J \times J^\prime`.
+        """
+        q1, p1, Q1, P1 = Pibras
+        q2, p2, Q2, P2 = Pikets
+        q1, p1, q2, p2 = [ item.reshape(-1, D) for item in (q1, p1, q2, p2) ]
         hbar = eps**2
 
-        Gr = dot(Pr, inv(Qr))
-        Gc = dot(Pc, inv(Qc))
-
-        # Merge exponential parts
-        A = 0.5 * (Gc - conjugate(transpose(Gr)))
-        b = (0.5 * (  dot(Gr, qr)
-                    - dot(conjugate(transpose(Gc)), qc)
-                    + dot(transpose(Gr), conjugate(qr))
-                    - dot(conjugate(Gc), conjugate(qc))
-                   )
-             + (pc - conjugate(pr))
-            )
-        b = conjugate(b)
-        c = (0.5 * (  dot(conjugate(transpose(qc)), dot(Gc, qc))
-                    - dot(conjugate(transpose(qr)), dot(conjugate(transpose(Gr)), qr)))
-                 + (dot(conjugate(transpose(qr)), pr) - dot(conjugate(transpose(pc)), qc))
-            )
-
-        A = 1.0j/hbar * A
-        b = 1.0j/hbar * b
-        c = 1.0j/hbar * c
-
-        A = -2.0 * A
+        G1 = conjugate(einsum("jab,jbc->jac", P1, inv(Q1)))
+        G2 = einsum("jab,jbc->jac", P2, inv(Q2))
+        G1q1 = einsum("jab,jb->ja", G1, q1)
+        G2q2 = einsum("jab,jb->ja", G2, q2)
+
+        # Merge exponential parts, the first axis belongs to the bra and the second to the ket
+        A = -0.5j / hbar * (G2[newaxis,:,:,:] - G1[:,newaxis,:,:])
+        b = 1.0j / hbar * (G1q1[:,newaxis,:] - G2q2[newaxis,:,:] + p2[newaxis,:,:] - p1[:,newaxis,:])
+        c = (0.5j / hbar * ((q2*G2q2).sum(axis=1)[newaxis,:] - (q1*G1q1).sum(axis=1)[:,newaxis])
+             - 1.0j / hbar * ((p2*q2).sum(axis=1)[newaxis,:] - (p1*q1).sum(axis=1)[:,newaxis]))
 
         # Gaussian formula
-        I = sqrt(det(2.0*pi*inv(A))) * exp(0.5*dot(transpose(b),dot(conjugate(inv(A)),b))) * exp(c)
+        x = solve(A, b[...,newaxis])[...,0]
+        I = prod(1.0 / sqrt(eigvals(A)), axis=-1) * exp(0.25 * (b*x).sum(axis=-1) + c)
 
         # Prefactors
-        pfbra = (pi*eps**2)**(-D/4.0) * 1.0/sqrt(det(Qr))
-        pfket = (pi*eps**2)**(-D/4.0) * 1.0/sqrt(det(Qc))
-
-        return conjugate(pfbra)*pfket * I
+        pfbra = (pi*eps**2)**(-D/4.0) / sqrt(det(Q1))
+        pfket = (pi*eps**2)**(-D/4.0) / sqrt(det(Q2))
+        return pi**(0.5*D) * conjugate(pfbra)[:,newaxis] * pfket[newaxis,:] * I
 
 
     def perform_quadrature(self, row, col):
@@ -206,6 +218,42 @@ class GaussianIntegral(Quadrature):
         return result
 
 
+    def perform_quadrature_stacked(self, pacbras, packets, row, col):
+        r"""Evaluates the integrals :math:`\langle \Phi_i | \Phi^\prime_j \rangle`
+        of all pairs of the given wavepackets at once by an exact symbolic formula.
+        This is much faster than calling :py:meth:`perform_quadrature` for each pair
+        as all parameters are stacked and processed by a few vectorized operations.
+
+        .. warning:: This method does only take into account the ground state
+                     basis components :math:`\phi_{\underline{0}}` from both,
+                     the 'bra' and the 'ket'. See :py:meth:`perform_quadrature`.
+
+        :param pacbras: A list of :math:`J` wavepackets :math:`\Psi` for the 'bra' part.
+        :param packets: A list of :math:`J^\prime` wavepackets :math:`\Psi^\prime` for the 'ket' part.
+        :param row: The index :math:`i` of the component :math:`\Phi_i` of each :math:`\Psi`.
+        :param col: The index :math:`j` of the component :math:`\Phi^\prime_j` of each :math:`\Psi^\prime`.
+        :return: A complex valued matrix of shape :math:`J \times J^\prime`.
+        """
+        eps = packets[0].get_eps()
+        D = packets[0].get_dimension()
+        z = tuple(D*[0])
+
+        def stack(packetlist, component):
+            Pis = [ packet.get_parameters(component=component) for packet in packetlist ]
+            Pis = [ array([ Pi[i] for Pi in Pis ], dtype=complexfloating) for i in xrange(5) ]
+            c0 = array([ packet.get_coefficient_vector(component=component)[packet.get_basis_shapes(component=component)[z],0]
+                         for packet in packetlist ])
+            return Pis[:4], Pis[4].reshape(-1), c0
+
+        Pibras, Sbra, cbra = stack(pacbras, row)
+        Pikets, Sket, cket = stack(packets, col)
+
+        phase = exp(1.0j/eps**2 * (Sket[newaxis,:] - conjugate(Sbra)[:,newaxis]))
+        I = self.exact_result_gauss_stacked(Pibras, Pikets, D, eps)
+
+        return phase * conjugate(cbra)[:,newaxis] * cket[newaxis,:] * I
+
+
     def perform_build_matrix(self, row, col):
         r"""Computes the matrix elements :math:`\langle\Phi_i |\Phi^\prime_j\rangle`
         by an exact symbolic formula.
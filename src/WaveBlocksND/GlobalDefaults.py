@@ -33,6 +33,19 @@ kvp_rdel = "]"
 default_Pi = [1.0j, 1.0, 0.0, 0.0, 0.0]
 default_basis_size = 8
 
+# Bound on the total number of multi-index entries |K|*D
+# of all basis shapes shared by the block factory
+basis_shape_cache_size = 2**24
+
+# Bound on the total number of node entries |Gamma|*D
+# of all quadrature rules shared by the block factory
+quadrature_rule_cache_size = 2**24
+
+# Directory for storing expensive quadrature rules
+# across processes, None disables this cache. Enable
+# it by setting a path like "~/.waveblocks/quadrature_rules"
+path_to_qr_cache = None
+
 
 # Defaults for some simulation configuration parameters
 try_simplification = False
@@ -40,6 +53,10 @@ try_simplification = False
 # Try to make eigenvectors continuous
 continuous_eigenvectors = True
 
+# Maximal number of grid nodes per block in the batched
+# eigen decompositions of matrix potentials
+eigensolver_chunksize = 2**14
+
 # Matrix exponential algorithm
 matrix_exponential = "arnoldi"
 arnoldi_steps = 20
@@ -47,3 +64,8 @@ arnoldi_steps = 20
 # Default values about when to save the results
 write_nth = 0
 save_at = []
+
+# Adapt the basis shapes to the coefficients every n-th timestep, 0 means never
+adapt_nth = 0
+adapt_tolerance = 1e-12
+adapt_margin = 2
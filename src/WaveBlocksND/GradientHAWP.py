@@ -7,7 +7,7 @@ Compute the action of the gradient operator applied to a Hagedorn wavepacket.
 @license: Modified BSD License
 """
 
-from numpy import zeros, complexfloating, conjugate, squeeze
+from numpy import zeros, complexfloating, conjugate, newaxis, identity
 from scipy import sqrt
 
 from Gradient import Gradient
@@ -41,41 +41,78 @@ class GradientHAWP(Gradient):
         """
         # TODO: Consider moving this method into the HAWP class?
         D = wavepacket.get_dimension()
+        coeffs = wavepacket.get_coefficients(component=component)
+
+        Ke, cnew = self._apply_stencil(wavepacket, component, coeffs)
+        cnew = cnew.reshape((Ke.get_basis_size(), D))
+
+        if as_packet is True:
+            new_wps = []
+            for d in xrange(D):
+                hawp_new = wavepacket.clone()
+                hawp_new.set_basis_shapes(Ke, component=component)
+                hawp_new.set_coefficients(cnew[:,d], component=component)
+                new_wps.append(hawp_new)
+            return new_wps
+        else:
+            return (Ke, cnew)
+
+
+    def apply_gradient_to_basis(self, wavepacket, component=0):
+        r"""Compute the effect of the gradient operator :math:`-i \varepsilon^2 \nabla_x` on
+        all basis functions :math:`\phi_k(x)` of a component :math:`\Phi_i` of the Hagedorn
+        wavepacket :math:`\Psi` at once. The coefficients of :math:`\Phi_i` are not used.
+
+        :param wavepacket: The wavepacket :math:`\Psi` containing :math:`\Phi_i`.
+        :type wavepacket: A :py:class:`HagedornWavepacketBase` subclass instance.
+        :param component: The index :math:`i` of the component :math:`\Phi_i`.
+        :type component: Integer.
+        :return: Extended basis shape :math:`\mathfrak{\dot{K}}` and an ndarray of shape
+                 :math:`(|\mathfrak{\dot{K}}|, |\mathfrak{K}|, D)` where column :math:`\mu(k)`
+                 contains the new coefficients of :math:`-i \varepsilon^2 \nabla_x \phi_k`.
+        """
+        K = wavepacket.get_basis_shapes(component=component)
+        return self._apply_stencil(wavepacket, component, identity(K.get_basis_size()))
+
+
+    def _apply_stencil(self, wavepacket, component, coeffs):
+        r"""Apply the gradient stencil to several coefficient vectors at once.
+
+        :param coeffs: The coefficients :math:`c` of shape :math:`(|\mathfrak{K}|, M)`.
+        :return: Extended basis shape :math:`\mathfrak{\dot{K}}` and new coefficients
+                 :math:`c^\prime` of shape :math:`(|\mathfrak{\dot{K}}|, M, D)`.
+        """
+        D = wavepacket.get_dimension()
         eps = wavepacket.get_eps()
         q, p, Q, P, S = wavepacket.get_parameters(component=component)
         Pbar = conjugate(P)
-        coeffs = wavepacket.get_coefficients(component=component)
 
         # Prepare storage for new coefficients
         K = wavepacket.get_basis_shapes(component=component)
         Ke = K.extend()
         size = Ke.get_basis_size()
-        cnew = zeros((size,D), dtype=complexfloating)
+        M = coeffs.shape[1]
+        cnew = zeros((size,M,D), dtype=complexfloating)
 
         # We implement the more efficient scatter type stencil here
-        for k in K.get_node_iterator():
-            # Central phi_i coefficient
-            cnew[Ke[k],:] += squeeze(coeffs[K[k]] * p)
+        # using the neighbour tables of the extended shape
+        shape, i, center = K.intersection(Ke)
+        indices = shape.get_index_table()
+        c = coeffs[i,:,newaxis]
 
-            # Backward neighbours phi_{i - e_d}
-            nbw = Ke.get_neighbours(k, selection="backward")
+        # Central phi_i coefficient
+        cnew[center,:,:] += c * p[:,0]
 
-            for d, nb in nbw:
-                cnew[Ke[nb],:] += sqrt(eps**2/2.0) * sqrt(k[d]) * coeffs[K[k]] * Pbar[:,d]
+        # Backward neighbours phi_{i - e_d} and forward neighbours phi_{i + e_d}
+        nfw, nbw = Ke.get_neighbour_table()
+        nbw = nbw[center,:]
+        nfw = nfw[center,:]
 
-            # Forward neighbours phi_{i + e_d}
-            nfw = Ke.get_neighbours(k, selection="forward")
+        for d in xrange(D):
+            i = (nbw[:,d] >= 0).nonzero()[0]
+            cnew[nbw[i,d],:,:] += sqrt(eps**2/2.0) * sqrt(indices[i,d]).reshape(-1,1,1) * c[i,:,:] * Pbar[:,d]
 
-            for d, nb in nfw:
-                cnew[Ke[nb],:] += sqrt(eps**2/2.0) * sqrt(k[d]+1.0) * coeffs[K[k]] * P[:,d]
+            i = (nfw[:,d] >= 0).nonzero()[0]
+            cnew[nfw[i,d],:,:] += sqrt(eps**2/2.0) * sqrt(indices[i,d]+1.0).reshape(-1,1,1) * c[i,:,:] * P[:,d]
 
-        if as_packet is True:
-            new_wps = []
-            for d in xrange(D):
-                hawp_new = wavepacket.clone()
-                hawp_new.set_basis_shapes(Ke, component=component)
-                hawp_new.set_coefficients(cnew[:,d], component=component)
-                new_wps.append(hawp_new)
-            return new_wps
-        else:
-            return (Ke, cnew)
+        return (Ke, cnew)
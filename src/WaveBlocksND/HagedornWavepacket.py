@@ -37,20 +37,18 @@ class HagedornWavepacket(HagedornWavepacketBase):
 
         # The basis shapes K_i
         self._basis_shapes = []
-        # The coefficients c^i
-        self._coefficients = []
 
         for d in xrange(self._number_components):
             # Default basis shapes for all components
             bs = HyperCubicShape( self._dimension*[1] )
             self._basis_shapes.append(bs)
 
-            # A Gaussian
-            self._coefficients.append(zeros((bs.get_basis_size(),1), dtype=complexfloating))
-
         # Cache basis sizes
         self._basis_sizes = [ bs.get_basis_size() for bs in self._basis_shapes ]
 
+        # The coefficients c^i of all components in a single contiguous buffer
+        self._set_coefficient_storage(zeros((sum(self._basis_sizes),1), dtype=complexfloating))
+
         # Default parameters of harmonic oscillator eigenstates
         q = zeros((self._dimension, 1), dtype=complexfloating)
         p = zeros((self._dimension, 1), dtype=complexfloating)
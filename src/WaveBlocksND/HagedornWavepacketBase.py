@@ -7,7 +7,10 @@ This file contains the basic interface for general wavepackets.
 @license: Modified BSD License
 """
 
-from numpy import vstack, vsplit, cumsum, zeros, array, complexfloating, pi, dot, atleast_2d, einsum
+import atexit
+from threading import Lock
+from multiprocessing.pool import ThreadPool
+from numpy import vstack, hstack, cumsum, zeros, array, array_equal, ascontiguousarray, complexfloating, pi, dot, atleast_2d, einsum
 from scipy import exp, sqrt, conjugate
 from scipy.linalg import det, inv, norm
 
@@ -15,10 +18,38 @@ from Wavepacket import Wavepacket
 from Grid import Grid
 from GridWrapper import GridWrapper
 from GradientHAWP import GradientHAWP
+from RecursionPlan import get_recursion_plan
 
 __all__ = ["HagedornWavepacketBase"]
 
 
+# Thread pools for evaluating on blocks of nodes, keyed by the number of workers
+_thread_pools = {}
+_thread_pools_lock = Lock()
+
+
+def _get_thread_pool(workers):
+    r"""Return the shared pool of the given number of worker threads.
+    Pools are created on first use and kept alive until the process exits.
+    """
+    with _thread_pools_lock:
+        if not workers in _thread_pools:
+            _thread_pools[workers] = ThreadPool(workers)
+        return _thread_pools[workers]
+
+
+def _close_thread_pools():
+    r"""Shut down all shared thread pools.
+    """
+    with _thread_pools_lock:
+        for pool in _thread_pools.itervalues():
+            pool.close()
+            pool.join()
+        _thread_pools.clear()
+
+atexit.register(_close_thread_pools)
+
+
 class HagedornWavepacketBase(Wavepacket):
     r"""This class implements the abstract :py:class:`Wavepacket` interface
     and contains code common to all types of Hagedorn wavepackets.
@@ -33,29 +64,34 @@ class HagedornWavepacketBase(Wavepacket):
     # We can handle basis shapes here as the logic is the same for
     # homogeneous and inhomogeneous Hagedorn wavepackets.
 
+    def _set_coefficient_storage(self, vector):
+        r"""Use the given column vector as the contiguous storage of the coefficients
+        :math:`c^i` of all components and set up the per-component views into it.
+
+        :param vector: The coefficients of all components as a single long column vector.
+        :type vector: A contiguous complex ndarray of shape :math:`(\sum_i |\mathfrak{K}_i|, 1)`.
+        """
+        partition = hstack([0, cumsum(self._basis_sizes)])
+
+        self._coefficient_vector = vector
+        self._coefficients = [ vector[partition[i]:partition[i+1],:] for i in xrange(self._number_components) ]
+
+
     def _resize_coefficient_storage(self, component, bs_old, bs_new):
-        r"""
+        r"""Map the coefficients :math:`c^i` of a component from the basis shape
+        :math:`\mathfrak{K}` to the new basis shape :math:`\mathfrak{K}^\prime`.
+
+        :return: An ndarray of shape :math:`(|\mathfrak{K}^\prime|, 1)` with the new coefficients.
         """
-        bso = bs_old.get_basis_size()
         bsn = bs_new.get_basis_size()
 
-        # Find the intersection of K and K'
-        # Optimization: iterate over smaller set
-        if bso <= bsn:
-            insec = [ k for k in bs_old if k in bs_new ]
-        elif bso > bsn:
-            insec = [ k for k in bs_new if k in bs_old ]
-        # TODO: Consider making this part of the BasisShape interface
-        # TODO: Consider implementing set operations for basis shapes
-
-        # Construct the index mapping
-        i = array([ bs_old[k] for k in insec ])
-        j = array([ bs_new[k] for k in insec ])
+        # Find the intersection of K and K' and the index mappings into both
+        shape, i, j = bs_old.intersection(bs_new)
 
         # Copy over the data
         cnew = zeros((bsn,1), dtype=complexfloating)
         cnew[j] = self._coefficients[component][i]
-        self._coefficients[component] = cnew
+        return cnew
 
 
     def get_basis_shapes(self, component=None):
@@ -81,13 +117,15 @@ class HagedornWavepacketBase(Wavepacket):
                           ``None`` which means to set the basis shapes for all components.
         :type component: int
         """
+        coefficients = self._coefficients[:]
+
         if component is not None:
             # Check for valid input basis shape
             if not component in range(self._number_components):
                 raise ValueError("Invalid component index " + str(component))
 
             # Adapt the coefficient storage vectors
-            self._resize_coefficient_storage(component, self._basis_shapes[component], basis_shape)
+            coefficients[component] = self._resize_coefficient_storage(component, self._basis_shapes[component], basis_shape)
             # Set the new basis shape for the given component
             self._basis_shapes[component] = basis_shape
         else:
@@ -97,13 +135,16 @@ class HagedornWavepacketBase(Wavepacket):
 
             for index, bsnew in enumerate(basis_shape):
                 # Adapt the coefficient storage vectors
-                self._resize_coefficient_storage(index, self._basis_shapes[index], bsnew)
+                coefficients[index] = self._resize_coefficient_storage(index, self._basis_shapes[index], bsnew)
                 # Set the new basis shape for the given component
                 self._basis_shapes[index] = bsnew
 
         # And update the caches information
         self._basis_sizes = [ bs.get_basis_size() for bs in self._basis_shapes ]
 
+        # Gather the coefficients in a single contiguous buffer again
+        self._set_coefficient_storage(vstack(coefficients))
+
 
     # We can handle coefficient set manipulation here as the logic is
     # the same for homogeneous and inhomogeneous Hagedorn wavepackets.
@@ -169,66 +210,90 @@ class HagedornWavepacketBase(Wavepacket):
 
             for index, value in enumerate(values):
                 bs = self._basis_sizes[index]
-                self._coefficients[index] = value.copy().reshape((bs,1))
+                self._coefficients[index][:] = value.reshape((bs,1))
         else:
             if component > self._number_components-1 or component < 0:
                 raise ValueError("There is no component with index "+str(component)+".")
 
             bs = self._basis_sizes[component]
-            self._coefficients[component] = values.copy().reshape((bs,1))
+            self._coefficients[component][:] = values.reshape((bs,1))
 
 
-    def get_coefficients(self, component=None):
+    def get_coefficients(self, component=None, copy=True):
         r"""Returns the coefficients :math:`c^i` for some component :math:`\Phi_i` of
         :math:`\Psi` or all the coefficients :math:`c` of all components.
 
-        Note: this method copies the data arrays.
+        Note: this method copies the data arrays by default.
 
         :param component: The index :math:`i` of the component we want to retrieve.
         :type component: int (Default is ``None`` meaning all)
+        :param copy: Whether to return copies or views into the internal storage.
+                     Views must be treated as read-only.
+        :type copy: Boolean, default is ``True``.
         :return: A single ndarray with the coefficients of the given component or
                  a list containing the ndarrays for each component. Each ndarray
                  is two-dimensional with a shape of :math:`(|\mathfrak{K}_i|, 1)`.
         :raise: :py:class:`ValueError` For invalid component indices :math:`i`.
         """
         if component is None:
-            return [ item.copy() for item in self._coefficients ]
+            if copy is True:
+                return [ item.copy() for item in self._coefficients ]
+            return self._coefficients[:]
         else:
             if component > self._number_components-1 or component < 0:
                 raise ValueError("There is no component with index "+str(component)+".")
 
-            return self._coefficients[component].copy()
+            if copy is True:
+                return self._coefficients[component].copy()
+            return self._coefficients[component]
 
 
-    def get_coefficient_vector(self, component=None):
+    def get_coefficient_vector(self, component=None, copy=False):
         r"""Retrieve the coefficients for all components :math:`\Phi_i` simultaneously.
 
+        Note: This function does *NOT* copy the data by default! All coefficients
+        are stored in a single contiguous buffer and we return a view into it.
+
         :param component: The component :math:`i` whose coefficients we request. (Default is
                           ``None`` which means to return the coefficients for all components.
         :type component: int
+        :param copy: Whether to return a copy instead of a view into the internal storage.
+        :type copy: Boolean, default is ``False``.
         :return: The coefficients :math:`c^i` of all components
                  :math:`\Phi_i` stacked into a single long column vector.
         """
         if component is None:
-            return vstack(self._coefficients)
+            vector = self._coefficient_vector
         else:
-            return self._coefficients[component]
+            vector = self._coefficients[component]
+
+        if copy is True:
+            return vector.copy()
+        return vector
 
 
-    def set_coefficient_vector(self, vector):
+    def set_coefficient_vector(self, vector, copy=False):
         """Set the coefficients for all components :math:`\Phi_i` simultaneously.
 
-        Note: This function does *NOT* copy the input data! This is for efficiency
-        as this routine is used in the innermost loops.
+        Note: This function does *NOT* copy the input data by default! This is for
+        efficiency as this routine is used in the innermost loops. The given vector
+        becomes the internal storage whenever it is a contiguous complex array.
 
         :param vector: The coefficients of all components as a single long column vector.
         :type vector: A two-dimensional ndarray of appropriate shape.
+        :param copy: Whether to copy the input data.
+        :type copy: Boolean, default is ``False``.
         """
-        # Compute the partition of the block-vector from the basis sizes
-        partition = cumsum(self._basis_sizes)[:-1]
+        if copy is True:
+            vector = array(vector, dtype=complexfloating, copy=True)
+        else:
+            vector = ascontiguousarray(vector, dtype=complexfloating)
 
-        # Split the block-vector with the given partition and assign
-        self._coefficients = vsplit(vector, partition)
+        bs = sum(self._basis_sizes)
+        if not vector.size == bs:
+            raise ValueError("Wrong number of coefficients: "+str(vector.size)+" instead of "+str(bs)+".")
+
+        self._set_coefficient_storage(vector.reshape((bs,1)))
 
 
     def get_eps(self):
@@ -286,7 +351,110 @@ class HagedornWavepacketBase(Wavepacket):
         return prefactor * exp(exponent)
 
 
-    def evaluate_basis_at(self, grid, component, prefactor=False):
+    def _evaluate_layers(self, component, nodes, plan=None):
+        r"""Evaluate the basis functions :math:`\phi_k` layer by layer at the given nodes
+        :math:`\gamma`. At every moment only the last two layers are kept in memory.
+
+        :param component: The index :math:`i` of a single component :math:`\Phi_i` to evaluate.
+        :param nodes: The nodes :math:`\gamma` we evaluate the basis functions at.
+        :type nodes: An ndarray of shape ``(D, |\Gamma|)``.
+        :param plan: The recursion plan to follow. (Default is ``None`` which means
+                     to use the plan of the basis shape :math:`\mathfrak{K}_i`.)
+        :type plan: A :py:class:`RecursionPlan` instance.
+        :return: A generator yielding pairs ``(mu, values)`` of the linear indices :math:`\mu(k)`
+                 of a layer and an ndarray of shape ``(len(mu), |\Gamma|)`` with the values
+                 of the corresponding basis functions :math:`\phi_k`.
+        """
+        D = self._dimension
+        nn = nodes.shape[1]
+
+        # The precompiled recursion plan of the basis shape
+        if plan is None:
+            plan = get_recursion_plan(self._basis_shapes[component])
+
+        # Precompute some constants
+        q, p, Q, P, S = self.get_parameters(component=component)
+
+        Qinv = inv(Q)
+        Qbar = conjugate(Q)
+        QQ = dot(Qinv, Qbar)
+
+        # The scaled and transformed nodes enter every layer
+        X = sqrt(2.0/self._eps**2) * dot(Qinv, nodes - q)
+
+        # Compute the ground state phi_0 via direct evaluation.
+        # Every layer carries a trailing row of zeros addressed
+        # by the index -1 of missing neighbours.
+        phi0 = zeros((2, nn), dtype=complexfloating)
+        phi0[0,:] = self._evaluate_phi0(component, nodes, prefactor=False)
+        yield plan.get_layer_order()[0][:1], phi0[:-1,:]
+
+        # Compute all higher order layers via recursion
+        prev2 = zeros((1, nn), dtype=complexfloating)
+        prev1 = phi0
+
+        for mu, parent, direction, backward, sqrtk, sqrtkd in plan.get_layers():
+            m = mu.shape[0]
+            phi = zeros((m + 1, nn), dtype=complexfloating)
+
+            # Compute the 3-term recursion for the whole layer
+            phi[:-1,:] = X[direction,:] * prev1[parent,:]
+            coeffs = QQ[direction,:] * sqrtk
+            for j in xrange(D):
+                phi[:-1,:] -= coeffs[:,j:j+1] * prev2[backward[:,j],:]
+            phi[:-1,:] /= sqrtkd
+
+            yield mu, phi[:-1,:]
+
+            prev2 = prev1
+            prev1 = phi
+
+
+    def _get_node_blocks(self, nn, chunksize=None, workers=None):
+        r"""Split the nodes :math:`\gamma` into contiguous blocks.
+
+        :param nn: The overall number :math:`|\Gamma|` of nodes.
+        :param chunksize: The maximal number of nodes per block. (Default is ``None``
+                          which means to put all nodes into a single block or
+                          to split them evenly among the workers.)
+        :param workers: The number of worker threads the blocks get distributed to.
+        :return: A list of ``slice`` instances.
+        """
+        if chunksize is None and workers is not None and workers > 1:
+            chunksize = -(-nn // workers)
+        if chunksize is None or chunksize >= nn:
+            return [ slice(0, nn) ]
+        return [ slice(i, min(i+chunksize, nn)) for i in xrange(0, nn, chunksize) ]
+
+
+    def _map_blocks(self, function, blocks, workers=None):
+        r"""Apply a function to all blocks of nodes. With more than a single worker
+        the blocks are processed by a pool of threads. This pays off as the numerical
+        kernels release the global interpreter lock. The function must write its
+        results into disjoint slices of a shared output array.
+
+        :param function: The function to apply, taking a single ``slice`` as argument.
+        :param blocks: The list of blocks.
+        :param workers: The number of worker threads. (Default is ``None`` which
+                        means to process all blocks sequentially.)
+        """
+        if workers is None or workers <= 1 or len(blocks) <= 1:
+            for block in blocks:
+                function(block)
+        else:
+            # The pools are kept alive and shared between all packets
+            _get_thread_pool(workers).map(function, blocks, chunksize=1)
+
+
+    def _get_prefactor_root(self, component):
+        r"""Compute the continuous square root :math:`\sqrt{\det(Q)}` of the prefactor.
+        This updates the state of the continuous root and must be done only once per evaluation.
+        """
+        Q = self.get_parameters(component=component)[2]
+        return self._get_sqrt(component)(det(Q))
+
+
+    def evaluate_basis_at(self, grid, component, prefactor=False, workers=None, basis_shape=None):
         r"""Evaluate the basis functions :math:`\phi_k` recursively at the given nodes :math:`\gamma`.
 
         :param grid: The grid :math:`\Gamma` containing the nodes :math:`\gamma`.
@@ -294,13 +462,20 @@ class HagedornWavepacketBase(Wavepacket):
         :param component: The index :math:`i` of a single component :math:`\Phi_i` to evaluate.
         :param prefactor: Whether to include a factor of :math:`\frac{1}{\sqrt{\det(Q)}}`.
         :type prefactor: Boolean, default is ``False``.
+        :param workers: The number of threads the nodes get distributed to.
+                        (Default is ``None`` which means no threading.)
+        :type workers: int
+        :param basis_shape: Evaluate the basis functions :math:`\phi_k` of this basis shape
+                            instead of :math:`\mathfrak{K}_i` using the parameters of :math:`\Phi_i`.
+        :type basis_shape: A subclass of :py:class:`BasisShape`.
         :return: A two-dimensional ndarray :math:`H` of shape :math:`(|\mathfrak{K}_i|, |\Gamma|)` where
                  the entry :math:`H[\mu(k), i]` is the value of :math:`\phi_k(\gamma_i)`.
         """
-        D = self._dimension
+        if basis_shape is None:
+            basis_shape = self._basis_shapes[component]
 
-        bas = self._basis_shapes[component]
-        bs = self._basis_sizes[component]
+        plan = get_recursion_plan(basis_shape)
+        bs = plan.get_basis_size()
 
         # The grid
         grid = self._grid_wrap(grid)
@@ -310,58 +485,67 @@ class HagedornWavepacketBase(Wavepacket):
         # Allocate the storage array
         phi = zeros((bs, nn), dtype=complexfloating)
 
-        # Precompute some constants
-        Pi = self.get_parameters(component=component)
-        q, p, Q, P, S = Pi
+        # Compute all basis functions layer by layer
+        def evaluate_block(block):
+            for mu, values in self._evaluate_layers(component, nodes[:,block], plan=plan):
+                phi[mu,block] = values
 
-        Qinv = inv(Q)
-        Qbar = conjugate(Q)
-        QQ = dot(Qinv, Qbar)
+        self._map_blocks(evaluate_block, self._get_node_blocks(nn, workers=workers), workers=workers)
+
+        if prefactor is True:
+            phi = phi / self._get_prefactor_root(component)
 
-        # Compute the ground state phi_0 via direct evaluation
-        mu0 = bas[tuple(D*[0])]
-        phi[mu0,:] = self._evaluate_phi0(component, nodes, prefactor=False)
+        return phi
 
-        # Compute all higher order states phi_k via recursion
-        for d in xrange(D):
-            # Iterator for all valid index vectors k
-            indices = bas.get_node_iterator(mode="chain", direction=d)
 
-            for k in indices:
-                # Current index vector
-                ki = vstack(k)
+    def _slim_recursion_block(self, nodes, component, coefficients=None, plan=None):
+        r"""Evaluate the component :math:`\Phi_i` on a block of nodes. The basis
+        functions are recursively computed and summed up layer by layer.
 
-                # Access predecessors
-                phim = zeros((D, nn), dtype=complexfloating)
+        :param nodes: The nodes :math:`\gamma` we evaluate :math:`\Phi_i` at.
+        :type nodes: An ndarray of shape ``(D, |\Gamma|)``.
+        :param component: The index :math:`i` of the component :math:`\Phi_i` whose parameters we use.
+        :param coefficients: Several coefficient vectors to contract the basis functions with at once.
+                             (Default is ``None`` which means to use the coefficients :math:`c^i`.)
+        :type coefficients: An ndarray of shape :math:`(|\mathfrak{K}|, M)` ordered like the plan.
+        :param plan: The recursion plan to follow. (Default is ``None`` which means
+                     to use the plan of the basis shape :math:`\mathfrak{K}_i`.)
+        :return: An ndarray of shape :math:`(M, |\Gamma|)` with the values at these nodes.
+        """
+        if coefficients is None:
+            coefficients = self._coefficients[component]
 
-                for j, kpj in bas.get_neighbours(k, selection="backward"):
-                    mukpj = bas[kpj]
-                    phim[j,:] = phi[mukpj,:]
+        psi = zeros((coefficients.shape[1], nodes.shape[1]), dtype=complexfloating)
 
-                # Compute 3-term recursion
-                p1 = (nodes - q) * phi[bas[k],:]
-                p2 = sqrt(ki) * phim
+        # Sum up the contributions of each layer
+        for mu, values in self._evaluate_layers(component, nodes, plan=plan):
+            psi = psi + dot(coefficients[mu,:].T, values)
 
-                t1 = sqrt(2.0/self._eps**2) * dot(Qinv[d,:], p1)
-                t2 = dot(QQ[d,:], p2)
+        return psi
 
-                # Find multi-index where to store the result
-                kped = bas.get_neighbours(k, selection="forward", direction=d)
 
-                # Did we find this k?
-                if len(kped) > 0:
-                    kped = kped[0]
+    def _get_parameter_groups(self, components):
+        r"""Group the given components :math:`\Phi_i` by identical parameter sets :math:`\Pi_i`.
+        All components of a group share the same basis functions :math:`\phi_k`.
 
-                    # Store computed value
-                    phi[bas[kped[1]],:] = (t1 - t2) / sqrt(ki[d] + 1.0)
+        :param components: The indices :math:`i` of the components.
+        :return: A list of lists of component indices.
+        """
+        groups = []
 
-        if prefactor is True:
-            phi = phi / self._get_sqrt(component)(det(Q))
+        for index in components:
+            Pi = self.get_parameters(component=index)
+            for Pig, group in groups:
+                if all([ array_equal(a, b) for a, b in zip(Pig, Pi) ]):
+                    group.append(index)
+                    break
+            else:
+                groups.append((Pi, [index]))
 
-        return phi
+        return [ group for Pig, group in groups ]
 
 
-    def slim_recursion(self, grid, component, prefactor=False):
+    def slim_recursion(self, grid, component, prefactor=False, chunksize=None, out=None, workers=None):
         r"""Evaluate the Hagedorn wavepacket :math:`\Psi` at the given nodes :math:`\gamma`.
         This routine is a slim version compared to the full basis evaluation. At every moment
         we store only the data we really need to compute the next step until we hit the highest
@@ -372,88 +556,41 @@ class HagedornWavepacketBase(Wavepacket):
         :param component: The index :math:`i` of a single component :math:`\Phi_i` to evaluate.
         :param prefactor: Whether to include a factor of :math:`\frac{1}{\sqrt{\det(Q)}}`.
         :type prefactor: Boolean, default is ``False``.
-        :return: A list of arrays or a single array containing the values of the :math:`\Phi_i`
-                 at the nodes :math:`\gamma`.
+        :param chunksize: The maximal number of nodes evaluated at once. (Default is ``None``
+                          which means to evaluate all nodes at once.)
+        :type chunksize: int
+        :param out: A buffer of shape :math:`(1, |\Gamma|)` the result is written into block by block.
+        :type out: An ndarray or any other object supporting slice assignment, for example a ``h5py`` dataset.
+        :param workers: The number of threads the blocks of nodes get distributed to.
+                        (Default is ``None`` which means no threading.)
+        :type workers: int
+        :return: An array of shape :math:`(1, |\Gamma|)` containing the values of the :math:`\Phi_i`
+                 at the nodes :math:`\gamma`. If an output buffer was given, this buffer is returned.
 
         Note that this function does not include the global phase :math:`\exp(\frac{i S}{\varepsilon^2})`.
         """
-        D = self._dimension
-
-        # Precompute some constants
-        Pi = self.get_parameters(component=component)
-        q, p, Q, P, S = Pi
-
-        Qinv = inv(Q)
-        Qbar = conjugate(Q)
-        QQ = dot(Qinv, Qbar)
-
-        # The basis shape
-        bas = self._basis_shapes[component]
-        Z = tuple(D*[0])
-
-        # Book keeping
-        todo = []
-        newtodo = [Z]
-        olddelete = []
-        delete = []
-        tmp = {}
-
         # The grid nodes
         grid = self._grid_wrap(grid)
         nn = grid.get_number_nodes(overall=True)
         nodes = grid.get_nodes()
 
-        # Evaluate phi0
-        tmp[Z] = self._evaluate_phi0(component, nodes, prefactor=False)
-        psi = self._coefficients[component][bas[Z], 0] * tmp[Z]
-
-        # Iterate for higher order states
-        while len(newtodo) != 0:
-            # Delete results that never will be used again
-            for d in olddelete:
-                del tmp[d]
-
-            # Exchange queues
-            todo = newtodo
-            newtodo = []
-            olddelete = delete
-            delete = []
-
-            # Compute new results
-            for k in todo:
-                # Center stencil at node k
-                ki = vstack(k)
-
-                # Access predecessors
-                phim = zeros((D, nn), dtype=complexfloating)
-                for j, kpj in bas.get_neighbours(k, selection="backward"):
-                    phim[j,:] = tmp[kpj]
-
-                # Compute the neighbours
-                for d, n in bas.get_neighbours(k, selection="forward"):
-                    if not n in tmp.keys():
-                        # Compute 3-term recursion
-                        p1 = (nodes - q) * tmp[k]
-                        p2 = sqrt(ki) * phim
-
-                        t1 = sqrt(2.0/self._eps**2) * dot(Qinv[d,:], p1)
-                        t2 = dot(QQ[d,:], p2)
-
-                        # Store computed value
-                        tmp[n] = (t1 - t2) / sqrt(ki[d] + 1.0)
-                        # And update the result
-                        psi = psi + self._coefficients[component][bas[n], 0] * tmp[n]
-
-                        newtodo.append(n)
-                delete.append(k)
+        if out is None:
+            out = zeros((1, nn), dtype=complexfloating)
 
-        if prefactor is True:
-            psi = psi / self._get_sqrt(component)(det(Q))
+        root = self._get_prefactor_root(component) if prefactor is True else None
 
-        return psi
+        def evaluate_block(block):
+            psi = self._slim_recursion_block(nodes[:,block], component)[0,:]
+            if root is not None:
+                psi = psi / root
+            out[..., block] = psi
+
+        self._map_blocks(evaluate_block, self._get_node_blocks(nn, chunksize, workers), workers=workers)
 
+        return out
 
-    def evaluate_at(self, grid, component=None, prefactor=False):
+
+    def evaluate_at(self, grid, component=None, prefactor=False, chunksize=None, out=None, workers=None):
         r"""Evaluate the Hagedorn wavepacket :math:`\Psi` at the given nodes :math:`\gamma`.
 
         :param grid: The grid :math:`\Gamma` containing the nodes :math:`\gamma`.
@@ -462,33 +599,76 @@ class HagedornWavepacketBase(Wavepacket):
                           (Defaults to ``None`` for evaluating all components.)
         :param prefactor: Whether to include a factor of :math:`\frac{1}{\sqrt{\det(Q)}}`.
         :type prefactor: Boolean, default is ``False``.
+        :param chunksize: The maximal number of nodes evaluated at once. This bounds the peak
+                          memory by :math:`\mathcal{O}(|\mathfrak{K}| \cdot \text{chunksize})`.
+                          (Default is ``None`` which means to evaluate all nodes at once.)
+        :type chunksize: int
+        :param out: The buffer the result is written into block by block. This is a buffer of
+                    shape :math:`(1, |\Gamma|)` for a single component. When evaluating all components
+                    this is either a list with one such buffer per component or a single buffer
+                    of shape :math:`(N, |\Gamma|)`.
+        :type out: ndarrays or any other objects supporting slice assignment, for example ``h5py`` datasets.
+        :param workers: The number of threads the blocks of nodes get distributed to.
+                        (Default is ``None`` which means no threading.)
+        :type workers: int
         :return: A list of arrays or a single array containing the values of the :math:`\Phi_i` at the nodes :math:`\gamma`.
+                 If an output buffer was given, this buffer is returned.
         """
-        Pis = self.get_parameters(component=component, aslist=True)
+        grid = self._grid_wrap(grid)
+        nn = grid.get_number_nodes(overall=True)
+        nodes = grid.get_nodes()
 
         if component is not None:
-            phase = exp(1.0j * Pis[component][4] / self._eps**2)
-            #basis = self.evaluate_basis_at(grid, component=component, prefactor=prefactor)
-            #values = phase * sum(self._coefficients[component] * basis, axis=0)
-            values = phase * self.slim_recursion(grid, component, prefactor=prefactor)
-
+            components = [ component ]
+            if out is None:
+                out = zeros((1, nn), dtype=complexfloating)
+            targets = [ out ]
         else:
-            values = []
+            components = range(self._number_components)
+            if out is None:
+                out = [ zeros((1, nn), dtype=complexfloating) for index in components ]
+            targets = out if type(out) is list else [ (out, index) for index in components ]
+
+        phases = [ exp(1.0j * self.get_parameters(component=index)[4] / self._eps**2) for index in components ]
+        roots = [ self._get_prefactor_root(index) if prefactor is True else None for index in components ]
+
+        # Components with identical parameter sets share all the basis functions. We
+        # run the recursion only once over the union of their basis shapes and
+        # contract all coefficient vectors against it in a single matrix product.
+        recursions = []
+
+        for group in self._get_parameter_groups(components):
+            shape = self._basis_shapes[group[0]]
+            for index in group[1:]:
+                shape = shape.union(self._basis_shapes[index])[0]
+
+            plan = get_recursion_plan(shape)
+            coefficients = zeros((plan.get_basis_size(), len(group)), dtype=complexfloating)
+
+            for column, index in enumerate(group):
+                mu = shape.union(self._basis_shapes[index])[2]
+                coefficients[mu, column] = self._coefficients[index][:,0]
+
+            recursions.append(([ components.index(index) for index in group ], plan, coefficients))
+
+        def evaluate_block(block):
+            for positions, plan, coefficients in recursions:
+                values = self._slim_recursion_block(nodes[:,block], components[positions[0]], coefficients=coefficients, plan=plan)
 
-            for component in xrange(self._number_components):
-                # Note: This is very inefficient! We may evaluate the same basis functions multiple
-                #       times. But as long as we don't know that the basis shapes are true subsets
-                #       of the largest one, we can not evaluate just all functions in this
-                #       maximal set.
+                for row, position in enumerate(positions):
+                    psi = phases[position] * values[row,:]
+                    if roots[position] is not None:
+                        psi = psi / roots[position]
 
-                # TODO: Find more efficient way to do this
+                    target = targets[position]
+                    if type(target) is tuple:
+                        target[0][target[1], block] = psi
+                    else:
+                        target[..., block] = psi
 
-                phase = exp(1.0j * Pis[component][4] / self._eps**2)
-                #basis = self.evaluate_basis_at(grid, component=index, prefactor=prefactor)
-                #values.append( phase * sum(self._coefficients[index] * basis, axis=0) )
-                values.append( phase * self.slim_recursion(grid, component, prefactor=prefactor) )
+        self._map_blocks(evaluate_block, self._get_node_blocks(nn, chunksize, workers), workers=workers)
 
-        return values
+        return out
 
 
     # We can compute the norms the same way for homogeneous and inhomogeneous Hagedorn wavepackets.
@@ -8,7 +8,7 @@ which is the full dense basis set.
 @license: Modified BSD License
 """
 
-from numpy import eye, vstack, integer
+from numpy import array, asarray, arange, vstack, unravel_index, cumprod, dot, where, integer
 
 from BasisShape import BasisShape
 
@@ -38,16 +38,9 @@ class HyperCubicShape(BasisShape):
         # The limits Ki for each axis
         self._limits = tuple(limits)
 
-        # TODO: Do we really want to store these maps or better compute data the fly
-
-        # The linear mapping k -> index for the basis
-        iil = self._get_index_iterator_lex()
-        self._lima = {k:index for index, k in enumerate(iil)}
-        # And the inverse mapping
-        self._lima_inv = {v:k for k, v in self._lima.iteritems()}
-
-        # The basis size
-        self._basissize = len(self._lima)
+        # The table of all multi-indices k in linear order
+        bs = reduce(lambda x,y: x*y, self._limits, 1)
+        self._set_index_table(vstack(unravel_index(arange(bs), self._limits)).T)
 
 
     def __str__(self):
@@ -66,51 +59,25 @@ class HyperCubicShape(BasisShape):
         return hash(("HyperCubicShape", self._limits))
 
 
-    def __getitem__(self, k):
-        r"""Make map look ups.
-        """
-        if type(k) is tuple or type(k) is list:
-            k = tuple(k)
-            assert len(k) == self._dimension
-            if k in self._lima:
-                return self._lima[k]
-        elif type(k) is int:
-            if k in self._lima_inv:
-                return self._lima_inv[k]
-        else:
-            raise IndexError("Wrong index type")
-
-
-    def __contains__(self, k):
-        r"""
-        Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
-
-        :param k: The multi-index we want to test.
-        :type k: tuple
-        """
-        assert len(tuple(k)) == self._dimension
-        return tuple(k) in self._lima
-
-
-    def __iter__(self):
-        r"""Implements iteration over the multi-indices :math:`k`
-        of the basis set :math:`\mathfrak{K}`.
-
-        Note: The order of iteration is NOT fixed. If you need a special
-        iteration scheme, use :py:meth:`get_node_iterator`.
+    def _build_lookup(self):
+        r"""The linear order of the hypercubic shape is dense, hence
+        :math:`\mu(k)` is computed from the strides of the index table.
         """
-        # TODO: Better remove this as it may cause unexpected behaviour?
-        return iter(self._lima)
+        limits = array(self._limits, dtype=integer)
+        self._strides = cumprod([1] + limits[:0:-1].tolist())[::-1]
 
 
-    def contains(self, k):
-        r"""
-        Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
+    def find(self, indices):
+        r"""Look up the linear indices :math:`\mu(k)` of many multi-indices at once.
 
-        :param k: The multi-index we want to test.
-        :type k: tuple
+        :param indices: The multi-indices :math:`k` to look up.
+        :type indices: An integer ndarray of shape :math:`(M, D)`.
+        :return: An integer ndarray of shape :math:`(M,)` containing :math:`\mu(k)`
+                 or ``-1`` if :math:`k` is not part of the basis shape.
         """
-        return tuple(k) in self._lima
+        indices = asarray(indices, dtype=integer).reshape(-1, self._dimension)
+        valid = ((indices >= 0) & (indices < self._limits)).all(axis=1)
+        return where(valid, dot(indices, self._strides), -1)
 
 
     def get_description(self):
@@ -129,34 +96,10 @@ class HyperCubicShape(BasisShape):
         r"""Extend the basis shape such that (at least) all neighbours of all
         boundary nodes are included in the extended basis shape.
         """
-        extended_limits = [ l+1 for l in self._limits ]
-        return HyperCubicShape(extended_limits)
-
-
-    def _get_index_iterator_lex(self):
-        r"""
-        """
-        # Upper bounds in each dimension
-        bounds = self._limits[::-1]
-
-        def index_iterator_lex(bounds):
-            # Initialize a counter
-            z = [0 for i in xrange(self._dimension + 1)]
-
-            while z[self._dimension] == 0:
-                # Yield the current index vector
-                yield tuple(reversed(z[:-1]))
-
-                # Increment fastest varying bit
-                z[0] += 1
-
-                # Reset overflows
-                for d in xrange(self._dimension):
-                    if z[d] >= bounds[d]:
-                        z[d] = 0
-                        z[d+1] += 1
-
-        return index_iterator_lex(bounds)
+        from BlockFactory import BlockFactory
+        extended_limits = tuple([ l+1 for l in self._limits ])
+        return BlockFactory().create_basis_shape({"type": "HyperCubicShape",
+                                                  "limits": extended_limits})
 
 
     def _get_index_iterator_chain(self, direction=0):
@@ -205,7 +148,8 @@ class HyperCubicShape(BasisShape):
         :type direction: integer.
         """
         if mode == "lex":
-            return self._get_index_iterator_lex()
+            # The index table is stored in lexicographical order
+            return iter(self)
         elif mode == "chain":
             if direction < self._dimension:
                 return self._get_index_iterator_chain(direction=direction)
@@ -221,53 +165,3 @@ class HyperCubicShape(BasisShape):
         :return: A tuple of the maximum of the multi-index in each direction.
         """
         return tuple(self._limits)
-
-
-    def get_neighbours(self, k, selection=None, direction=None):
-        r"""
-        Returns a list of all multi-indices that are neighbours of a given
-        multi-index :math:`k`. A direct neighbour is defined as
-        :math:`(k_0, \ldots, k_d \pm 1, \ldots, k_{D-1}) \forall d \in [0 \ldots D-1]`.
-
-        :param k: The multi-index of which we want to get the neighbours.
-        :type k: tuple
-        :param selection:
-        :type selection: string with fixed values ``forward``, ``backward`` or ``all``.
-                         The values ``all`` is equivalent to the value ``None`` (default).
-        :param direction: The direction :math:`0 \leq d < D` in which we want to find
-                          the neighbours :math:`k \pm e_d`.
-        :type direction: int
-        :return: A list containing the pairs :math:`(d, k^\prime)`.
-        """
-        assert len(tuple(k)) == self._dimension
-
-        # First build a list of potential neighbours
-        I = eye(self._dimension, dtype=integer)
-        ki = vstack(k)
-
-        # Forward and backward direct neighbours
-        nbfw = ki + I
-        nbbw = ki - I
-
-        # Keep only the valid ones
-        nbh = []
-
-        if direction is not None:
-            directions = [ direction ]
-        else:
-            directions = xrange(self._dimension)
-
-        for d in directions:
-            nfw = tuple(nbfw[:,d])
-            nbw = tuple(nbbw[:,d])
-
-            # TODO: Try to simplify these nested if blocks
-            if selection in ("backward", "all", None):
-                if nbw in self:
-                    nbh.append((d, nbw))
-
-            if selection in ("forward", "all", None):
-                if nfw in self:
-                    nbh.append((d, nfw))
-
-        return nbh
@@ -8,13 +8,38 @@ basis shape which is a special type of sparse basis set.
 @license: Modified BSD License
 """
 
-from numpy import eye, vstack, integer
+from numpy import zeros, array, arange, repeat, cumsum, minimum, hstack, int32, integer
 
 from BasisShape import BasisShape
 
 __all__ = ["HyperbolicCutShape"]
 
 
+def hyperbolic_cut_indices(D, K, limits=None):
+    r"""Enumerate all multi-indices :math:`k` with :math:`\prod_{d=0}^{D-1}(1+k_d) \leq K`
+    in lexicographical order. The table is built one dimension after the other by
+    expanding all prefixes :math:`(k_0, \ldots, k_{d-1})` with the admissible values of
+    :math:`k_d` given the remaining budget :math:`\lfloor K / \prod_{i<d}(1+k_i) \rfloor`.
+
+    :param D: The dimension :math:`D`
+    :param K: The sparsity parameter :math:`K`
+    :param limits: Optional limits :math:`k_d < K_d` for each direction.
+    :return: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)`.
+    """
+    indices = zeros((1, 0), dtype=int32)
+    budget = array([K], dtype=integer)
+
+    for d in xrange(D):
+        counts = budget if limits is None else minimum(budget, limits[d])
+        parent = repeat(arange(budget.shape[0]), counts)
+        # Values of k_d within each group of the same prefix
+        kd = arange(parent.shape[0]) - repeat(cumsum(counts) - counts, counts)
+        indices = hstack([indices[parent,:], kd.reshape(-1, 1).astype(int32)])
+        budget = budget[parent] // (1 + kd)
+
+    return indices
+
+
 class HyperbolicCutShape(BasisShape):
     r"""This class implements the hyperbolic cut basis shape which
     is a special type of sparse basis set. A basis shape is essentially
@@ -41,14 +66,8 @@ class HyperbolicCutShape(BasisShape):
         # The sparsity parameter
         self._sparsity = K
 
-        # The linear mapping k -> index for the basis
-        iil = self._get_index_iterator_lex()
-        self._lima = {k:index for index, k in enumerate(iil)}
-        # And the inverse mapping
-        self._lima_inv = {v:k for k, v in self._lima.iteritems()}
-
-        # The basis size
-        self._basissize = len(self._lima)
+        # The table of all multi-indices k in linear order
+        self._set_index_table(hyperbolic_cut_indices(D, K))
 
 
     def __str__(self):
@@ -67,53 +86,6 @@ class HyperbolicCutShape(BasisShape):
         return hash(("HyperbolicCutShape", self._dimension, self._sparsity))
 
 
-    def __getitem__(self, k):
-        r"""Make map look ups.
-        """
-        if type(k) is tuple or type(k) is list:
-            k = tuple(k)
-            assert len(k) == self._dimension
-            if k in self._lima:
-                return self._lima[k]
-        elif type(k) is int:
-            if k in self._lima_inv:
-                return self._lima_inv[k]
-        else:
-            raise IndexError("Wrong index type")
-
-
-    def __contains__(self, k):
-        r"""
-        Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
-
-        :param k: The multi-index :math:`k` we want to test.
-        :type k: tuple
-        """
-        assert len(tuple(k)) == self._dimension
-        return tuple(k) in self._lima
-
-
-    def __iter__(self):
-        r"""Implements iteration over the multi-indices :math:`k`
-        of the basis set :math:`\mathfrak{K}`.
-
-        Note: The order of iteration is NOT fixed. If you need a special
-        iteration scheme, use :py:meth:`get_node_iterator`.
-        """
-        # TODO: Better remove this as it may cause unexpected behaviour?
-        return iter(self._lima)
-
-
-    def contains(self, k):
-        r"""
-        Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
-
-        :param k: The multi-index :math:`k` we want to test.
-        :type k: tuple
-        """
-        return tuple(k) in self._lima
-
-
     def get_description(self):
         r"""Return a description of this basis shape object.
         A description is a ``dict`` containing all key-value pairs
@@ -140,34 +112,10 @@ class HyperbolicCutShape(BasisShape):
         else:
             # Special casing K = 2**(D-1) * (K+1) for D = 1
             extended_sparsity = K + 1
-        return HyperbolicCutShape(D, extended_sparsity)
-
-
-    def _get_index_iterator_lex(self):
-        r"""
-        """
-        # The hyperbolic cut parameter
-        Kmax = self._sparsity
-
-        def index_iterator_lex(Kmax):
-            # Initialize a counter
-            z = [0 for i in xrange(self._dimension + 1)]
-
-            while z[self._dimension] == 0:
-                # Yield the current index vector
-                yield tuple(reversed(z[:-1]))
-
-                # Increment fastest varying bit
-                z[0] += 1
-
-                # Reset overflows
-                for d in xrange(self._dimension):
-                    K = reduce(lambda x,y: x*(y+1), z[:-1], 1)
-                    if K > Kmax:
-                        z[d] = 0
-                        z[d+1] += 1
-
-        return index_iterator_lex(Kmax)
+        from BlockFactory import BlockFactory
+        return BlockFactory().create_basis_shape({"type": "HyperbolicCutShape",
+                                                  "dimension": D,
+                                                  "K": extended_sparsity})
 
 
     def _get_index_iterator_chain(self, direction=0):
@@ -210,7 +158,8 @@ class HyperbolicCutShape(BasisShape):
         :type direction: integer.
         """
         if mode == "lex":
-            return self._get_index_iterator_lex()
+            # The index table is stored in lexicographical order
+            return iter(self)
         elif mode == "chain":
             if direction < self._dimension:
                 return self._get_index_iterator_chain(direction=direction)
@@ -227,53 +176,3 @@ class HyperbolicCutShape(BasisShape):
         :return: A tuple of the maximum of the multi-index in each direction.
         """
         return tuple(self._dimension * [self._sparsity-1])
-
-
-    def get_neighbours(self, k, selection=None, direction=None):
-        r"""
-        Returns a list of all multi-indices that are neighbours of a given
-        multi-index :math:`k`. A direct neighbour is defined as
-        :math:`(k_0, \ldots, k_d \pm 1, \ldots, k_{D-1}) \forall d \in [0 \ldots D-1]`.
-
-        :param k: The multi-index of which we want to get the neighbours.
-        :type k: tuple
-        :param selection:
-        :type selection: string with fixed values ``forward``, ``backward`` or ``all``.
-                         The values ``all`` is equivalent to the value ``None`` (default).
-        :param direction: The direction :math:`0 \leq d < D` in which we want to find
-                          the neighbours :math:`k \pm e_d`.
-        :type direction: int
-        :return: A list containing the pairs :math:`(d, k^\prime)`.
-        """
-        assert len(tuple(k)) == self._dimension
-
-        # First build a list of potential neighbours
-        I = eye(self._dimension, dtype=integer)
-        ki = vstack(k)
-
-        # Forward and backward direct neighbours
-        nbfw = ki + I
-        nbbw = ki - I
-
-        # Keep only the valid ones
-        nbh = []
-
-        if direction is not None:
-            directions = [ direction ]
-        else:
-            directions = xrange(self._dimension)
-
-        for d in directions:
-            nfw = tuple(nbfw[:,d])
-            nbw = tuple(nbbw[:,d])
-
-            # TODO: Try to simplify these nested if blocks
-            if selection in ("backward", "all", None):
-                if nbw in self:
-                    nbh.append((d, nbw))
-
-            if selection in ("forward", "all", None):
-                if nfw in self:
-                    nbh.append((d, nfw))
-
-        return nbh
@@ -199,6 +199,50 @@ def save_inhomogwavepacket_basisshapes(self, basisshape, blockid=0):
         # TODO: Consider to save the mapping. Do we want or need this?
 
 
+def add_inhomogwavepacket_adaptations(self, blockid=0):
+    r"""Add storage for logging the adaptations of the basis shapes. Each
+    event is stored as a row ``(timestep, component, old hash, new hash,
+    old basis size, new basis size)``.
+
+    :param blockid: The ID of the data block to operate on.
+    """
+    grp_wp = self._srf[self._prefixb+str(blockid)]["wavepacket_inhomog"]
+    daset = grp_wp.create_dataset("basis_shape_adaptations", (0, 6), dtype=np.integer, chunks=True, maxshape=(None,6))
+    daset.attrs["pointer"] = 0
+
+
+def save_inhomogwavepacket_adaptation(self, component, oldshape, newshape, timestep=None, blockid=0):
+    r"""Log a pruning or growth event of the basis shape of a component.
+    The new basis shape is saved as well.
+
+    :param component: The index :math:`i` of the component :math:`\Phi_i`.
+    :param oldshape: The basis shape before the adaptation.
+    :param newshape: The basis shape after the adaptation.
+    :param timestep: The timestep at which the adaptation happened.
+    :param blockid: The ID of the data block to operate on.
+    """
+    pathd = "/"+self._prefixb+str(blockid)+"/wavepacket_inhomog/basis_shape_adaptations"
+
+    self.save_inhomogwavepacket_basisshapes(newshape, blockid=blockid)
+
+    index = self._srf[pathd].attrs["pointer"]
+    self.must_resize(pathd, index)
+    self._srf[pathd][index,:] = (timestep, component, hash(oldshape), hash(newshape),
+                                 oldshape.get_basis_size(), newshape.get_basis_size())
+    self._srf[pathd].attrs["pointer"] += 1
+
+
+def load_inhomogwavepacket_adaptations(self, blockid=0):
+    r"""Load the log of all adaptations of the basis shapes.
+
+    :param blockid: The ID of the data block to operate on.
+    :return: An integer ndarray with one row ``(timestep, component, old hash,
+             new hash, old basis size, new basis size)`` per event.
+    """
+    pathd = "/"+self._prefixb+str(blockid)+"/wavepacket_inhomog/basis_shape_adaptations"
+    return self._srf[pathd][:self._srf[pathd].attrs["pointer"],:]
+
+
 def load_inhomogwavepacket_description(self, blockid=0):
     pathd = "/"+self._prefixb+str(blockid)+"/wavepacket_inhomog"
 
@@ -215,6 +215,50 @@ def save_wavepacket_basisshapes(self, basisshape, blockid=0):
         # TODO: Consider to save the mapping. Do we want or need this?
 
 
+def add_wavepacket_adaptations(self, blockid=0):
+    r"""Add storage for logging the adaptations of the basis shapes. Each
+    event is stored as a row ``(timestep, component, old hash, new hash,
+    old basis size, new basis size)``.
+
+    :param blockid: The ID of the data block to operate on.
+    """
+    grp_wp = self._srf[self._prefixb+str(blockid)]["wavepacket"]
+    daset = grp_wp.create_dataset("basis_shape_adaptations", (0, 6), dtype=np.integer, chunks=True, maxshape=(None,6))
+    daset.attrs["pointer"] = 0
+
+
+def save_wavepacket_adaptation(self, component, oldshape, newshape, timestep=None, blockid=0):
+    r"""Log a pruning or growth event of the basis shape of a component.
+    The new basis shape is saved as well.
+
+    :param component: The index :math:`i` of the component :math:`\Phi_i`.
+    :param oldshape: The basis shape before the adaptation.
+    :param newshape: The basis shape after the adaptation.
+    :param timestep: The timestep at which the adaptation happened.
+    :param blockid: The ID of the data block to operate on.
+    """
+    pathd = "/"+self._prefixb+str(blockid)+"/wavepacket/basis_shape_adaptations"
+
+    self.save_wavepacket_basisshapes(newshape, blockid=blockid)
+
+    index = self._srf[pathd].attrs["pointer"]
+    self.must_resize(pathd, index)
+    self._srf[pathd][index,:] = (timestep, component, hash(oldshape), hash(newshape),
+                                 oldshape.get_basis_size(), newshape.get_basis_size())
+    self._srf[pathd].attrs["pointer"] += 1
+
+
+def load_wavepacket_adaptations(self, blockid=0):
+    r"""Load the log of all adaptations of the basis shapes.
+
+    :param blockid: The ID of the data block to operate on.
+    :return: An integer ndarray with one row ``(timestep, component, old hash,
+             new hash, old basis size, new basis size)`` per event.
+    """
+    pathd = "/"+self._prefixb+str(blockid)+"/wavepacket/basis_shape_adaptations"
+    return self._srf[pathd][:self._srf[pathd].attrs["pointer"],:]
+
+
 def load_wavepacket_description(self, blockid=0):
     r"""Load the wavepacket description.
 
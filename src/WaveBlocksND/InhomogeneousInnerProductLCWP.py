@@ -13,6 +13,7 @@ arbitrary operator.
 from numpy import zeros, complexfloating, conjugate, transpose, dot
 
 from InnerProduct import InnerProduct
+from GaussianIntegral import GaussianIntegral
 
 __all__ = ["InhomogeneousInnerProductLCWP"]
 
@@ -77,6 +78,34 @@ class InhomogeneousInnerProductLCWP(InnerProduct):
             self._obey_oracle = False
 
 
+    def _build_matrix_stacked(self, pacbras, packets, operator=None):
+        r"""Compute the matrix elements of all pairs of wavepackets at once
+        if the delegate supports this. Currently this applies to the
+        :py:class:`GaussianIntegral` and the identity operator only.
+
+        :param pacbras: The wavepackets :math:`\Psi_j` from the bra.
+        :param packets: The wavepackets :math:`\Psi_j^\prime` from the ket.
+        :param operator: The operator of the inner product.
+        :return: A matrix of size :math:`J \times J^\prime` or ``None``.
+        """
+        quad = self._quad.get_quadrature()
+        if operator is not None or not isinstance(quad, GaussianIntegral):
+            return None
+        if len(pacbras) == 0 or len(packets) == 0:
+            return None
+
+        # TODO: Handle multi-component packets
+        M = quad.perform_quadrature_stacked(pacbras, packets, 0, 0)
+
+        if self._obey_oracle:
+            for row, pacbra in enumerate(pacbras):
+                for col, packet in enumerate(packets):
+                    if not self._oracle.is_not_zero(pacbra, packet):
+                        M[row, col] = 0.0
+
+        return M
+
+
     def quadrature(self, lcbra, lcket=None, operator=None, component=None):
         r"""Delegates the evaluation of :math:`\langle\Upsilon|f|\Upsilon^\prime\rangle` for a general
         function :math:`f(x)` with :math:`x \in \mathbb{R}^D`.
@@ -94,17 +123,20 @@ class InhomogeneousInnerProductLCWP(InnerProduct):
         Jbra = lcbra.get_number_packets()
         Jket = lcket.get_number_packets()
 
-        M = zeros((Jbra, Jket), dtype=complexfloating)
+        M = self._build_matrix_stacked(lcbra.get_wavepackets(), lcket.get_wavepackets(), operator=operator)
 
-        for row, pacbra in enumerate(lcbra.get_wavepackets()):
-            for col, packet in enumerate(lcket.get_wavepackets()):
-                if self._obey_oracle:
-                    if self._oracle.is_not_zero(pacbra, packet):
+        if M is None:
+            M = zeros((Jbra, Jket), dtype=complexfloating)
+
+            for row, pacbra in enumerate(lcbra.get_wavepackets()):
+                for col, packet in enumerate(lcket.get_wavepackets()):
+                    if self._obey_oracle:
+                        if self._oracle.is_not_zero(pacbra, packet):
+                            # TODO: Handle multi-component packets
+                            M[row, col] = self._quad.quadrature(pacbra, packet, operator=operator, component=0)
+                    else:
                         # TODO: Handle multi-component packets
                         M[row, col] = self._quad.quadrature(pacbra, packet, operator=operator, component=0)
-                else:
-                    # TODO: Handle multi-component packets
-                    M[row, col] = self._quad.quadrature(pacbra, packet, operator=operator, component=0)
 
         cbra = lcbra.get_coefficients()
         cket = lcket.get_coefficients()
@@ -130,16 +162,19 @@ class InhomogeneousInnerProductLCWP(InnerProduct):
         Jbra = lcbra.get_number_packets()
         Jket = lcket.get_number_packets()
 
-        M = zeros((Jbra, Jket), dtype=complexfloating)
+        M = self._build_matrix_stacked(lcbra.get_wavepackets(), lcket.get_wavepackets(), operator=operator)
+
+        if M is None:
+            M = zeros((Jbra, Jket), dtype=complexfloating)
 
-        for row, pacbra in enumerate(lcbra.get_wavepackets()):
-            for col, packet in enumerate(lcket.get_wavepackets()):
-                if self._obey_oracle:
-                    if self._oracle.is_not_zero(pacbra, packet):
+            for row, pacbra in enumerate(lcbra.get_wavepackets()):
+                for col, packet in enumerate(lcket.get_wavepackets()):
+                    if self._obey_oracle:
+                        if self._oracle.is_not_zero(pacbra, packet):
+                            # TODO: Handle multi-component packets
+                            M[row, col] = self._quad.quadrature(pacbra, packet, operator=operator, component=0)
+                    else:
                         # TODO: Handle multi-component packets
                         M[row, col] = self._quad.quadrature(pacbra, packet, operator=operator, component=0)
-                else:
-                    # TODO: Handle multi-component packets
-                    M[row, col] = self._quad.quadrature(pacbra, packet, operator=operator, component=0)
 
         return M
@@ -0,0 +1,132 @@
+"""The WaveBlocks Project
+
+This file contains a simple bounded cache with a
+least recently used eviction policy.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from collections import OrderedDict
+
+__all__ = ["LRUCache"]
+
+
+class LRUCache(object):
+    r"""A bounded associative container. If the total size of the stored
+    items exceeds the maximal size, the least recently used items get evicted.
+    Each item has size 1 unless stated otherwise when it is stored.
+    """
+
+    def __init__(self, maxsize=64):
+        r"""
+        :param maxsize: The maximal total size of the items kept in the cache.
+        :type maxsize: int, default is 64.
+        """
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._maxsize = maxsize
+        self._size = 0
+
+        # Usage statistics
+        self._hits = 0
+        self._misses = 0
+
+
+    def __len__(self):
+        r""":return: The number of items currently stored.
+        """
+        return len(self._data)
+
+
+    def __contains__(self, key):
+        r"""Checks if the cache holds an item for the given ``key``.
+        This does not count as usage of the item.
+        """
+        return key in self._data
+
+
+    def get(self, key, default=None):
+        r"""Retrieve the item stored under the given ``key``.
+
+        :param key: The key of the item.
+        :param default: The value returned if there is no such item.
+        :return: The item or ``default``.
+        """
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self._misses += 1
+            return default
+
+        # Mark as most recently used
+        self._data[key] = value
+        self._hits += 1
+        return value
+
+
+    def put(self, key, value, size=1):
+        r"""Store an item under the given ``key`` and evict
+        the least recently used items if necessary.
+
+        :param key: The key of the item.
+        :param value: The item.
+        :param size: The size accounted for this item.
+        :type size: int, default is 1.
+        """
+        if key in self._data:
+            del self._data[key]
+            self._size -= self._sizes.pop(key)
+        self._data[key] = value
+        self._sizes[key] = size
+        self._size += size
+
+        self._evict()
+
+
+    def _evict(self):
+        r"""Evict the least recently used items until the total size is within bounds.
+        """
+        while self._size > self._maxsize:
+            key, value = self._data.popitem(last=False)
+            self._size -= self._sizes.pop(key)
+
+
+    def clear(self):
+        r"""Remove all items from the cache and reset the statistics.
+        """
+        self._data.clear()
+        self._sizes.clear()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+
+    def get_maxsize(self):
+        r""":return: The maximal total size of the items kept in the cache.
+        """
+        return self._maxsize
+
+
+    def set_maxsize(self, maxsize):
+        r"""Change the maximal total size of the items kept in the cache.
+
+        :param maxsize: The new bound.
+        :type maxsize: int
+        """
+        self._maxsize = maxsize
+        self._evict()
+
+
+    def get_statistics(self):
+        r"""Return some usage statistics of this cache.
+
+        :return: A ``dict`` containing the number of ``hits``, ``misses``,
+                 stored ``items``, their total ``size`` and the ``maxsize``.
+        """
+        return {"hits": self._hits,
+                "misses": self._misses,
+                "items": len(self._data),
+                "size": self._size,
+                "maxsize": self._maxsize}
@@ -8,10 +8,8 @@ basis shape which is a special type of sparse basis set.
 @license: Modified BSD License
 """
 
-from numpy import eye, vstack, integer
-
 from BasisShape import BasisShape
-from HyperbolicCutShape import HyperbolicCutShape
+from HyperbolicCutShape import hyperbolic_cut_indices
 
 __all__ = ["LimitedHyperbolicCutShape"]
 
@@ -45,14 +43,8 @@ class LimitedHyperbolicCutShape(BasisShape):
         # The limits
         self._limits = tuple(limits)
 
-        # The linear mapping k -> index for the basis
-        iil = self._get_index_iterator_lex()
-        self._lima = {k:index for index, k in enumerate(iil)}
-        # And the inverse mapping
-        self._lima_inv = {v:k for k, v in self._lima.iteritems()}
-
-        # The basis size
-        self._basissize = len(self._lima)
+        # The table of all multi-indices k in linear order
+        self._set_index_table(hyperbolic_cut_indices(D, K, self._limits))
 
 
     def __str__(self):
@@ -71,53 +63,6 @@ class LimitedHyperbolicCutShape(BasisShape):
         return hash(("LimitedHyperbolicCutShape", self._dimension, self._sparsity, self._limits))
 
 
-    def __getitem__(self, k):
-        r"""Make map look ups.
-        """
-        if type(k) is tuple or type(k) is list:
-            k = tuple(k)
-            assert len(k) == self._dimension
-            if k in self._lima:
-                return self._lima[k]
-        elif type(k) is int:
-            if k in self._lima_inv:
-                return self._lima_inv[k]
-        else:
-            raise IndexError("Wrong index type")
-
-
-    def __contains__(self, k):
-        r"""
-        Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
-
-        :param k: The multi-index :math:`k` we want to test.
-        :type k: tuple
-        """
-        assert len(tuple(k)) == self._dimension
-        return tuple(k) in self._lima
-
-
-    def __iter__(self):
-        r"""Implements iteration over the multi-indices :math:`k`
-        of the basis set :math:`\mathfrak{K}`.
-
-        Note: The order of iteration is NOT fixed. If you need a special
-        iteration scheme, use :py:meth:`get_node_iterator`.
-        """
-        # TODO: Better remove this as it may cause unexpected behaviour?
-        return iter(self._lima)
-
-
-    def contains(self, k):
-        r"""
-        Checks if a given multi-index :math:`k` is part of the basis set :math:`\mathfrak{K}`.
-
-        :param k: The multi-index :math:`k` we want to test.
-        :type k: tuple
-        """
-        return tuple(k) in self._lima
-
-
     def get_description(self):
         r"""Return a description of this basis shape object.
         A description is a ``dict`` containing all key-value pairs
@@ -149,40 +94,17 @@ class LimitedHyperbolicCutShape(BasisShape):
             # Special casing K = 2**(D-1) * (K+1) for D = 1
             new_sparsity = K + 1
 
+        from BlockFactory import BlockFactory
         if tight is True:
             new_limits = tuple([ l+1 for l in self._limits ])
-            return LimitedHyperbolicCutShape(D, new_sparsity, new_limits)
+            return BlockFactory().create_basis_shape({"type": "LimitedHyperbolicCutShape",
+                                                      "dimension": D,
+                                                      "K": new_sparsity,
+                                                      "limits": new_limits})
         else:
-            return HyperbolicCutShape(D, new_sparsity)
-
-
-    def _get_index_iterator_lex(self):
-        r"""
-        """
-        # The hyperbolic cut parameter
-        sparsity = self._sparsity
-        # Upper bounds in each dimension
-        bounds = self._limits[::-1]
-
-        def index_iterator_lex(S, bounds):
-            # Initialize a counter
-            z = [0 for i in xrange(self._dimension + 1)]
-
-            while z[self._dimension] == 0:
-                # Yield the current index vector
-                yield tuple(reversed(z[:-1]))
-
-                # Increment fastest varying bit
-                z[0] += 1
-
-                # Reset overflows
-                for d in xrange(self._dimension):
-                    K = reduce(lambda x,y: x*(y+1), z[:-1], 1)
-                    if z[d] >= bounds[d] or K > S:
-                        z[d] = 0
-                        z[d+1] += 1
-
-        return index_iterator_lex(sparsity, bounds)
+            return BlockFactory().create_basis_shape({"type": "HyperbolicCutShape",
+                                                      "dimension": D,
+                                                      "K": new_sparsity})
 
 
     def _get_index_iterator_chain(self, direction=0):
@@ -230,7 +152,8 @@ class LimitedHyperbolicCutShape(BasisShape):
         :type direction: integer.
         """
         if mode == "lex":
-            return self._get_index_iterator_lex()
+            # The index table is stored in lexicographical order
+            return iter(self)
         elif mode == "chain":
             if direction < self._dimension:
                 return self._get_index_iterator_chain(direction=direction)
@@ -247,53 +170,3 @@ class LimitedHyperbolicCutShape(BasisShape):
         :return: A tuple of the maximum of the multi-index in each direction.
         """
         return tuple(self._limits)
-
-
-    def get_neighbours(self, k, selection=None, direction=None):
-        r"""
-        Returns a list of all multi-indices that are neighbours of a given
-        multi-index :math:`k`. A direct neighbour is defined as
-        :math:`(k_0, \ldots, k_d \pm 1, \ldots, k_{D-1}) \forall d \in [0 \ldots D-1]`.
-
-        :param k: The multi-index of which we want to get the neighbours.
-        :type k: tuple
-        :param selection:
-        :type selection: string with fixed values ``forward``, ``backward`` or ``all``.
-                         The values ``all`` is equivalent to the value ``None`` (default).
-        :param direction: The direction :math:`0 \leq d < D` in which we want to find
-                          the neighbours :math:`k \pm e_d`.
-        :type direction: int
-        :return: A list containing the pairs :math:`(d, k^\prime)`.
-        """
-        assert len(tuple(k)) == self._dimension
-
-        # First build a list of potential neighbours
-        I = eye(self._dimension, dtype=integer)
-        ki = vstack(k)
-
-        # Forward and backward direct neighbours
-        nbfw = ki + I
-        nbbw = ki - I
-
-        # Keep only the valid ones
-        nbh = []
-
-        if direction is not None:
-            directions = [ direction ]
-        else:
-            directions = xrange(self._dimension)
-
-        for d in directions:
-            nfw = tuple(nbfw[:,d])
-            nbw = tuple(nbbw[:,d])
-
-            # TODO: Try to simplify these nested if blocks
-            if selection in ("backward", "all", None):
-                if nbw in self:
-                    nbh.append((d, nbw))
-
-            if selection in ("forward", "all", None):
-                if nfw in self:
-                    nbh.append((d, nfw))
-
-        return nbh
@@ -203,7 +203,7 @@ class LinearCombinationOfWPs(LinearCombinationOfWavepackets):
         self._coefficients = coefficients.copy().reshape((-1,1))
 
 
-    def evaluate_at(self, grid, component=None):
+    def evaluate_at(self, grid, component=None, workers=None):
         r"""Evaluate the linear combination of wavepackets :math:`\Upsilon` at
         the given nodes :math:`\gamma`.
 
@@ -211,6 +211,10 @@ class LinearCombinationOfWPs(LinearCombinationOfWavepackets):
         :type grid: A class having a :py:meth:`get_nodes` method.
         :param component: The index :math:`i` of a single component to evaluate.
                           (Defaults to ``None`` for evaluating all components.)
+        :param workers: The number of threads the nodes get distributed to when
+                        evaluating the individual packets. (Default is ``None``
+                        which means no threading.)
+        :type workers: int
         :return: A list of arrays or a single array containing the values of the
                  :math:`\Phi_i` at the nodes :math:`\gamma`.
         """
@@ -219,14 +223,14 @@ class LinearCombinationOfWPs(LinearCombinationOfWavepackets):
 
         # Split one off to get the result array shape
         if self._number_packets > 0:
-            vals = self._packets[0].evaluate_at(grid, component=component, prefactor=True)
+            vals = self._packets[0].evaluate_at(grid, component=component, prefactor=True, workers=workers)
             if component is None:
                 result = [ self._coefficients[0] * val for val in vals ]
             else:
                 result = self._coefficients[0] * vals
 
         for index, packet in enumerate(self._packets[1:]):
-            vals = packet.evaluate_at(grid, component=component, prefactor=True)
+            vals = packet.evaluate_at(grid, component=component, prefactor=True, workers=workers)
             if component is None:
                 result = [ res + self._coefficients[index+1] * val for res, val in zip(result, vals) ]
             else:
@@ -15,6 +15,7 @@ import numpy
 from MatrixPotential import MatrixPotential
 from Grid import Grid
 from GridWrapper import GridWrapper
+from FusedLambdify import lambdify_fused
 import GlobalDefaults
 
 __all__ = ["MatrixPotential1S"]
@@ -238,7 +239,7 @@ class MatrixPotential1S(MatrixPotential):
         if self._jacobian_s is None:
             # TODO: Add symbolic simplification
             self._jacobian_s = self._potential_s.jacobian(self._variables).T
-            self._jacobian_n = tuple([ sympy.lambdify(self._variables, entry, "numpy") for entry in self._jacobian_s ])
+            self._jacobian_n = lambdify_fused(self._variables, self._jacobian_s, dtype=numpy.complexfloating)
 
 
     def evaluate_jacobian_at(self, grid, component=None):
@@ -256,15 +257,8 @@ class MatrixPotential1S(MatrixPotential):
         grid = self._grid_wrap(grid)
         nodes = grid.get_nodes(split=True)
 
-        D = self._dimension
-        N = grid.get_number_nodes(overall=True)
-
-        J = numpy.zeros((D,N), dtype=numpy.complexfloating)
-
-        for row in xrange(D):
-            J[row, :] = self._jacobian_n[row](*nodes)
-
-        return J
+        # All D entries in a single call of shape (D, #gridnodes)
+        return self._jacobian_n(*nodes)
 
 
     def calculate_hessian(self):
@@ -275,7 +269,7 @@ class MatrixPotential1S(MatrixPotential):
         if self._hessian_s is None:
             # TODO: Add symbolic simplification
             self._hessian_s = sympy.hessian(self._potential_s[0,0], self._variables)
-            self._hessian_n = tuple([ sympy.lambdify(self._variables, entry, "numpy") for entry in self._hessian_s ])
+            self._hessian_n = lambdify_fused(self._variables, self._hessian_s, dtype=numpy.complexfloating)
 
 
     def evaluate_hessian_at(self, grid, component=None):
@@ -296,11 +290,8 @@ class MatrixPotential1S(MatrixPotential):
         D = self._dimension
         N = grid.get_number_nodes(overall=True)
 
-        H = numpy.zeros((N,D,D), dtype=numpy.complexfloating)
-
-        for row in xrange(D):
-            for col in xrange(D):
-                H[:, row, col] = self._hessian_n[row*D+col](*nodes)
+        # All D*D entries in a single call of shape (D*D, #gridnodes)
+        H = self._hessian_n(*nodes).T.reshape((N,D,D))
 
         # 'squeeze' would be dangerous here, make sure it works in the 1D case too
         if N == 1:
@@ -15,6 +15,7 @@ import numpy
 from MatrixPotential import MatrixPotential
 from Grid import Grid
 from GridWrapper import GridWrapper
+from FusedLambdify import lambdify_fused
 import GlobalDefaults
 
 __all__ = ["MatrixPotential2S"]
@@ -56,10 +57,12 @@ class MatrixPotential2S(MatrixPotential):
         # The the potential, symbolic expressions and evaluatable functions
         self._potential_s = expression
         self._potential_n = tuple([ sympy.lambdify(self._variables, entry, "numpy") for entry in self._potential_s ])
+        self._potential_fused_n = lambdify_fused(self._variables, self._potential_s)
 
         # The cached eigenvalues, symbolic expressions and evaluatable functions
         self._eigenvalues_s = None
         self._eigenvalues_n = None
+        self._eigenvalues_fused_n = None
 
         # The cached eigenvectors, symbolic expressions and evaluatable functions
         self._eigenvectors_s = None
@@ -128,6 +131,12 @@ class MatrixPotential2S(MatrixPotential):
 
         nodes = grid.get_nodes(split=True)
 
+        if entry is None:
+            # Evaluate all entries at once sharing common subexpressions
+            values = self._potential_fused_n(*nodes)
+            N = grid.get_number_nodes(overall=True)
+            return [ values[index,:].reshape((1,N)) for index in entries ]
+
         for index in entries:
             # Evaluate the potential at the given nodes
             values = self._potential_n[index](*nodes)
@@ -175,6 +184,7 @@ class MatrixPotential2S(MatrixPotential):
 
         # The numerical functions for the eigenvalues
         self._eigenvalues_n = tuple([ sympy.lambdify(self._variables, item, "numpy") for item in self._eigenvalues_s ])
+        self._eigenvalues_fused_n = lambdify_fused(self._variables, self._eigenvalues_s)
 
 
     def evaluate_eigenvalues_at(self, grid, entry=None, as_matrix=False):
@@ -216,15 +226,20 @@ class MatrixPotential2S(MatrixPotential):
 
         tmp = []
 
-        for index in diags:
-            # Evaluate the eigenvalue at the given nodes
-            values = self._eigenvalues_n[index]( *nodes )
+        if len(diags) > 1:
+            # Evaluate both eigenvalues at once sharing common subexpressions
+            values = self._eigenvalues_fused_n(*nodes)
+            tmp = [ values[index,:] for index in diags ]
+        else:
+            for index in diags:
+                # Evaluate the eigenvalue at the given nodes
+                values = self._eigenvalues_n[index]( *nodes )
 
-            # Test for eigenvalue being constant
-            if numpy.atleast_1d(values).shape == (1,):
-                values = values * numpy.ones(grid.get_number_nodes(), dtype=numpy.complexfloating)
+                # Test for eigenvalue being constant
+                if numpy.atleast_1d(values).shape == (1,):
+                    values = values * numpy.ones(grid.get_number_nodes(), dtype=numpy.complexfloating)
 
-            tmp.append(values)
+                tmp.append(values)
 
         # Sort the eigenvalues pointwise. We can do this because we
         # assume that the different eigenvalues never cross.
@@ -408,8 +423,7 @@ class MatrixPotential2S(MatrixPotential):
 
             # Attention, the components get listed in columns-wise order!
             for jacobian in self._jacobian_s:
-                self._jacobian_n.append([ sympy.lambdify(self._variables, component, "numpy")
-                                          for component in jacobian ])
+                self._jacobian_n.append( lambdify_fused(self._variables, jacobian, dtype=numpy.complexfloating) )
 
 
     def evaluate_jacobian_at(self, grid, component=None):
@@ -428,9 +442,6 @@ class MatrixPotential2S(MatrixPotential):
         grid = self._grid_wrap(grid)
         nodes = grid.get_nodes(split=True)
 
-        D = self._dimension
-        N = grid.get_number_nodes(overall=True)
-
         if component is not None:
             indices = [ component ]
         else:
@@ -439,11 +450,8 @@ class MatrixPotential2S(MatrixPotential):
         result = []
 
         for i in indices:
-            jacobian = self._jacobian_n[i]
-            J = numpy.zeros((D,N), dtype=numpy.complexfloating)
-            for index, comp in enumerate(jacobian):
-                J[index, :] = comp(*nodes)
-            result.append(J)
+            # All D entries in a single call of shape (D, #gridnodes)
+            result.append( self._jacobian_n[i](*nodes) )
 
         # TODO: Consider unpacking single ndarray iff entry != None
         if component is not None:
@@ -469,8 +477,7 @@ class MatrixPotential2S(MatrixPotential):
             self._hessian_n = []
 
             for hessian in self._hessian_s:
-                self._hessian_n.append([ sympy.lambdify(self._variables, entry, "numpy")
-                                         for entry in hessian ])
+                self._hessian_n.append( lambdify_fused(self._variables, hessian, dtype=numpy.complexfloating) )
 
 
     def evaluate_hessian_at(self, grid, component=None):
@@ -500,12 +507,8 @@ class MatrixPotential2S(MatrixPotential):
         result = []
 
         for i in indices:
-            hessian = self._hessian_n[i]
-            H = numpy.zeros((N,D,D), dtype=numpy.complexfloating)
-
-            for row in xrange(D):
-                for col in xrange(D):
-                    H[:, row, col] = hessian[row*D+col](*nodes)
+            # All D*D entries in a single call of shape (D*D, #gridnodes)
+            H = self._hessian_n[i](*nodes).T.reshape((N,D,D))
 
             # 'squeeze' would be dangerous here, make sure it works in the 1D case too
             if N == 1:
@@ -12,11 +12,11 @@ The number of space dimensions can be arbitrary, :math:`x \in \mathbb{R}^D`.
 
 import sympy
 import numpy
-from scipy import linalg
 
 from MatrixPotential import MatrixPotential
 from Grid import Grid
 from GridWrapper import GridWrapper
+from FusedLambdify import lambdify_fused
 import GlobalDefaults
 
 __all__ = ["MatrixPotentialMS"]
@@ -51,6 +51,12 @@ class MatrixPotentialMS(MatrixPotential):
         else:
             self._continuous_eigenvectors = GlobalDefaults.__dict__["continuous_eigenvectors"]
 
+        # The maximal number of nodes per block in the batched eigen decompositions
+        if kwargs.has_key("eigensolver_chunksize"):
+            self._chunksize = kwargs["eigensolver_chunksize"]
+        else:
+            self._chunksize = GlobalDefaults.__dict__["eigensolver_chunksize"]
+
         # This number of energy levels.
         assert expression.is_square
         # We handle the general NxN case here
@@ -59,6 +65,7 @@ class MatrixPotentialMS(MatrixPotential):
         # The the potential, symbolic expressions and evaluatable functions
         self._potential_s = expression
         self._potential_n = tuple([ sympy.lambdify(self._variables, entry, "numpy") for entry in self._potential_s ])
+        self._potential_fused_n = lambdify_fused(self._variables, self._potential_s)
 
         # The Jacobian and Hessian matrices of all entries of V
         self._JV_s = None
@@ -77,6 +84,34 @@ class MatrixPotentialMS(MatrixPotential):
         return grid
 
 
+    def _evaluate_matrix_at(self, grid):
+        r"""Evaluate the potential :math:`V(x)` on a grid :math:`\Gamma` and
+        stack the values into one matrix per node.
+
+        :param grid: The grid containing the nodes :math:`\gamma_i`.
+        :return: An ndarray of shape :math:`(|\Gamma|, N, N)`.
+        """
+        N = self._number_components
+        n = grid.get_number_nodes(overall=True)
+
+        # All N*N entries in a single call of shape (N*N, #gridnodes)
+        values = self._potential_fused_n(*grid.get_nodes(split=True))
+
+        return numpy.ascontiguousarray(values.T, dtype=numpy.complexfloating).reshape((n, N, N))
+
+
+    def _get_node_chunks(self, n):
+        r"""Split the :math:`n` grid nodes into blocks processed at once by the
+        batched eigen solvers. This bounds the size of the temporary arrays.
+
+        :param n: The number of nodes.
+        :return: A list of ``slice`` instances.
+        """
+        chunksize = self._chunksize if self._chunksize is not None else n
+        chunksize = max(chunksize, 1)
+        return [ slice(i, min(i+chunksize, n)) for i in xrange(0, n, chunksize) ]
+
+
     def evaluate_at(self, grid, entry=None, as_matrix=True):
         r"""Evaluate the potential :math:`V(x)` elementwise on a grid :math:`\Gamma`.
 
@@ -104,6 +139,12 @@ class MatrixPotentialMS(MatrixPotential):
 
         nodes = grid.get_nodes(split=True)
 
+        if entry is None:
+            # Evaluate all entries at once sharing common subexpressions
+            values = self._potential_fused_n(*nodes)
+            N = grid.get_number_nodes(overall=True)
+            return tuple([ values[index,:].reshape((1,N)) for index in entries ])
+
         for index in entries:
             # Evaluate the potential at the given nodes
             values = self._potential_n[index](*nodes)
@@ -157,29 +198,21 @@ class MatrixPotentialMS(MatrixPotential):
             if row != col:
                 return numpy.zeros((1, n), dtype=numpy.complexfloating)
 
-        # Memory for storing temporary values
-        tmppot = numpy.ndarray((n, N, N), dtype=numpy.complexfloating)
-        tmpew = numpy.ndarray((n, N), dtype=numpy.complexfloating)
-
         # Evaluate potential
-        values = self.evaluate_at(grid)
-
-        # Fill in values
-        for row in xrange(N):
-            for col in xrange(N):
-                tmppot[:, row, col] = values[N*row + col]
+        tmppot = self._evaluate_matrix_at(grid)
+        tmpew = numpy.ndarray((n, N), dtype=numpy.complexfloating)
 
         # Calculate eigenvalues assuming hermitian matrix (eigvalsh for stability!)
-        for i in xrange(n):
-            ew = linalg.eigvalsh(tmppot[i,:,:])
+        # The batched solver returns the eigenvalues in ascending order
+        for chunk in self._get_node_chunks(n):
+            ew = numpy.linalg.eigvalsh(tmppot[chunk,:,:])
             if sorted is True:
                 # Sorting the eigenvalues, biggest first.
                 # TODO: Sort will fail iff energy level cross!
-                ew.sort()
-                tmpew[i,:] = ew[::-1]
+                tmpew[chunk,:] = ew[:,::-1]
             else:
                 # Do not sort
-                tmpew[i,:] = ew[:]
+                tmpew[chunk,:] = ew
 
         # Split the data into different eigenvalues
         tmp = [ tmpew[:,index].reshape((1,n)) for index in xrange(N) ]
@@ -224,38 +257,29 @@ class MatrixPotentialMS(MatrixPotential):
         N = self._number_components
         n = grid.get_number_nodes(overall=True)
 
-        # Memory for storing temporary values
-        tmppot = numpy.ndarray((n, N, N), dtype=numpy.complexfloating)
-        tmpev = numpy.ndarray((n, N, N), dtype=numpy.complexfloating)
-
         # Evaluate potential
-        values = self.evaluate_at(grid)
-
-        # Fill in values
-        for row in xrange(N):
-            for col in xrange(N):
-                tmppot[:, row, col] = values[N*row + col]
+        tmppot = self._evaluate_matrix_at(grid)
+        tmpev = numpy.ndarray((n, N, N), dtype=numpy.complexfloating)
 
         # Calculate eigenvectors assuming hermitian matrix (eigh for stability!)
-        for i in xrange(0, n):
-            ew, ev = linalg.eigh(tmppot[i,:,:])
+        # The batched solver returns the eigenvalues in ascending order
+        for chunk in self._get_node_chunks(n):
+            ew, ev = numpy.linalg.eigh(tmppot[chunk,:,:])
             if sorted is True:
                 # Sorting the eigenvectors in the same order as the eigenvalues.
-                ind = numpy.argsort(ew)
-                ind = ind[::-1]
-                evs = ev[:,ind]
-                tmpev[i,:,:] = evs
+                tmpev[chunk,:,:] = ev[:,:,::-1]
             else:
                 # No sorting
-                tmpev[i,:,:] = ev
+                tmpev[chunk,:,:] = ev
 
         # A trick due to G. Hagedorn to get continuous eigenvectors
         # TODO: Not sure if it works in higher dimensions too! (Probably it does not)
-        if self._continuous_eigenvectors is True:
-            for i in xrange(1,n):
-                for ev in xrange(0,N):
-                    if numpy.dot(tmpev[i,:,ev],tmpev[i-1,:,ev]) < 0:
-                        tmpev[i,:,ev] *= -1
+        if self._continuous_eigenvectors is True and n > 1:
+            # Flip the sign whenever the overlap with the previous (flipped) vector is negative
+            overlaps = numpy.real(numpy.einsum("ijk,ijk->ik", tmpev[1:,:,:], tmpev[:-1,:,:]))
+            signs = numpy.ones((n, N))
+            signs[1:,:] = numpy.cumprod(numpy.where(overlaps < 0, -1.0, 1.0), axis=0)
+            tmpev = tmpev * signs[:,numpy.newaxis,:]
 
         return tuple([ numpy.transpose(tmpev[:,:,index]) for index in xrange(N) ])
 
@@ -288,20 +312,14 @@ class MatrixPotentialMS(MatrixPotential):
         N = self._number_components
         n = grid.get_number_nodes(overall=True)
 
-        # Memory for storing temporary values
-        tmp = numpy.ndarray((n,N,N), dtype=numpy.complexfloating)
-
         # Evaluate potential
-        values = self.evaluate_at(grid)
+        tmp = self._evaluate_matrix_at(grid)
 
-        # Fill in values
-        for row in xrange(N):
-            for col in xrange(N):
-                tmp[:, row, col] = self._factor * values[N*row + col]
-
-        # Calculate exponential
-        for i in xrange(n):
-            tmp[i,:,:] = linalg.expm(tmp[i,:,:], 10)
+        # Calculate exponential exp(alpha V) = U exp(alpha Lambda) U^H
+        # by the eigen decomposition of the hermitian matrix V
+        for chunk in self._get_node_chunks(n):
+            ew, ev = numpy.linalg.eigh(tmp[chunk,:,:])
+            tmp[chunk,:,:] = numpy.einsum("nij,nj,nkj->nik", ev, numpy.exp(self._factor * ew), numpy.conjugate(ev))
 
         # Split the data into different components
         return tuple([ tmp[:,row,col].reshape((1,n)) for row in xrange(N) for col in xrange(N) ])
@@ -320,7 +338,7 @@ class MatrixPotentialMS(MatrixPotential):
             self._JV_s[i] = tuple([ sympy.diff(entry, variable) for entry in self._potential_s ])
 
         for k, v in self._JV_s.iteritems():
-            self._JV_n[k] = tuple([ sympy.lambdify(self._variables, entry, "numpy") for entry in v ])
+            self._JV_n[k] = lambdify_fused(self._variables, v, dtype=numpy.complexfloating)
 
 
     def _calculate_hessian_of_matrix(self, entry=None):
@@ -337,7 +355,7 @@ class MatrixPotentialMS(MatrixPotential):
                 self._HV_s[(i,j)] = tuple([ sympy.diff(sympy.diff(entry, variable1), variable2)  for entry in self._potential_s ])
 
         for key, val in self._HV_s.iteritems():
-            self._HV_n[key] = tuple([ sympy.lambdify(self._variables, entry, "numpy") for entry in val ])
+            self._HV_n[key] = lambdify_fused(self._variables, val, dtype=numpy.complexfloating)
 
 
     def _evaluate_jacobian_of_matrix(self, variable, grid, entry=None):
@@ -347,12 +365,8 @@ class MatrixPotentialMS(MatrixPotential):
         N = self._number_components
         nodes = grid.get_nodes(split=True)
 
-        dAdxk = numpy.zeros((n, N,N), dtype=numpy.complexfloating)
-        for row in xrange(N):
-            for col in xrange(N):
-                dAdxk[:,row,col] = self._JV_n[variable][N*row+col](*nodes)
-
-        return dAdxk
+        # All N*N entries in a single call of shape (N*N, #gridnodes)
+        return self._JV_n[variable](*nodes).T.reshape((n, N, N))
 
 
     def _evaluate_hessian_of_matrix(self, variables, grid, entry=None):
@@ -362,12 +376,8 @@ class MatrixPotentialMS(MatrixPotential):
         N = self._number_components
         nodes = grid.get_nodes(split=True)
 
-        dAdxidxj = numpy.zeros((n, N,N), dtype=numpy.complexfloating)
-        for row in xrange(N):
-            for col in xrange(N):
-                dAdxidxj[:,row,col] = self._HV_n[variables][N*row+col](*nodes)
-
-        return dAdxidxj
+        # All N*N entries in a single call of shape (N*N, #gridnodes)
+        return self._HV_n[variables](*nodes).T.reshape((n, N, N))
 
 
     def calculate_jacobian(self):
@@ -9,10 +9,10 @@ numerical steepest descent technique.
 @license: Modified BSD License
 """
 
-from numpy import (zeros, ones, diag, squeeze,  conjugate, transpose, dot, einsum,
+from numpy import (array, zeros, ones, eye, diag, squeeze, conjugate, transpose, dot, outer,
                    product, complexfloating, imag, nan_to_num, triu)
 from scipy import exp, sqrt, pi
-from scipy.linalg import inv, schur, det, sqrtm
+from scipy.linalg import inv, schur, det, sqrtm, solve_triangular
 
 from Quadrature import Quadrature
 
@@ -62,6 +62,9 @@ class NSDInhomogeneous(Quadrature):
         self._pacbra = pacbra
         self._packet = packet
 
+        # Drop all paths and basis values of previous packets
+        self._factorizations = {}
+
 
     def initialize_operator(self, operator=None, matrix=False, eval_at_once=False):
         r"""Provide the operator part of the inner product to evaluate.
@@ -93,6 +96,7 @@ class NSDInhomogeneous(Quadrature):
             else:
                 self._operator = operator
         self._eval_at_once = eval_at_once
+        self.reset_operator_cache()
 
 
     def mix_parameters(self, Pibra, Piket):
@@ -170,25 +174,59 @@ class NSDInhomogeneous(Quadrature):
 
         Note that the two arguments are not used in the current implementation.
         """
+        # The parameters may have changed since the last call
+        self.reset_operator_cache()
+        self._factorizations = {}
+
         # Unpack quadrature rules
         self._nodes = self._QR.get_nodes()
         self._weights = self._QR.get_weights()
 
 
-    def do_nsd(self, row, col):
-        r"""Evaluates by numerical steepest descent the integral
-        :math:`\langle \Phi_i | f | \Phi^\prime_j \rangle` for a polynomial
-        function :math:`f(x)` with :math:`x \in \mathbb{R}^D`.
+    def update_oscillator(self, T):
+        r"""Transform the upper triangular matrix :math:`T` of the Schur decomposition
+        of the oscillator such that the integral separates along the new coordinates.
+        The rank one updates of each step act on whole blocks of :math:`T` at once.
+
+        :param T: The upper triangular matrix :math:`T` of shape :math:`D \times D`.
+                  It is modified in place.
+        :return: The updated matrix :math:`T`.
+        """
+        D = T.shape[0]
+
+        for i in xrange(1, D):
+            if T[i-1,i-1] == 0:
+                # TODO: Prove that this never happens or handle it correctly!
+                print("Warning: 'update_oscillator' encountered a RESIDUE situation!")
+
+            t = T[i-1,i:]
+            O = outer(t, t) / (2.0*T[i-1,i-1])
+
+            # Diagonal elements get half of the update, the others the full one
+            T[i:,i:] = T[i:,i:] - triu(O, 1) - 0.5*diag(diag(O))
+
+        return T
+
+
+    def _get_factorization(self, row, col):
+        r"""Compute the steepest descent paths and all other values depending only on
+        the parameter sets :math:`\Pi_i` and :math:`\Pi^\prime_j`. These are shared by all
+        blocks :math:`(i,j)` having the same pair of parameter sets, for example all
+        :math:`N^2` blocks of two homogeneous wavepackets.
 
         :param row: The index :math:`i` of the component :math:`\Phi_i` of :math:`\Psi`.
         :param row: The index :math:`j` of the component :math:`\Phi^\prime_j` of :math:`\Psi^\prime`.
-        :return: A complex valued matrix of shape :math:`|\mathfrak{K}_i| \times |\mathfrak{K}^\prime_j|`.
+        :return: A ``dict`` with the paths, the values evaluated along them and the prefactor.
         """
-        D = self._packet.get_dimension()
-        N = self._packet.get_number_components()
-        eps = self._packet.get_eps()
         Pibra = self._pacbra.get_parameters(component=row)
         Piket = self._packet.get_parameters(component=col)
+
+        key = tuple([ array(item).tostring() for item in tuple(Pibra) + tuple(Piket) ])
+        if key in self._factorizations:
+            return self._factorizations[key]
+
+        D = self._packet.get_dimension()
+        eps = self._packet.get_eps()
         Pimix = self.mix_parameters(Pibra[:4], Piket[:4])
 
         # Combine oscillators
@@ -199,26 +237,13 @@ class NSDInhomogeneous(Quadrature):
         U = conjugate(transpose(U))
 
         # Oscillator updates
-        for i in xrange(1, D):
-            if T[i-1,i-1] == 0:
-                # TODO: Prove that this never happens or handle it correctly!
-                print("Warning: 'update_oscillator' encountered a RESIDUE situation!")
-
-            # Diagonal Elements
-            for j in xrange(i,D):
-                T[j,j] = T[j,j] - T[i-1,j]**2 / (4.0*T[i-1,i-1])
-
-            # Others
-            for rowi in xrange(i,D):
-                for coli in xrange(rowi+1,D):
-                    T[rowi,coli] = T[rowi,coli] - T[i-1,rowi]*T[i-1,coli] / (2*T[i-1,i-1])
+        T = self.update_oscillator(T)
 
         # Compute remaining parts
         X = inv(A + transpose(A))
         ctilde = c - 0.5 * dot(transpose(b), dot(X, b))
 
         # Prefactor originating from constant term c
-        eps = self._packet.get_eps()
         w = 1.0 / eps**2
         prefactor = exp(1.0j * w * ctilde)
 
@@ -227,11 +252,10 @@ class NSDInhomogeneous(Quadrature):
         # Tau (path parametrization variable)
         tk = self._nodes / sqrt(w)
 
-        # Path Precomposition
+        # Path Precomposition, solve (I + Tu) paths = sqrt(i/Dk) tk by back substitution
         Tu = 0.5 * triu(T, 1) / Dk
         paths = (sqrt(1.0j / Dk) * tk).astype(complexfloating)
-        for i in reversed(xrange(D)):
-            paths[i,:] = paths[i,:] - dot(Tu[i,:], paths)
+        paths = solve_triangular(eye(D) + Tu, paths, lower=False, unit_diagonal=True)
 
         # Path derivatives
         pathderivs = sqrt(1.0j / Dk)
@@ -252,30 +276,50 @@ class NSDInhomogeneous(Quadrature):
         # Compute global phase difference
         phase = exp(1.0j/eps**2 * (Piket[4]-conjugate(Pibra[4])))
 
+        item = {"q0": Pimix[0],
+                "paths": pathst,
+                "weights": (pdp * self._weights).reshape((-1,)),
+                "factor": phase * normfactor * prefactor / sqrt(w)**D,
+                "bra": {},
+                "ket": {}}
+        self._factorizations[key] = item
+        return item
+
+
+    def do_nsd(self, row, col):
+        r"""Evaluates by numerical steepest descent the integral
+        :math:`\langle \Phi_i | f | \Phi^\prime_j \rangle` for a polynomial
+        function :math:`f(x)` with :math:`x \in \mathbb{R}^D`.
+
+        :param row: The index :math:`i` of the component :math:`\Phi_i` of :math:`\Psi`.
+        :param row: The index :math:`j` of the component :math:`\Phi^\prime_j` of :math:`\Psi^\prime`.
+        :return: A complex valued matrix of shape :math:`|\mathfrak{K}_i| \times |\mathfrak{K}^\prime_j|`.
+        """
+        F = self._get_factorization(row, col)
+        pathst = F["paths"]
+
         # Non-oscillatory parts
         # Wavepacket
         # TODO: This is a huge hack: division by phi_0 not stable?
-        basisr = self._pacbra.evaluate_basis_at(conjugate(pathst), row, prefactor=False)
-        basisr = basisr / basisr[0,:]
-        basisc = self._packet.evaluate_basis_at(pathst, col, prefactor=False)
-        basisc = basisc / basisc[0,:]
+        if row not in F["bra"]:
+            basisr = self._pacbra.evaluate_basis_at(conjugate(pathst), row, prefactor=False)
+            F["bra"][row] = conjugate(basisr / basisr[0,:])
+        if col not in F["ket"]:
+            basisc = self._packet.evaluate_basis_at(pathst, col, prefactor=False)
+            F["ket"][col] = basisc / basisc[0,:]
         # Basis division by phi0 may introduce NaNs
         #basisr = nan_to_num(basisr)
         #basisc = nan_to_num(basisc)
 
-        # Operator should support the component notation for efficiency
-        if self._eval_at_once is True:
-            # TODO: Sure, this is inefficient, but we can not do better right now.
-            opath = self._operator(pathst, Pimix[0])[row*N+col]
-        else:
-            opath = self._operator(pathst, Pimix[0], entry=(row,col))
+        # Operator values, shared by all blocks with the same paths
+        opath = self.evaluate_operator(pathst, F["q0"], row, col)
 
         # Do the quadrature
-        quadrand = (opath * pdp * self._weights).reshape((-1,))
+        quadrand = opath.reshape((-1,)) * F["weights"]
         # Sum up matrices over all quadrature nodes
-        M = einsum("k,ik,jk", quadrand, conjugate(basisr), basisc)
+        M = dot(F["bra"][row] * quadrand, transpose(F["ket"][col]))
 
-        return phase * normfactor * prefactor * M / sqrt(w)**D
+        return F["factor"] * M
 
 
     def perform_quadrature(self, row, col):
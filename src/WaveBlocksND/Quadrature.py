@@ -6,6 +6,10 @@
 @license: Modified BSD License
 """
 
+from numpy import array_equal
+
+from LRUCache import LRUCache
+
 __all__ = ["Quadrature"]
 
 
@@ -59,6 +63,40 @@ class Quadrature(object):
         raise NotImplementedError("'Quadrature' is an abstract interface.")
 
 
+    def reset_operator_cache(self, maxsize=4):
+        r"""Drop all operator values cached by :py:meth:`evaluate_operator`.
+
+        :param maxsize: The number of node sets for which values are kept.
+        :type maxsize: int, default is 4.
+        """
+        self._operator_cache = LRUCache(maxsize=maxsize)
+
+
+    def evaluate_operator(self, nodes, position, row, col):
+        r"""Evaluate the entry :math:`f_{r,c}` of the operator at the given nodes.
+        If the operator can only evaluate all :math:`N^2` entries at once, these
+        are cached and reused for all blocks sharing the same nodes and position.
+
+        :param nodes: The nodes :math:`\gamma` at which we evaluate the operator.
+        :param position: The position :math:`q` passed on to the operator.
+        :param row: The row index :math:`r` of the entry.
+        :param col: The column index :math:`c` of the entry.
+        :return: The values :math:`f_{r,c}(\gamma)`.
+        """
+        if self._eval_at_once is not True:
+            return self._operator(nodes, position, entry=(row,col))
+
+        N = self._packet.get_number_components()
+        key = (nodes.shape, hash(nodes.tostring()), hash(position.tostring()))
+
+        item = self._operator_cache.get(key)
+        if item is None or not (array_equal(item[0], nodes) and array_equal(item[1], position)):
+            item = (nodes, position, tuple(self._operator(nodes, position)))
+            self._operator_cache.put(key, item)
+
+        return item[2][row*N+col]
+
+
     def prepare(self, rows, cols):
         raise NotImplementedError("'Quadrature' is an abstract interface.")
 
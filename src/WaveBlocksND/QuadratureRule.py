@@ -11,6 +11,8 @@ like inner products (brakets) etc.
 @license: Modified BSD License
 """
 
+from copy import deepcopy
+
 __all__ = ["QuadratureRule"]
 
 
@@ -30,14 +32,23 @@ class QuadratureRule(object):
 
 
     def __getitem__(self, key):
-        r"""Handle quadrature rule options.
+        r"""Handle quadrature rule options. Returns a copy of the option
+        value such that shared rules can not be changed by their users.
         """
         if self._options.has_key(key):
-            return self._options[key]
+            return deepcopy(self._options[key])
         else:
             return None
 
 
+    def _set_read_only(self):
+        r"""Make the nodes and weights of this rule read-only. This is
+        done for all rules which get shared between many users.
+        """
+        self._nodes.setflags(write=False)
+        self._weights.setflags(write=False)
+
+
     def get_description(self):
         r"""Return a description of this quadrature rule object.
         A description is a ``dict`` containing all key-value pairs
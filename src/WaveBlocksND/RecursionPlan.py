@@ -0,0 +1,193 @@
+"""The WaveBlocks Project
+
+This file contains the class for precompiled recursion plans of basis shapes
+together with a bounded cache sharing the plans between all their users.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import (ones, asarray, arange, eye, where, argsort, argmax,
+                   bincount, cumsum, hstack, sqrt, integer, floating)
+
+from LRUCache import LRUCache
+
+__all__ = ["RecursionPlan", "get_recursion_plan"]
+
+
+class RecursionPlan(object):
+    r"""This class holds all the index data which is necessary to traverse
+    a basis shape :math:`\mathfrak{K}` in recursions and stencil operations.
+    Everything is precomputed once per basis shape and stored in flat
+    integer arrays. As basis shapes, recursion plans are immutable objects.
+
+    The multi-indices :math:`k \in \mathfrak{K}` are grouped into layers
+    :math:`\{k \in \mathfrak{K} : |k| = n\}`. Each basis function :math:`\phi_k`
+    of layer :math:`n` is computed along the direction :math:`d` of its last
+    non-zero entry :math:`k_d` from its parent :math:`\phi_{k-e_d}` in layer
+    :math:`n-1` and the backward neighbours :math:`\phi_{k-e_d-e_j}` of this
+    parent in layer :math:`n-2`.
+    """
+
+    def __init__(self, basis_shape):
+        r"""Compile the recursion plan of a basis shape.
+
+        :param basis_shape: The basis shape :math:`\mathfrak{K}`.
+        :type basis_shape: A subclass of :py:class:`BasisShape`.
+        :raise: :py:class:`ValueError` if the basis shape does not contain the zero multi-index.
+        """
+        # The multi-indices k in linear order mu(k)
+        self._indices = basis_shape.get_index_table()
+        self._find = basis_shape.find
+        self._forward, self._backward = basis_shape.get_neighbour_table()
+
+        bs, D = self._indices.shape
+        self._dimension = D
+        self._basis_size = bs
+
+        self._build_layers()
+
+
+    def _build_layers(self):
+        r"""Build the flat arrays describing the layer-wise traversal.
+        """
+        D = self._dimension
+        bs = self._basis_size
+        indices = self._indices
+
+        # Sort the multi-indices into layers, keeping the linear order within each layer
+        n = indices.sum(axis=1)
+        order = argsort(n, kind="mergesort")
+
+        # All recursions start at the ground state phi_0
+        if bs == 0 or indices[order[0],:].any():
+            raise ValueError("The basis shape has to contain the zero multi-index.")
+        offsets = hstack([0, cumsum(bincount(n))])
+
+        # Recurse along the last non-zero direction
+        direction = D - 1 - argmax(indices[:,::-1] > 0, axis=1)
+        parent = self._backward[arange(bs), direction]
+
+        # Position of each multi-index within its layer, -1 if never computed
+        position = -ones((bs,), dtype=integer)
+        position[order[0]] = 0
+
+        mu = [ order[:1] ]
+        layers = []
+
+        for l in xrange(1, offsets.shape[0] - 1):
+            members = order[offsets[l]:offsets[l+1]]
+
+            # Basis functions without parent are never computed
+            par = parent[members]
+            members = members[(par >= 0) & (position[par] >= 0)]
+            position[members] = arange(members.shape[0])
+            mu.append(members)
+
+            km = indices[members,:] - eye(D, dtype=integer)[direction[members],:]
+            bw = self._backward[parent[members],:]
+
+            layers.append((position[parent[members]],
+                           direction[members],
+                           where(bw >= 0, position[bw], -1),
+                           sqrt(km.astype(floating)),
+                           sqrt(indices[members, direction[members]].astype(floating)).reshape(-1, 1)))
+
+        # The write-back slots mu(k) of all layers
+        self._layer_offsets = cumsum([0] + [ item.shape[0] for item in mu ])
+        self._layer_order = hstack(mu)
+
+        self._layers = [ (self._layer_order[self._layer_offsets[l]:self._layer_offsets[l+1]],) + item
+                         for l, item in enumerate(layers, start=1) ]
+
+
+    def get_dimension(self):
+        r""":return: The dimension :math:`D` of the underlying basis shape.
+        """
+        return self._dimension
+
+
+    def get_basis_size(self):
+        r""":return: The size :math:`|\mathfrak{K}|` of the underlying basis shape.
+        """
+        return self._basis_size
+
+
+    def get_indices(self):
+        r"""Return all multi-indices :math:`k \in \mathfrak{K}` as a table.
+
+        :return: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)` where row
+                 :math:`\mu(k)` contains the multi-index :math:`k`.
+        """
+        return self._indices
+
+
+    def get_layer_order(self):
+        r"""Return the traversal order of the layer-wise recursion.
+
+        :return: The linear indices :math:`\mu(k)` sorted by layers and an array
+                 of offsets where layer :math:`n` starts and ends.
+        """
+        return self._layer_order, self._layer_offsets
+
+
+    def get_layers(self):
+        r"""Return the data of all layers :math:`n \geq 1` needed by the recursion.
+
+        :return: A list of tuples ``(mu, parent, direction, backward, sqrtk, sqrtkd)``. Here ``mu`` are
+                 the write-back slots :math:`\mu(k)` of the layer, ``parent`` and ``backward`` the positions
+                 of the parents and of their backward neighbours within the previous two layers (``-1``
+                 if not part of the shape), ``sqrtk`` the values :math:`\sqrt{k_j - \delta_{jd}}` of the
+                 parents and ``sqrtkd`` the values :math:`\sqrt{k_d}`.
+        """
+        return self._layers
+
+
+    def get_neighbour_table(self, selection="forward"):
+        r"""Return the linear indices of all direct neighbours.
+
+        :param selection: Whether to return the ``forward`` or ``backward`` neighbours.
+        :return: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)` where entry :math:`(\mu(k), d)`
+                 is :math:`\mu(k \pm e_d)` or ``-1`` if this multi-index is not part of the shape.
+        """
+        if selection == "forward":
+            return self._forward
+        elif selection == "backward":
+            return self._backward
+        else:
+            raise ValueError("Unknown neighbour selection: "+str(selection))
+
+
+    def find(self, indices):
+        r"""Look up the linear indices :math:`\mu(k)` of many multi-indices at once.
+
+        :param indices: The multi-indices :math:`k` to look up.
+        :type indices: An integer ndarray of shape :math:`(M, D)`.
+        :return: An integer ndarray of shape :math:`(M,)` containing :math:`\mu(k)`
+                 or ``-1`` if :math:`k` is not part of the shape.
+        """
+        return self._find(asarray(indices, dtype=integer).reshape(-1, self._dimension))
+
+
+
+# The process-wide cache of recursion plans, keyed by the basis shape hash
+_recursion_plans = LRUCache(maxsize=64)
+
+
+def get_recursion_plan(basis_shape):
+    r"""Return the recursion plan of the given basis shape. Plans are compiled
+    only once per shape and shared through a bounded cache.
+
+    :param basis_shape: The basis shape :math:`\mathfrak{K}`.
+    :type basis_shape: A subclass of :py:class:`BasisShape`.
+    :return: A :py:class:`RecursionPlan` instance.
+    """
+    key = hash(basis_shape)
+    plan = _recursion_plans.get(key)
+
+    if plan is None:
+        plan = RecursionPlan(basis_shape)
+        _recursion_plans.put(key, plan)
+
+    return plan
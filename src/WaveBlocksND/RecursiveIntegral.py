@@ -0,0 +1,271 @@
+"""The WaveBlocks Project
+
+Compute the inner products between two semi-classical wavepackets
+exactly by the recursions of the ladder operators. The recursions
+are constructed explicitly for the inhomogeneous case and apply
+in any dimension and for arbitrary basis shapes.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import (zeros, ones, conjugate, dot, transpose, argsort, argmax,
+                   sqrt, complexfloating, floating)
+from scipy import exp
+from scipy.linalg import inv
+
+from Quadrature import Quadrature
+from GaussianIntegral import GaussianIntegral
+
+__all__ = ["RecursiveIntegral"]
+
+
+class RecursiveIntegral(Quadrature):
+    r"""This class computes the overlap integrals :math:`\langle \phi_k[\Pi_1] | \phi_l[\Pi_2] \rangle`
+    of the basis functions of two wavepackets without any quadrature nodes.
+
+    The lowering operators of both parameter sets are related by
+
+    .. math::
+        A[\Pi_2] = \mathbf{U} A[\Pi_1] + \mathbf{V} A^\dagger[\Pi_1] + \underline{c}
+
+    and vice versa for :math:`A[\Pi_1]` with the primed quantities :math:`\mathbf{U}^\prime`,
+    :math:`\mathbf{V}^\prime` and :math:`\underline{c}^\prime`. Applying these relations
+    to the bra or the ket yields the recursions
+
+    .. math::
+        \sum_{j=0}^{D-1} \mathbf{U}_{d,j} \sqrt{k_j+1} \langle \phi_{k+e_j} | \phi_l \rangle
+        & = \sqrt{l_d} \langle \phi_k | \phi_{l-e_d} \rangle
+          - \sum_{j=0}^{D-1} \mathbf{V}_{d,j} \sqrt{k_j} \langle \phi_{k-e_j} | \phi_l \rangle
+          - c_d \langle \phi_k | \phi_l \rangle \\
+        \sum_{j=0}^{D-1} \overline{\mathbf{U}^\prime_{d,j}} \sqrt{l_j+1} \langle \phi_k | \phi_{l+e_j} \rangle
+        & = \sqrt{k_d} \langle \phi_{k-e_d} | \phi_l \rangle
+          - \sum_{j=0}^{D-1} \overline{\mathbf{V}^\prime_{d,j}} \sqrt{l_j} \langle \phi_k | \phi_{l-e_j} \rangle
+          - \overline{c^\prime_d} \langle \phi_k | \phi_l \rangle
+
+    over the multi-index lattice. Starting from the Gaussian integral
+    :math:`\langle \phi_0 | \phi_0 \rangle` we first compute the row :math:`k = 0`
+    by the second recursion and then all other rows by the first one. The cost is
+    of order :math:`\mathcal{O}(|\mathfrak{K}| \cdot |\mathfrak{L}| \cdot D)`.
+    """
+
+    def __init__(self, *unused, **kunused):
+        r"""
+        """
+        # Drop any argument, we do not need a qr instance.
+
+
+    def __str__(self):
+        return "Inhomogeneous inner product computed using the ladder operator recursions."
+
+
+    def get_description(self):
+        r"""Return a description of this integral object.
+        A description is a ``dict`` containing all key-value pairs
+        necessary to reconstruct the current instance. A description
+        never contains any data.
+        """
+        d = {}
+        d["type"] = "RecursiveIntegral"
+        return d
+
+
+    def initialize_packet(self, pacbra, packet=None):
+        r"""Provide the wavepacket parts of the inner product to evaluate.
+        Since the recursions are for the inhomogeneous case explicitly, different
+        wavepackets can be used for the 'bra' as well as the 'ket' part.
+
+        :param pacbra: The packet that is used for the 'bra' part.
+        :param packet: The packet that is used for the 'ket' part.
+        """
+        # Allow to ommit the ket if it is the same as the bra
+        if packet is None:
+            packet = pacbra
+
+        self._pacbra = pacbra
+        self._packet = packet
+
+
+    def initialize_operator(self, operator=None, matrix=False, eval_at_once=False):
+        r"""Provide the operator part of the inner product to evaluate.
+        This function initializes the operator used for quadratures
+        and for building matrices.
+
+        .. note:: The recursions can not handle operators at all.
+
+        :param operator: The operator of the inner product.
+                         If ``None`` a suitable identity is used.
+        :param matrix: Set this to ``True`` (Default is ``False``) in case
+                       we want to compute the matrix elements.
+                       For nasty technical reasons we can not yet unify
+                       the operator call syntax.
+        :param eval_at_once: Flag to tell whether the operator supports the ``entry=(r,c)`` call syntax.
+                             Since we do not support operators at all, it has no effect.
+        :type eval_at_once: Boolean, default is ``False``.
+        """
+        # Operator is None is interpreted as identity transformation
+        if operator is None:
+            self._operator = lambda nodes, dummy, entry=None: ones((1,nodes.shape[1])) if entry[0] == entry[1] else zeros((1,nodes.shape[1]))
+        else:
+            raise ValueError("The 'RecursiveIntegral' can not handle operators.")
+
+
+    def prepare(self, rows, cols):
+        r"""Precompute some values needed for evaluating the integral
+        :math:`\langle \Phi_i | \Phi^\prime_j \rangle` or the corresponding
+        matrix over the basis functions of :math:`\Phi_i` and :math:`\Phi^\prime_j`.
+        Note that this function does nothing in the current implementation.
+
+        :param rows: A list of all :math:`i` with :math:`0 \leq i \leq N`
+                     selecting the :math:`\Phi_i` for which we precompute values.
+        :param cols: A list of all :math:`j` with :math:`0 \leq j \leq N`
+                     selecting the :math:`\Phi^\prime_j` for which we precompute values.
+        """
+        pass
+
+
+    def _get_layers(self, basis_shape):
+        r"""Group the multi-indices :math:`k \in \mathfrak{K}` into layers of
+        equal :math:`|k|`. Each multi-index is reached along the direction :math:`d`
+        of its last non-zero entry from its parent :math:`k-e_d`.
+
+        :param basis_shape: The basis shape :math:`\mathfrak{K}`.
+        :return: A list of tuples ``(members, parents, directions)`` of linear indices
+                 for all layers :math:`|k| > 0`.
+        :raise: :py:class:`ValueError` if the basis shape does not contain the zero multi-index.
+        """
+        indices = basis_shape.get_index_table()
+        backward = basis_shape.get_neighbour_table(selection="backward")
+        D = basis_shape.get_dimension()
+
+        n = indices.sum(axis=1)
+        order = argsort(n, kind="mergesort")
+        n = n[order]
+
+        # All recursions start at the ground state phi_0
+        if n.shape[0] == 0 or n[0] != 0:
+            raise ValueError("The basis shape has to contain the zero multi-index.")
+
+        layers = []
+        for l in xrange(1, n[-1] + 1):
+            members = order[n == l]
+            directions = D - 1 - argmax(indices[members,::-1] > 0, axis=1)
+            parents = backward[members, directions]
+            layers.append((members, parents, directions))
+
+        return layers
+
+
+    def exact_result_ground(self, Pibra, Piket, eps):
+        r"""Compute the overlap integral :math:`\langle \phi_0 | \phi_0 \rangle` of
+        the groundstates by the Gaussian integral formula implemented in
+        :py:meth:`GaussianIntegral.exact_result_gauss`.
+
+        :param Pibra: The parameter set :math:`\Pi = \{q_1,p_1,Q_1,P_1\}` of the bra :math:`\langle \phi_0 |`.
+        :param Piket: The parameter set :math:`\Pi^\prime = \{q_2,p_2,Q_2,P_2\}` of the ket :math:`| \phi_0 \rangle`.
+        :param eps: The semi-classical scaling parameter :math:`\varepsilon`.
+        :return: The value of the integral :math:`\langle \phi_0 | \phi_0 \rangle`.
+        """
+        D = Pibra[0].shape[0]
+        return GaussianIntegral().exact_result_gauss(Pibra[:4], Piket[:4], D, eps)
+
+
+    def exact_result_matrix(self, Pibra, Piket, eps, Kbra, Kket):
+        r"""Compute the overlap integrals :math:`\langle \phi_k | \phi_l \rangle`
+        for all :math:`k \in \mathfrak{K}` and :math:`l \in \mathfrak{L}` by the
+        ladder operator recursions.
+
+        :param Pibra: The parameter set :math:`\Pi = \{q_1,p_1,Q_1,P_1\}` of the bra :math:`\langle \phi_k |`.
+        :param Piket: The parameter set :math:`\Pi^\prime = \{q_2,p_2,Q_2,P_2\}` of the ket :math:`| \phi_l \rangle`.
+        :param eps: The semi-classical scaling parameter :math:`\varepsilon`.
+        :param Kbra: The basis shape :math:`\mathfrak{K}` of the bra.
+        :param Kket: The basis shape :math:`\mathfrak{L}` of the ket.
+        :return: A complex valued matrix of shape :math:`|\mathfrak{K}| \times |\mathfrak{L}|`.
+        """
+        q1, p1, Q1, P1 = Pibra
+        q2, p2, Q2, P2 = Piket
+        D = Kbra.get_dimension()
+
+        # Transformation of the ladder operators
+        U = -0.5j * (dot(transpose(P2), conjugate(Q1)) - dot(transpose(Q2), conjugate(P1)))
+        V = -0.5j * (dot(transpose(P2), Q1) - dot(transpose(Q2), P1))
+        c = -1.0j / (sqrt(2.0) * eps) * (dot(transpose(P2), q1 - q2) - dot(transpose(Q2), p1 - p2))
+
+        Up = -0.5j * (dot(transpose(P1), conjugate(Q2)) - dot(transpose(Q1), conjugate(P2)))
+        Vp = -0.5j * (dot(transpose(P1), Q2) - dot(transpose(Q1), P2))
+        cp = -1.0j / (sqrt(2.0) * eps) * (dot(transpose(P1), q2 - q1) - dot(transpose(Q1), p2 - p1))
+
+        sk = sqrt(Kbra.get_index_table().astype(floating))
+        sl = sqrt(Kket.get_index_table().astype(floating))
+        bk = Kbra.get_neighbour_table(selection="backward")
+        bl = Kket.get_neighbour_table(selection="backward")
+
+        # The last row and column stay zero and absorb all
+        # neighbours k-e_j and l-e_j outside the basis shapes
+        M = zeros((Kbra.get_basis_size()+1, Kket.get_basis_size()+1), dtype=complexfloating)
+
+        z = tuple(D*[0])
+        k0 = Kbra[z]
+        M[k0, Kket[z]] = self.exact_result_ground(Pibra, Piket, eps)
+
+        # The row k = 0 by recursion over the ket
+        R = inv(conjugate(Up))
+        W = dot(R, conjugate(Vp))
+        w = dot(R, conjugate(cp)).reshape(-1)
+
+        for members, parents, directions in self._get_layers(Kket):
+            t = sl[parents,:] * M[k0, bl[parents,:]]
+            M[k0, members] = (-(W[directions,:] * t).sum(axis=1) - w[directions] * M[k0, parents]) / sl[members, directions]
+
+        # All other rows by recursion over the bra
+        R = inv(U)
+        W = dot(R, V)
+        w = dot(R, c).reshape(-1)
+
+        for members, parents, directions in self._get_layers(Kbra):
+            Mp = M[parents,:-1]
+            S = -w[directions].reshape(-1,1) * Mp
+            for j in xrange(D):
+                S += R[directions,j].reshape(-1,1) * sl[:,j] * M[parents,:][:,bl[:,j]]
+                S -= (W[directions,j] * sk[parents,j]).reshape(-1,1) * M[bk[parents,j],:-1]
+            M[members,:-1] = S / sk[members,directions].reshape(-1,1)
+
+        return M[:-1,:-1]
+
+
+    def perform_quadrature(self, row, col):
+        r"""Evaluates the integral :math:`\langle \Phi_i | \Phi^\prime_j \rangle`
+        exactly by the ladder operator recursions.
+
+        :param row: The index :math:`i` of the component :math:`\Phi_i` of :math:`\Psi`.
+        :param row: The index :math:`j` of the component :math:`\Phi^\prime_j` of :math:`\Psi^\prime`.
+        :return: A single complex floating point number.
+        """
+        M = self.perform_build_matrix(row, col)
+
+        cbra = self._pacbra.get_coefficient_vector(component=row)
+        cket = self._packet.get_coefficient_vector(component=col)
+
+        return dot(conjugate(cbra).T, dot(M, cket))
+
+
+    def perform_build_matrix(self, row, col):
+        r"""Computes the matrix elements :math:`\langle\Phi_i |\Phi^\prime_j\rangle`
+        exactly by the ladder operator recursions.
+
+        :param row: The index :math:`i` of the component :math:`\Phi_i` of :math:`\Psi`.
+        :param row: The index :math:`j` of the component :math:`\Phi^\prime_j` of :math:`\Psi^\prime`.
+        :return: A complex valued matrix of shape :math:`|\mathfrak{K}_i| \times |\mathfrak{K}^\prime_j|`.
+        """
+        eps = self._packet.get_eps()
+
+        Pibra = self._pacbra.get_parameters(component=row)
+        Piket = self._packet.get_parameters(component=col)
+        Kbra = self._pacbra.get_basis_shapes(component=row)
+        Kket = self._packet.get_basis_shapes(component=col)
+
+        M = self.exact_result_matrix(Pibra[:4], Piket[:4], eps, Kbra, Kket)
+
+        phase = exp(1.0j/eps**2 * (Piket[4]-conjugate(Pibra[4])))
+        return phase * M
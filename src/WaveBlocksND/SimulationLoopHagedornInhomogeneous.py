@@ -13,6 +13,7 @@ from IOManager import IOManager
 from TimeManager import TimeManager
 from BlockFactory import BlockFactory
 from BasisTransformationHAWP import BasisTransformationHAWP
+from BasisShapeAdaptor import BasisShapeAdaptor
 from HagedornPropagatorInhomogeneous import HagedornPropagatorInhomogeneous
 
 __all__ = ["SimulationLoopHagedornInhomogeneous"]
@@ -43,6 +44,12 @@ class SimulationLoopHagedornInhomogeneous(SimulationLoop):
         # The time manager
         self._tm = TimeManager(self.parameters)
 
+        # Adapt the basis shapes every n-th timestep
+        if "adapt_nth" in self.parameters:
+            self._adapt_nth = self.parameters["adapt_nth"]
+        else:
+            self._adapt_nth = 0
+
         # Set up serialization of simulation data
         self.IOManager = IOManager()
         self.IOManager.create_file()
@@ -82,9 +89,18 @@ class SimulationLoopHagedornInhomogeneous(SimulationLoop):
         slots = self._tm.compute_number_saves()
         key = ("q","p","Q","P","S","adQ")
 
+        # The data block of each packet in the order of the propagator
+        self._blockids = []
+
         for i in xrange(npackets):
             bid = self.IOManager.create_block()
+            self._blockids.append(bid)
             self.IOManager.add_inhomogwavepacket(self.parameters, timeslots=slots, blockid=bid, key=key)
+            if self._adapt_nth > 0:
+                self.IOManager.add_inhomogwavepacket_adaptations(blockid=bid)
+
+        if self._adapt_nth > 0:
+            self._adaptor = BasisShapeAdaptor(self.parameters["adapt_tolerance"], self.parameters["adapt_margin"])
 
         # Write some initial values to disk
         for packet in self.propagator.get_wavepackets():
@@ -117,6 +133,14 @@ class SimulationLoopHagedornInhomogeneous(SimulationLoop):
 
             self.propagator.propagate()
 
+            # Prune or grow the basis shapes
+            if self._adapt_nth > 0 and i % self._adapt_nth == 0:
+                for packet, bid in zip(self.propagator.get_wavepackets(), self._blockids):
+                    for component, oldshape, newshape in self._adaptor.adapt(packet):
+                        print(" adapted basis shape of component "+str(component)+" from "+
+                              str(oldshape.get_basis_size())+" to "+str(newshape.get_basis_size())+" elements")
+                        self.IOManager.save_inhomogwavepacket_adaptation(component, oldshape, newshape, timestep=i, blockid=bid)
+
             # Save some simulation data
             if self._tm.must_save(i):
                 # Run the postpropagate step
@@ -147,4 +171,5 @@ class SimulationLoopHagedornInhomogeneous(SimulationLoop):
         r"""Do the necessary cleanup after a simulation. For example request the
         :py:class:`IOManager` to write the data and close the output files.
         """
+        print("Quadrature rule cache: "+str(BlockFactory().get_quadrature_rule_cache().get_statistics()))
         self.IOManager.finalize()
@@ -9,11 +9,17 @@ Smolyak construction.
 @license: Modified BSD License
 """
 
+import os
 from copy import deepcopy
-from numpy import zeros, hstack, vsplit, squeeze, lexsort, integer, where, vstack
+from hashlib import sha1
+from json import dumps
+from tempfile import mkstemp
+from timeit import default_timer
+from numpy import zeros, hstack, lexsort, integer, where, vstack, save, load, cumsum, bincount
 from numpy.linalg import norm
 from scipy.special import binom
 
+import GlobalDefaults as GD
 from QuadratureRule import QuadratureRule
 from Utils import meshgrid_nd
 
@@ -54,6 +60,12 @@ class SmolyakQR(QuadratureRule):
                      weight pair :math:`(\gamma, \omega)` that is part of the rule,
                      the pair :math:`(-\gamma, \omega)` is also contained
                      in the quadrature rule.
+
+        .. note:: Constructed rules are stored in the directory given by the option
+                  ``cache_directory`` or else by the global default ``path_to_qr_cache``.
+                  This cache is disabled by default. Enable it by passing for example
+                  ``options={"cache_directory": "~/.waveblocks/quadrature_rules"}`` or by
+                  setting ``GlobalDefaults.path_to_qr_cache`` to a directory.
         """
         # The dimension of the quadrature rule.
         self._dimension = dimension
@@ -81,6 +93,12 @@ class SmolyakQR(QuadratureRule):
         # The quadrature weights \omega.
         self._weights = None
 
+        # The minimal number of pending nodes before merging
+        self._merge_threshold = 2**16
+
+        # The time in seconds spent to construct or load the rule
+        self._construction_time = None
+
 
     def __str__(self):
         s = "Sparse grid (Smolyak) quadrature rule consisting of:\n"
@@ -127,6 +145,15 @@ class SmolyakQR(QuadratureRule):
         return self._weights.copy()
 
 
+    def get_construction_time(self):
+        r"""Returns the wall clock time spent in the last call of :py:meth:`construct_rule`.
+        If the rule was found in the cache this is the time needed for loading it.
+
+        :return: The time in seconds or ``None`` if the rule was not constructed yet.
+        """
+        return self._construction_time
+
+
     def enumerate_lattice_points(self, N, D=None):
         r"""This method enumerates all lattice points of a lattice
         :math:`\Lambda \subset \mathbb{N}^D` in :math:`D` dimensions
@@ -158,6 +185,104 @@ class SmolyakQR(QuadratureRule):
             yield tuple(k)
 
 
+    def get_cache_directory(self):
+        r"""Return the directory where constructed rules are cached.
+
+        :return: The path of the cache directory or ``None`` if caching is disabled.
+        """
+        if self._options.has_key("cache_directory"):
+            directory = self._options["cache_directory"]
+        else:
+            directory = GD.path_to_qr_cache
+
+        if directory is None:
+            return None
+        return os.path.expanduser(directory)
+
+
+    def get_cache_key(self, level, tolerance):
+        r"""Compute the content address of a rule in the cache.
+
+        :param level: The level :math:`k` of the Smolyak construction.
+        :param tolerance: Tolerance for dropping identical quadrature nodes.
+        :return: A string which uniquely identifies the rule.
+        """
+        key = {"dimension": self._dimension,
+               "level": level,
+               "qr_rules": [ self._rules[i].get_description() for i in xrange(1, level+1) ],
+               "tolerance": repr(tolerance)}
+        return "smolyak_" + sha1(dumps(key, sort_keys=True)).hexdigest()
+
+
+    def _load_cached_rule(self, directory, key):
+        r"""Load the nodes and weights from the cache. The files are memory-mapped
+        such that concurrent processes share the same pages.
+
+        :return: Whether the rule was found in the cache.
+        """
+        pathn = os.path.join(directory, key + "_nodes.npy")
+        pathw = os.path.join(directory, key + "_weights.npy")
+
+        if not (os.path.exists(pathn) and os.path.exists(pathw)):
+            return False
+
+        self._nodes = load(pathn, mmap_mode="r")
+        self._weights = load(pathw, mmap_mode="r")
+        self._number_nodes = self._nodes.shape[1]
+        return True
+
+
+    def _store_cached_rule(self, directory, key):
+        r"""Store the nodes and weights in the cache. Every file is written
+        to a temporary location first and then renamed atomically.
+        """
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Another process may have created it meanwhile
+                if not os.path.isdir(directory):
+                    raise
+
+        # Write the weights first since we look for the nodes when loading
+        for name, data in (("_weights.npy", self._weights), ("_nodes.npy", self._nodes)):
+            fd, tmppath = mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                save(f, data)
+            os.rename(tmppath, os.path.join(directory, key + name))
+
+
+    def _merge_nodes(self, nodes, weights, tolerance):
+        r"""Merge several sets of quadrature nodes into a single set of unique
+        nodes. The weights of coinciding nodes are summed up.
+
+        :param nodes: A list of ndarrays of shape :math:`(D, n_i)`, the first one
+                      may be the result of an earlier merge.
+        :param weights: A list of ndarrays of shape :math:`(n_i,)`.
+        :param tolerance: Tolerance for dropping identical quadrature nodes.
+        :return: The lexicographically sorted unique nodes and their weights.
+        """
+        D = self._dimension
+
+        allnodes = hstack(nodes).reshape(D,-1)
+        allweights = hstack(weights)
+
+        if allnodes.shape[1] == 0:
+            return allnodes, allweights
+
+        # Sort
+        I = lexsort(allnodes[::-1,:])
+        allnodes = allnodes[:,I]
+        allweights = allweights[I]
+
+        # Start a new group of identical nodes wherever two consecutive nodes differ
+        no = norm(allnodes[:,:-1] - allnodes[:,1:], axis=0)
+        first = hstack([True, no > tolerance])
+        groups = cumsum(first) - 1
+
+        return allnodes[:,first], bincount(groups, weights=allweights)
+
+
     def construct_rule(self, level=None, tolerance=1e-15):
         r"""Compute the quadrature nodes :math:`\{\gamma_i\}_i` and quadrature
         weights :math:`\{\omega_i\}_i`.
@@ -170,6 +295,8 @@ class SmolyakQR(QuadratureRule):
                      to finish. Also, the quadrature nodes may use large amounts
                      of memory depending on the dimension and level parameters.
         """
+        starttime = default_timer()
+
         D = self._dimension
 
         if level is None:
@@ -180,12 +307,24 @@ class SmolyakQR(QuadratureRule):
         if k > max(self._rules.keys()):
             raise ValueError("Not enough quadrature rules to build Smolyak grid of level "+str(k))
 
-        allnodes = []
-        allweights = []
-        factors = []
+        # Try to reuse a rule constructed earlier
+        directory = self.get_cache_directory()
+        if directory is not None:
+            key = self.get_cache_key(k, tolerance)
+            if self._load_cached_rule(directory, key):
+                self._construction_time = default_timer() - starttime
+                return
+
+        # The merged unique nodes and weights and a buffer of pending subgrids
+        allnodes = zeros((D,0))
+        allweights = zeros((0,))
+        pendingnodes = []
+        pendingweights = []
+        pendingsize = 0
 
         # Index Set
         for q in xrange(max(0, k-D), k):
+            factor = (-1)**(k-1-q) * binom(D-1, k-1-q)
             S = self.enumerate_lattice_points(q)
             for j, s in enumerate(S):
                 # Only use non-negative nodes for the construction.
@@ -199,35 +338,21 @@ class SmolyakQR(QuadratureRule):
                 weights = [ rule.get_weights() for rule in rules ]
                 weights = meshgrid_nd([ w[i] for w, i in zip(weights, indices) ])
                 weights = reduce(lambda x,y: x*y, weights)
-                allnodes.append(nodes)
-                allweights.append(weights.flatten())
-                factors.append((-1)**(k-1-q) * binom(D-1, k-1-q))
-
-        # Sort
-        allnodes = hstack(allnodes).reshape(D,-1)
-        allweights = hstack([factor*weights for factor, weights in zip(factors,allweights)]).reshape(1,-1)
-
-        I = lexsort(map(squeeze, vsplit(allnodes, D))[::-1])
-
-        allnodes = allnodes[:,I].reshape(D,-1)
-        allweights = allweights[:,I].reshape(1,-1)
-
-        # Remove duplicates
-        last = 0
-        I = [last]
-
-        no = norm(allnodes[:,:-1] - allnodes[:,1:], axis=0)
-
-        for col in xrange(1, allnodes.shape[1]):
-            if no[col-1] <= tolerance:
-                allweights[0,last] += allweights[0,col]
-                allweights[0,col] = 0
-            else:
-                last = col
-                I.append(last)
-
-        allnodes = allnodes[:,I]
-        allweights = allweights[:,I]
+                pendingnodes.append(nodes)
+                pendingweights.append(factor * weights.flatten())
+                pendingsize += nodes.shape[1]
+
+                # Merge the pending subgrids once they outgrow the unique nodes
+                # found so far, this bounds the peak memory by a small multiple
+                # of the number of unique nodes.
+                if pendingsize >= max(allweights.shape[0], self._merge_threshold):
+                    allnodes, allweights = self._merge_nodes([allnodes] + pendingnodes, [allweights] + pendingweights, tolerance)
+                    pendingnodes = []
+                    pendingweights = []
+                    pendingsize = 0
+
+        allnodes, allweights = self._merge_nodes([allnodes] + pendingnodes, [allweights] + pendingweights, tolerance)
+        allweights = allweights.reshape(1,-1)
 
         # Mirror points to all other hyperoctants
         for d in xrange(D):
@@ -241,3 +366,7 @@ class SmolyakQR(QuadratureRule):
         self._nodes = allnodes
         self._weights = allweights
         self._number_nodes = allnodes.shape[1]
+        self._construction_time = default_timer() - starttime
+
+        if directory is not None:
+            self._store_cached_rule(directory, key)
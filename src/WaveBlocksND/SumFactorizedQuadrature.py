@@ -0,0 +1,227 @@
+"""The WaveBlocks Project
+
+This file contains code for evaluating inner products
+and matrix elements by sum factorization over tensor
+product quadrature rules. Here we handle the homogeneous case.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import (zeros, ones_like, conjugate, dot, kron, diag, diagflat, einsum, tensordot,
+                   exp, sqrt, pi, abs, allclose, complexfloating)
+
+from DirectHomogeneousQuadrature import DirectHomogeneousQuadrature
+from TensorProductQR import TensorProductQR
+from HyperCubicShape import HyperCubicShape
+
+__all__ = ["SumFactorizedQuadrature"]
+
+
+class SumFactorizedQuadrature(DirectHomogeneousQuadrature):
+    r"""This class computes the matrix elements :math:`\langle \Phi_i | f | \Phi_j \rangle`
+    by sum factorization. It applies if the quadrature rule is a :py:class:`TensorProductQR`,
+    all basis shapes are of type :py:class:`HyperCubicShape` and the parameters :math:`Q`
+    and :math:`P` are diagonal. Then the basis functions factorize as
+    :math:`\phi_k(x) = \prod_{d=0}^{D-1} \phi_{k_d}(x_d)` and we only ever evaluate the
+    one-dimensional factors on the one-dimensional nodes.
+
+    If the integrand :math:`f` is a sum :math:`c + \sum_d g_d(x_d)` of one-dimensional
+    terms, as for example the identity or diagonal quadratic potentials, the matrix is
+    a sum of Kronecker products of one-dimensional matrices. Otherwise the quadrature
+    is contracted one dimension after the other. In all other cases we fall back to
+    the direct quadrature.
+    """
+
+    def __str__(self):
+        return "Homogeneous sum-factorized quadrature using a " + str(self._QR)
+
+
+    def get_description(self):
+        r"""Return a description of this quadrature object.
+        A description is a ``dict`` containing all key-value pairs
+        necessary to reconstruct the current instance. A description
+        never contains any data.
+        """
+        d = {}
+        d["type"] = "SumFactorizedQuadrature"
+        d["qr"] = self._QR.get_description()
+        return d
+
+
+    def is_factorizable(self, components):
+        r"""Check if the basis functions of the given components factorize
+        over the one-dimensional rules of the quadrature.
+
+        :param components: A list of component indices :math:`i`.
+        :return: Whether we can apply sum factorization.
+        """
+        if not isinstance(self._QR, TensorProductQR):
+            return False
+
+        shapes = self._packet.get_basis_shapes()
+        if not all([ isinstance(shapes[component], HyperCubicShape) for component in components ]):
+            return False
+
+        q, p, Q, P, S = self._packet.get_parameters()
+        return (abs(Q - diagflat(diag(Q))).max() == 0.0 and
+                abs(P - diagflat(diag(P))).max() == 0.0)
+
+
+    def prepare(self, rows, cols):
+        r"""Precompute some values needed for evaluating the quadrature
+        :math:`\langle \Phi_i | f(x) | \Phi_j \rangle` or the corresponding
+        matrix over the basis functions of :math:`\Phi_i` and :math:`\Phi_j`.
+
+        :param rows: A list of all :math:`i` with :math:`0 \leq i \leq N`
+                     selecting the :math:`\Phi_i` for which we precompute values.
+        :param cols: A list of all :math:`j` with :math:`0 \leq j \leq N`
+                     selecting the :math:`\Phi_j` for which we precompute values.
+        """
+        components = sorted(set(rows) | set(cols))
+
+        self._factorized = self.is_factorizable(components)
+        if not self._factorized:
+            return DirectHomogeneousQuadrature.prepare(self, rows, cols)
+
+        D = self._packet.get_dimension()
+        N = self._packet.get_number_components()
+        shapes = self._packet.get_basis_shapes()
+
+        # Evaluate the one-dimensional factors up to the largest limit in each direction
+        limits = [ max([ shapes[component].get_limits()[d] for component in components ]) for d in xrange(D) ]
+
+        rules = self._QR.get_qrs()
+        self._bases = [ self._evaluate_basis_1d(d, limits[d], rule.get_nodes().reshape(-1)) for d, rule in enumerate(rules) ]
+        self._weights1d = [ rule.get_weights().reshape(-1) for rule in rules ]
+        self._shape = tuple([ rule.get_number_nodes() for rule in rules ])
+
+        # Operator
+        q, p, Q, P, S = self._packet.get_parameters()
+        if self._eval_at_once is True:
+            self._values = tuple(self._operator(self._nodes, q))
+        else:
+            self._values = tuple([ self._operator(self._nodes, q, entry=(r,c)) for r in xrange(N) for c in xrange(N) ])
+        # Recheck what we got
+        assert type(self._values) is tuple
+        assert len(self._values) == N**2
+
+        # Coefficients
+        self._coeffs = self._packet.get_coefficients()
+
+
+    def _evaluate_basis_1d(self, d, K, gamma):
+        r"""Evaluate the one-dimensional factors :math:`\phi_{k_d}` for :math:`0 \leq k_d < K`
+        at the transformed one-dimensional nodes of direction :math:`d`.
+
+        :param d: The direction :math:`d`.
+        :param K: The number of basis functions to evaluate.
+        :param gamma: The one-dimensional quadrature nodes :math:`\gamma_d`.
+        :return: An ndarray of shape :math:`(K, |\gamma_d|)`.
+        """
+        eps = self._packet.get_eps()
+        q, p, Q, P, S = self._packet.get_parameters()
+
+        qd, pd, Qd, Pd = q[d,0], p[d,0], Q[d,d], P[d,d]
+
+        # For diagonal Q the affine node transformation acts on each direction separately
+        if self._QR["transform"] is not None and self._QR["transform"] is False:
+            x = gamma
+        else:
+            x = qd + eps * abs(Qd) * gamma
+
+        df = x - qd
+        phi = zeros((K, x.shape[0]), dtype=complexfloating)
+        phi[0,:] = (pi*eps**2)**(-0.25) * exp(1.0j / eps**2 * (0.5 * Pd / Qd * df**2 + pd * df))
+
+        X = sqrt(2.0) / eps * df / Qd
+        QQ = conjugate(Qd) / Qd
+
+        for k in xrange(1, K):
+            phi[k,:] = X * phi[k-1,:]
+            if k > 1:
+                phi[k,:] -= sqrt(k-1) * QQ * phi[k-2,:]
+            phi[k,:] /= sqrt(k)
+
+        return phi
+
+
+    def _split_additive(self, F):
+        r"""Try to split the tensor of integrand values into a sum
+        :math:`c + \sum_d g_d(\gamma_d)` of one-dimensional terms.
+
+        :param F: The integrand values on the tensor product grid.
+        :return: The constant :math:`c` and the list of all :math:`g_d` or ``None``
+                 if the integrand is not of this form.
+        """
+        D = F.ndim
+        c = F.mean()
+        g = [ F.mean(axis=tuple([ e for e in xrange(D) if not e == d ])) - c for d in xrange(D) ]
+
+        R = c * ones_like(F)
+        for d in xrange(D):
+            shape = D * [1]
+            shape[d] = -1
+            R = R + g[d].reshape(shape)
+
+        if not allclose(R, F, rtol=1e-12, atol=1e-14 * abs(F).max()):
+            return None
+        return c, g
+
+
+    def do_quadrature(self, row, col):
+        r"""Evaluates by sum factorization the integral
+        :math:`\langle \Phi_i | f | \Phi_j \rangle` for a polynomial
+        function :math:`f(x)` with :math:`x \in \mathbb{R}^D`.
+
+        :param row: The index :math:`i` of the component :math:`\Phi_i` of :math:`\Psi`.
+        :param row: The index :math:`j` of the component :math:`\Phi_j` of :math:`\Psi`.
+        :return: A complex valued matrix of shape :math:`|\mathfrak{K}_i| \times |\mathfrak{K}_j|`.
+        """
+        if not self._factorized:
+            return DirectHomogeneousQuadrature.do_quadrature(self, row, col)
+
+        D = self._packet.get_dimension()
+        eps = self._packet.get_eps()
+        N = self._packet.get_number_components()
+
+        Kr = self._packet.get_basis_shapes(component=row).get_limits()
+        Kc = self._packet.get_basis_shapes(component=col).get_limits()
+
+        F = eps**D * self._values[row*N + col].reshape(self._shape)
+
+        # The products of the one-dimensional factors at the one-dimensional nodes
+        B = [ einsum("ai,bi->abi", conjugate(self._bases[d][:Kr[d],:]), self._bases[d][:Kc[d],:]) for d in xrange(D) ]
+
+        split = self._split_additive(F)
+
+        if split is not None:
+            # The matrix is a sum of Kronecker products of one-dimensional matrices
+            c, g = split
+            S = [ dot(B[d], self._weights1d[d]) for d in xrange(D) ]
+            M = c * reduce(kron, S)
+            for d in xrange(D):
+                Sg = S[:d] + [ dot(B[d], self._weights1d[d] * g[d]) ] + S[d+1:]
+                M = M + reduce(kron, Sg)
+            return M
+
+        # Contract the quadrature one dimension after the other
+        W = F
+        for d in xrange(D):
+            shape = D * [1]
+            shape[d] = -1
+            W = W * self._weights1d[d].reshape(shape)
+
+        T = W.reshape((1,) + self._shape)
+        for d in xrange(D):
+            # T has the axes (a_0, b_0, ..., a_{d-1}, b_{d-1}, gamma_d, ..., gamma_{D-1})
+            T = tensordot(T, B[d], axes=([1],[2]))
+            T = T.reshape((T.shape[0],) + T.shape[1:-2] + (-1,))
+            T = T.transpose((0, T.ndim-1) + tuple(range(1, T.ndim-1)))
+            T = T.reshape((-1,) + T.shape[2:])
+
+        # Reorder the axes (a_0, b_0, ..., a_{D-1}, b_{D-1}) to (a_0, ..., a_{D-1}, b_0, ..., b_{D-1})
+        T = T.reshape(tuple([ K for d in xrange(D) for K in (Kr[d], Kc[d]) ]))
+        T = T.transpose(range(0, 2*D, 2) + range(1, 2*D, 2))
+        return T.reshape((reduce(lambda x,y: x*y, Kr), reduce(lambda x,y: x*y, Kc)))
@@ -0,0 +1,114 @@
+"""The WaveBlocks Project
+
+This file contains the class for representing basis shapes
+given by an arbitrary set of multi-indices.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import array, eye, vstack, lexsort, hstack, int32, integer
+
+from BasisShape import BasisShape
+
+__all__ = ["SupportShape"]
+
+
+class SupportShape(BasisShape):
+    r"""This class implements basis shapes consisting of an arbitrary
+    set :math:`\mathfrak{K} \subset \mathbb{N}_0^D` of multi-indices :math:`k`.
+    Such shapes arise for example as results of set operations on other
+    basis shapes or from the support of the coefficients of a wavepacket.
+
+    Only basis functions :math:`\phi_k` which can be reached by the recursion
+    from :math:`\phi_0` are ever evaluated. Hence the set should contain all
+    backward neighbours :math:`k - e_d` of each :math:`k \in \mathfrak{K}`.
+    """
+
+    def __init__(self, D, indices):
+        r"""
+        :param D: The dimension :math:`D`
+        :param indices: The multi-indices :math:`k \in \mathfrak{K}`. Their
+                        order and duplicates do not matter.
+        :type indices: A list of tuples or an integer ndarray of shape :math:`(|\mathfrak{K}|, D)`.
+        """
+        # The dimension of K
+        self._dimension = D
+
+        indices = array(indices, dtype=int32).reshape(-1, D)
+        if (indices < 0).any():
+            raise ValueError("Multi-indices must be non-negative.")
+
+        # Sort lexicographically and drop duplicate rows
+        indices = indices[lexsort(indices.T[::-1,:]),:]
+        keep = hstack([True, (indices[1:,:] != indices[:-1,:]).any(axis=1)])[:indices.shape[0]]
+
+        # The table of all multi-indices k in linear order
+        self._set_index_table(indices[keep,:])
+
+        self._extension = None
+
+
+    def __str__(self):
+        r""":return: A string describing the basis shape :math:`\mathfrak{K}`.
+        """
+        s = ("Support basis shape of dimension "+str(self._dimension)+
+             " containing "+str(self._basissize)+" multi-indices.")
+        return s
+
+
+    def __hash__(self):
+        r"""Compute a unique hash for the basis shape. In the case of support
+        basis shapes :math:`\mathfrak{K}` the basis is fully specified by its
+        dimension :math:`D` and the set of all multi-indices.
+        """
+        return hash(("SupportShape", self._dimension, self._indices.tostring()))
+
+
+    def get_description(self):
+        r"""Return a description of this basis shape object.
+        A description is a ``dict`` containing all key-value pairs
+        necessary to reconstruct the current basis shape. As the
+        shape is defined by its elements, these are included.
+        """
+        d = {}
+        d["type"] = "SupportShape"
+        d["dimension"] = self._dimension
+        d["indices"] = self._indices.tolist()
+        return d
+
+
+    def extend(self):
+        r"""Extend the basis shape such that (at least) all neighbours of all
+        boundary nodes are included in the extended basis shape.
+        """
+        # Extended shapes are built only once per instance
+        if self._extension is None:
+            I = eye(self._dimension, dtype=integer)
+            indices = vstack([self._indices] + [ self._indices + I[d,:] for d in xrange(self._dimension) ])
+            self._extension = SupportShape(self._dimension, indices)
+        return self._extension
+
+
+    def get_node_iterator(self, mode="lex", direction=None):
+        r"""
+        Returns an iterator to iterate over all basis elements :math:`k \in \mathfrak{K}`.
+
+        :param mode: The mode by which we iterate over the indices. Only ``lex``
+                     for lexicographical order is supported.
+        :type mode: string
+        :param direction: Unused.
+        """
+        if mode == "lex":
+            return iter(self)
+        else:
+            raise ValueError("Unknown iterator mode: "+str(mode)+".")
+
+
+    def get_limits(self):
+        r"""Returns the upper limit :math:`K_d` for all directions :math:`d`.
+
+        :return: A tuple of the maximum of the multi-index in each direction.
+        """
+        return tuple((self._indices.max(axis=0) + 1).tolist())
@@ -9,7 +9,7 @@ constructed explicitly for the inhomogeneous case.
 @license: Modified BSD License
 """
 
-from numpy import array, squeeze, conjugate, sqrt, ones, zeros, complexfloating, arange, isnan
+from numpy import array, squeeze, conjugate, sqrt, ones, zeros, complexfloating, arange, isnan, where, dot
 from scipy import exp
 from scipy.misc import factorial
 from scipy.special import binom
@@ -225,6 +225,54 @@ class SymbolicIntegral(Quadrature):
         return squeeze(Ikl)
 
 
+    def exact_result_matrix(self, Pibra, Piket, eps, Kbra, Kket):
+        r"""Compute the overlap integrals :math:`\langle \phi_k | \phi_l \rangle` for all
+        :math:`k \in \mathfrak{K}` and :math:`l \in \mathfrak{K}^\prime` at once. This evaluates
+        the same formula as :py:meth:`exact_result_higher` but the sum over :math:`j` is
+        done by a single matrix-matrix product of the cached factors.
+
+        Note that this is an internal method and usually there is no
+        reason to call it from outside.
+
+        :param Pibra: The parameter set :math:`\Pi = \{q_1,p_1,Q_1,P_1\}` of the bra :math:`\langle \phi_k |`.
+        :param Piket: The parameter set :math:`\Pi^\prime = \{q_2,p_2,Q_2,P_2\}` of the ket :math:`| \phi_l \rangle`.
+        :param eps: The semi-classical scaling parameter :math:`\varepsilon`.
+        :param Kbra: The basis shape :math:`\mathfrak{K}` of the bra.
+        :param Kket: The basis shape :math:`\mathfrak{K}^\prime` of the ket.
+        :return: A matrix of shape :math:`|\mathfrak{K}| \times |\mathfrak{K}^\prime|` ordered like the basis shapes.
+        """
+        q1, p1, Q1, P1 = Pibra
+        q2, p2, Q2, P2 = Piket
+
+        ik = Kbra.get_index_table()[:,0]
+        il = Kket.get_index_table()[:,0]
+
+        # Identical parameter sets, the phi are orthonormal
+        if q1 == q2 and p1 == p2 and Q1 == Q2 and P1 == P2:
+            return (ik.reshape(-1,1) == il.reshape(1,-1)).astype(complexfloating)
+
+        K = self._bk.shape[0]
+        L = self._bl.shape[0]
+        k = arange(K).reshape(-1,1)
+        l = arange(L).reshape(-1,1)
+        j = arange(self._jf.shape[0]).reshape(1,-1)
+
+        # All factors of the summands depending on (k,j) respectively (l,j)
+        Hk = array([ squeeze(self._Hk[n]) for n in xrange(K) ])
+        Hl = array([ squeeze(self._Hl[n]) for n in xrange(L) ])
+        A = where(j <= k, self._bk * (self._pfk * Hk)[(k-j) % K], 0.0)
+        B = where(j <= l, self._bl * (self._pfl * Hl)[(l-j) % L], 0.0)
+
+        # The sum over j for all pairs (k,l)
+        S = dot(A * self._jf, B.T)
+
+        pf = (self._f * 2**(-(k+l.T)/2.0) * squeeze(self._I0) *
+              squeeze(1.0j*conjugate(P1)*Q2-1.0j*conjugate(Q1)*P2)**(-(k+l.T)/2.0))
+
+        M = pf * S
+        return M[ik,:][:,il]
+
+
     def _cache_factors(self, Pibra, Piket, Kbra, Kket, eps):
         r"""Cache some summands to speed up the computation of the sum.
 
@@ -313,14 +361,8 @@ class SymbolicIntegral(Quadrature):
 
         self._cache_factors(Pibra[:4], Piket[:4], Kbra, Kket, eps)
 
-        result = array([[0.0j]], dtype=complexfloating)
-
-        for r in Kbra:
-            for c in Kket:
-                cr = cbra[Kbra[r],0]
-                cc = cket[Kket[c],0]
-                i = self.exact_result_higher(Pibra[:4], Piket[:4], eps, r[0], c[0])
-                result = result + conjugate(cr) * cc * i
+        M = self.exact_result_matrix(Pibra[:4], Piket[:4], eps, Kbra, Kket)
+        result = dot(conjugate(cbra).T, dot(M, cket))
 
         phase = exp(1.0j/eps**2 * (Piket[4]-conjugate(Pibra[4])))
         return phase * result
@@ -343,11 +385,7 @@ class SymbolicIntegral(Quadrature):
 
         self._cache_factors(Pibra[:4], Piket[:4], Kbra, Kket, eps)
 
-        M = zeros((Kbra.get_basis_size(),Kket.get_basis_size()), dtype=complexfloating)
-
-        for r in Kbra:
-            for c in Kket:
-                M[Kbra[r], Kket[c]] = self.exact_result_higher(Pibra[:4], Piket[:4], eps, r[0], c[0])
+        M = self.exact_result_matrix(Pibra[:4], Piket[:4], eps, Kbra, Kket)
 
         phase = exp(1.0j/eps**2 * (Piket[4]-conjugate(Pibra[4])))
         return phase * M
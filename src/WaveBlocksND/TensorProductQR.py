@@ -89,6 +89,14 @@ class TensorProductQR(QuadratureRule):
         return d
 
 
+    def get_qrs(self):
+        r"""Return the one-dimensional quadrature rules the tensor product is built from.
+
+        :return: A tuple of :py:class:`QuadratureRule` subclass instances.
+        """
+        return self._qrs
+
+
     def get_nodes(self, flat=True, split=False):
         r"""Return the quadrature nodes :math:`\{\gamma_i\}_i`.
 
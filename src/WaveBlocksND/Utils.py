@@ -7,7 +7,8 @@ Various small utility functions.
 @license: Modified BSD License
 """
 
-from numpy import squeeze, asarray, atleast_1d
+from numpy import (squeeze, asarray, atleast_1d, zeros, ones, arange, where,
+                   unique, searchsorted, integer)
 
 
 def meshgrid_nd(arrays):
@@ -47,3 +48,62 @@ def meshgrid_nd(arrays):
         result.append(A)
 
     return tuple(result)
+
+
+def multi_index_lookup_table(indices):
+    r"""Build a table for the vectorized look up of multi-indices. The multi-indices
+    are ranked dimension by dimension such that all intermediate keys stay bounded
+    by :math:`|\mathfrak{K}| \max_d K_d` and can never overflow.
+
+    :param indices: The multi-indices :math:`k` in linear order.
+    :type indices: An integer ndarray of shape :math:`(|\mathfrak{K}|, D)`.
+    :return: A tuple ``(radices, levels, order)`` to be used by :py:func:`multi_index_lookup`.
+    """
+    bs, D = indices.shape
+
+    radices = []
+    levels = []
+
+    ranks = zeros((bs,), dtype=integer)
+    for d in xrange(D):
+        radix = int(indices[:,d].max()) + 1 if bs > 0 else 1
+        keys = ranks * radix + indices[:,d]
+        level = unique(keys)
+        ranks = searchsorted(level, keys)
+        radices.append(radix)
+        levels.append(level)
+
+    # Map the final ranks to the linear order
+    order = zeros((bs,), dtype=integer)
+    order[ranks] = arange(bs)
+
+    return radices, levels, order
+
+
+def multi_index_lookup(table, indices):
+    r"""Look up the linear indices :math:`\mu(k)` of many multi-indices at once.
+
+    :param table: The look up table built by :py:func:`multi_index_lookup_table`.
+    :param indices: The multi-indices :math:`k` to look up.
+    :type indices: An integer ndarray of shape :math:`(M, D)`.
+    :return: An integer ndarray of shape :math:`(M,)` containing :math:`\mu(k)`
+             or ``-1`` if :math:`k` is not part of the table.
+    """
+    radices, levels, order = table
+    M = indices.shape[0]
+
+    # Nothing is part of an empty table
+    if order.shape[0] == 0:
+        return -ones((M,), dtype=integer)
+
+    valid = ones((M,), dtype=bool)
+    ranks = zeros((M,), dtype=integer)
+
+    for d, (radix, level) in enumerate(zip(radices, levels)):
+        valid &= (indices[:,d] >= 0) & (indices[:,d] < radix)
+        keys = ranks * radix + indices[:,d]
+        ranks = searchsorted(level, keys)
+        ranks[ranks >= level.shape[0]] = 0
+        valid &= (level[ranks] == keys)
+
+    return where(valid, order[ranks], -1)
@@ -10,6 +10,9 @@ __version__ = 0.2
 # Math
 from ComplexMath import ContinuousSqrt
 
+# Caching
+from LRUCache import LRUCache
+
 # Grids
 from Grid import Grid
 from DenseGrid import DenseGrid
@@ -43,6 +46,9 @@ from BasisShape import BasisShape
 from HyperCubicShape import HyperCubicShape
 from HyperbolicCutShape import HyperbolicCutShape
 from LimitedHyperbolicCutShape import LimitedHyperbolicCutShape
+from SupportShape import SupportShape
+from BasisShapeAdaptor import BasisShapeAdaptor
+from RecursionPlan import RecursionPlan
 
 # Wavepackets
 from Wavepacket import Wavepacket
@@ -79,9 +85,11 @@ from Quadrature import Quadrature
 from DirectQuadrature import DirectQuadrature
 from DirectHomogeneousQuadrature import DirectHomogeneousQuadrature
 from DirectInhomogeneousQuadrature import DirectInhomogeneousQuadrature
+from SumFactorizedQuadrature import SumFactorizedQuadrature
 
 from SymbolicIntegral import SymbolicIntegral
 from GaussianIntegral import GaussianIntegral
+from RecursiveIntegral import RecursiveIntegral
 from NSDInhomogeneous import NSDInhomogeneous
 
 from SparsityOracle import SparsityOracle
@@ -0,0 +1,158 @@
+"""The WaveBlocks Project
+
+Benchmark the inhomogeneous numerical steepest descent quadrature
+against the direct inhomogeneous quadrature. For both methods the
+smallest Gauss-Hermite rule reaching the requested relative accuracy
+is determined first. The exact overlap matrices are computed by the
+ladder operator recursions. The packets are moving apart, this is
+the oscillatory regime the steepest descent paths are made for.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+import argparse
+from timeit import default_timer
+from numpy import abs, diag, ones, zeros, cumsum, linspace, complexfloating
+
+from WaveBlocksND import BlockFactory
+from WaveBlocksND import TensorProductQR, GaussHermiteQR, GaussHermiteOriginalQR
+from WaveBlocksND import DirectInhomogeneousQuadrature, NSDInhomogeneous, InhomogeneousInnerProduct
+
+
+def create_packet(D, K, ncomponents, eps, q, p, a, b):
+    r"""Set up a wavepacket with :math:`Q = \operatorname{diag}(a)` and
+    :math:`P = \operatorname{diag}(a b + i / a)`.
+    """
+    description = {"type": "HagedornWavepacket",
+                   "dimension": D,
+                   "ncomponents": ncomponents,
+                   "eps": eps,
+                   "Pi": [q*ones((D,1)), p*ones((D,1)), diag(a).astype(complexfloating), diag(a*b + 1.0j/a), 0.0],
+                   "basis_shapes": ncomponents * [{"type": "HyperbolicCutShape", "dimension": D, "K": K}]}
+
+    packet = BlockFactory().create_wavepacket(description)
+    packet.set_coefficient(0, D*(0,), 1.0)
+    return packet
+
+
+def create_packets(D, K, ncomponents, eps, momentum):
+    r"""The bra packet rests in the origin while the ket packet is displaced
+    and moves with the given momentum. The steepest descent quadrature does
+    not yet handle parameter sets coupling the axes, hence :math:`Q` and
+    :math:`P` are kept diagonal.
+    """
+    pacbra = create_packet(D, K, ncomponents, eps, 0.0, 0.0, ones(D), zeros(D))
+    packet = create_packet(D, K, ncomponents, eps, 0.2, momentum, linspace(1.0, 1.3, D), linspace(0.1, -0.2, D))
+    return pacbra, packet
+
+
+def create_innerproduct(method, D, order):
+    # NSD needs the Gauss-Hermite rule including the exponential weight
+    if method == "NSDInhomogeneous":
+        QR = TensorProductQR(D * [GaussHermiteOriginalQR(order)])
+        return InhomogeneousInnerProduct(NSDInhomogeneous(QR))
+    else:
+        QR = TensorProductQR(D * [GaussHermiteQR(order)])
+        return InhomogeneousInnerProduct(DirectInhomogeneousQuadrature(QR))
+
+
+def reference_matrix(pacbra, packet):
+    r"""Compute the exact overlap matrix. The recursions ignore the operator,
+    hence the off-diagonal blocks are dropped by hand to match the identity
+    operator the quadratures use.
+    """
+    IP = BlockFactory().create_inner_product({"type": "InhomogeneousInnerProduct",
+                                              "delegate": {"type": "RecursiveIntegral"}})
+    M = IP.build_matrix(pacbra, packet)
+
+    rows = cumsum([0] + [ K.get_basis_size() for K in pacbra.get_basis_shapes() ])
+    cols = cumsum([0] + [ K.get_basis_size() for K in packet.get_basis_shapes() ])
+    for r in xrange(pacbra.get_number_components()):
+        for c in xrange(packet.get_number_components()):
+            if r != c:
+                M[rows[r]:rows[r+1], cols[c]:cols[c+1]] = 0.0
+    return M
+
+
+def relative_error(M, Mref):
+    return abs(M - Mref).max() / abs(Mref).max()
+
+
+def timeit(IP, pacbra, packet, repeat):
+    best = float("inf")
+    for r in xrange(repeat):
+        start = default_timer()
+        M = IP.build_matrix(pacbra, packet)
+        best = min(best, default_timer() - start)
+    return best, M
+
+
+def benchmark(dimensions, K, ncomponents, eps, momentum, tolerance, maxorder, repeat):
+    methods = ("DirectInhomogeneousQuadrature", "NSDInhomogeneous")
+
+    print(" D  |K|  method                          order   time [s]   rel error")
+    for D in dimensions:
+        pacbra, packet = create_packets(D, K, ncomponents, eps, momentum)
+        Mref = reference_matrix(pacbra, packet)
+        size = pacbra.get_basis_shapes(component=0).get_basis_size()
+
+        for method in methods:
+            # Find the smallest rule reaching the accuracy
+            reached = False
+            for order in xrange(2, maxorder+1):
+                IP = create_innerproduct(method, D, order)
+                if relative_error(IP.build_matrix(pacbra, packet), Mref) < tolerance:
+                    reached = True
+                    break
+
+            if not reached:
+                print("%2d %5d  %-30s   not reached up to order %d" % (D, size, method, maxorder))
+                continue
+
+            t, M = timeit(IP, pacbra, packet, repeat)
+            print("%2d %5d  %-30s %6d %10.4f %11.2e" % (D, size, method, order, t, relative_error(M, Mref)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-K", "--sparsity",
+                        type = int,
+                        help = "The sparsity parameter K of the hyperbolic cut shapes.",
+                        default = 8)
+
+    parser.add_argument("-N", "--ncomponents",
+                        type = int,
+                        help = "The number of components of the wavepackets.",
+                        default = 1)
+
+    parser.add_argument("-e", "--eps",
+                        type = float,
+                        help = "The semiclassical scaling parameter of the wavepackets.",
+                        default = 0.2)
+
+    parser.add_argument("-p", "--momentum",
+                        type = float,
+                        help = "The momentum of the ket packet along each axis.",
+                        default = 1.0)
+
+    parser.add_argument("-t", "--tolerance",
+                        type = float,
+                        help = "The relative accuracy both quadratures have to reach.",
+                        default = 1e-8)
+
+    parser.add_argument("-o", "--maxorder",
+                        type = int,
+                        help = "The largest order of the Gauss-Hermite rules tried.",
+                        default = 60)
+
+    parser.add_argument("-r", "--repeat",
+                        type = int,
+                        help = "The number of repetitions per measurement.",
+                        default = 3)
+
+    args = parser.parse_args()
+
+    benchmark(range(1, 4), args.sparsity, args.ncomponents, args.eps, args.momentum, args.tolerance, args.maxorder, args.repeat)
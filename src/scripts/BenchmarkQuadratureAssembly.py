@@ -0,0 +1,110 @@
+"""The WaveBlocks Project
+
+Benchmark the assembly of the quadrature matrices
+:math:`\langle \Phi_i | f | \Phi_j \rangle` by a single matrix-matrix
+product against the former three-operand ``einsum`` for :math:`D = 1, \ldots, 6`.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+import argparse
+from timeit import default_timer
+from numpy import conjugate, einsum, abs, eye, zeros, ones, complexfloating
+
+from WaveBlocksND import BlockFactory
+
+
+def create_packet(D, K, order, ncomponents):
+    r"""Set up a homogeneous wavepacket with a hyperbolic cut basis shape
+    and a tensor product Gauss-Hermite quadrature rule.
+    """
+    description = {"type": "HagedornWavepacket",
+                   "dimension": D,
+                   "ncomponents": ncomponents,
+                   "eps": 0.1,
+                   "Pi": [zeros((D,1)), zeros((D,1)), eye(D, dtype=complexfloating), 1.0j*eye(D, dtype=complexfloating), 0.0],
+                   "basis_shapes": ncomponents * [{"type": "HyperbolicCutShape", "dimension": D, "K": K}],
+                   "innerproduct": {"type": "HomogeneousInnerProduct",
+                                    "delegate": {"type": "DirectHomogeneousQuadrature",
+                                                 "qr": {"type": "TensorProductQR",
+                                                        "qr_rules": D * [{"type": "GaussHermiteQR", "order": order}]}}}}
+
+    return BlockFactory().create_wavepacket(description)
+
+
+def assemble_einsum(quadrature, N):
+    r"""The former assembly of all :math:`N^2` blocks by ``einsum``.
+    """
+    D = quadrature._packet.get_dimension()
+    eps = quadrature._packet.get_eps()
+    blocks = []
+    for row in xrange(N):
+        for col in xrange(N):
+            factor = (eps**D * quadrature._weights * quadrature._values[row*N + col]).reshape((-1,))
+            blocks.append(einsum("k,ik,jk", factor, conjugate(quadrature._bases[row]), quadrature._bases[col]))
+    return blocks
+
+
+def assemble_blas(quadrature, N):
+    r"""The new assembly of all :math:`N^2` blocks.
+    """
+    return [ quadrature.do_quadrature(row, col) for row in xrange(N) for col in xrange(N) ]
+
+
+def benchmark(dimensions, K, order, ncomponents, repeat):
+    N = ncomponents
+    operator = lambda nodes, dummy, entry=None: ones((1,nodes.shape[1])) if entry[0] == entry[1] else zeros((1,nodes.shape[1]))
+
+    print(" D  |K|   |Gamma|   einsum [s]   blas [s]   speedup   max error")
+    for D in dimensions:
+        packet = create_packet(D, K, order, N)
+        quadrature = packet.get_innerproduct().get_quadrature()
+        quadrature.initialize_packet(packet)
+        quadrature.initialize_operator(operator, matrix=True)
+        quadrature.prepare(range(N), range(N))
+
+        timings = []
+        for assemble in (assemble_einsum, assemble_blas):
+            best = float("inf")
+            for r in xrange(repeat):
+                # Force the assembly of fused blocks again
+                quadrature._blocks = None
+                start = default_timer()
+                blocks = assemble(quadrature, N)
+                best = min(best, default_timer() - start)
+            timings.append((best, blocks))
+
+        (told, Mold), (tnew, Mnew) = timings
+        error = max([ abs(mo - mn).max() for mo, mn in zip(Mold, Mnew) ])
+        print("%2d %5d %8d %12.4f %10.4f %9.2f %11.2e" % (D, packet.get_basis_shapes(component=0).get_basis_size(),
+                                                          quadrature._QR.get_number_nodes(), told, tnew, told/tnew, error))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-K", "--sparsity",
+                        type = int,
+                        help = "The sparsity parameter K of the hyperbolic cut shapes.",
+                        default = 16)
+
+    parser.add_argument("-o", "--order",
+                        type = int,
+                        help = "The order of the Gauss-Hermite rule in each dimension.",
+                        default = 6)
+
+    parser.add_argument("-N", "--ncomponents",
+                        type = int,
+                        help = "The number of components of the wavepacket.",
+                        default = 2)
+
+    parser.add_argument("-r", "--repeat",
+                        type = int,
+                        help = "The number of repetitions per measurement.",
+                        default = 3)
+
+    args = parser.parse_args()
+
+    benchmark(range(1, 7), args.sparsity, args.order, args.ncomponents, args.repeat)
@@ -8,7 +8,7 @@ This file contains the class which represents a homogeneous Hagedorn wavepacket.
 """
 
 import argparse
-from numpy import complexfloating, squeeze, real, ones, zeros_like, conj, sum, argsort
+from numpy import complexfloating, squeeze, real, ones, zeros_like, conj, argsort, einsum
 from scipy.optimize import fmin
 from scipy.linalg import sqrtm, inv, eigh
 
@@ -108,21 +108,11 @@ def compute_eigenstate(parameters):
     MT = zeros_like(MV, dtype=complexfloating)
     GR = GradientHAWP()
     BS = HAWP.get_basis_shapes(N)
+    bs = BS.get_basis_size()
 
-    vects = {}
-    for i in BS:
-        z = zeros_like(HAWP.get_coefficient_vector(), dtype=complexfloating)
-        HAWP.set_coefficient_vector(z)
-        HAWP.set_coefficient(N, i, 1.0)
-        Kn, cnew = GR.apply_gradient(HAWP, N)
-        vects[i] = cnew
-
-    for j in BS:
-        for k in BS:
-            cj = vects[j]
-            ck = vects[k]
-            entry = 0.5 * squeeze(sum(conj(cj) * ck))
-            MT[BS[j], BS[k]] = entry
+    # The gradients of all basis functions at once
+    Kn, G = GR.apply_gradient_to_basis(HAWP, N)
+    MT[:bs,:bs] = 0.5 * einsum("ijd,ikd->jk", conj(G), G)
 
     # Find eigenvalues and eigenvectors of the whole matrix
     M = MT + MV
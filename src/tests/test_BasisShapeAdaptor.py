@@ -0,0 +1,61 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+BasisShapeAdaptor class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import zeros, eye, complexfloating
+
+from WaveBlocksND import BlockFactory, BasisShapeAdaptor, IOManager
+
+
+class TestBasisShapeAdaptor:
+
+    def create_packet(self, D, K):
+        description = {"type": "HagedornWavepacket",
+                       "dimension": D,
+                       "ncomponents": 1,
+                       "eps": 0.5,
+                       "Pi": [zeros((D,1)), zeros((D,1)), eye(D, dtype=complexfloating), 1.0j*eye(D, dtype=complexfloating), 0.0],
+                       "basis_shapes": [{"type": "HyperCubicShape", "dimension": D, "limits": D*[K]}]}
+        return BlockFactory().create_wavepacket(description)
+
+
+    def test_roundtrip(self, tmpdir):
+        D = 2
+        packet = self.create_packet(D, 8)
+
+        # Only the ground state is occupied, the shape gets pruned
+        c = zeros((packet.get_basis_shapes(component=0).get_basis_size(), 1), dtype=complexfloating)
+        c[0,0] = 1.0
+        packet.set_coefficients([c])
+
+        iom = IOManager()
+        iom.create_file(str(tmpdir.join("adaptations.hdf5")))
+        parameters = {"dimension": D, "ncomponents": 1}
+        blockids = [ iom.create_block() for i in xrange(2) ]
+        for bid in blockids:
+            iom.add_wavepacket(parameters, blockid=bid)
+            iom.add_wavepacket_adaptations(blockid=bid)
+
+        events = BasisShapeAdaptor(tolerance=1e-12, margin=2).adapt(packet)
+        assert len(events) == 1
+
+        for component, oldshape, newshape in events:
+            iom.save_wavepacket_adaptation(component, oldshape, newshape, timestep=5, blockid=blockids[1])
+
+        assert iom.load_wavepacket_adaptations(blockid=blockids[0]).shape == (0, 6)
+
+        log = iom.load_wavepacket_adaptations(blockid=blockids[1])
+        component, oldshape, newshape = events[0]
+        assert log.shape == (1, 6)
+        assert tuple(log[0,:]) == (5, 0, hash(oldshape), hash(newshape), 64, newshape.get_basis_size())
+        assert newshape.get_basis_size() < 64
+
+        descr = iom.load_wavepacket_basisshapes(the_hash=log[0,3], blockid=blockids[1])
+        assert hash(BlockFactory().create_basis_shape(descr)) == hash(newshape)
+        iom.finalize()
@@ -0,0 +1,50 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+fused lambdify function.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+import sympy
+from numpy import abs, array, linspace, complexfloating
+
+from WaveBlocksND.FusedLambdify import lambdify_fused
+
+
+class TestFusedLambdify:
+
+    def test_entries(self):
+        x, y = sympy.symbols("x y")
+        e = sympy.exp(-x**2 - y**2)
+        V = sympy.Matrix([[sympy.tanh(x*y) + x**2, e], [e, -sympy.tanh(x*y) + sympy.sqrt(1 + y**2)]])
+
+        X = linspace(-2.0, 2.0, 11)
+        Y = linspace(-1.0, 3.0, 11)
+
+        values = lambdify_fused([x, y], V)(X, Y)
+        reference = array([ sympy.lambdify([x, y], entry, "numpy")(X, Y) for entry in V ])
+
+        assert values.shape == (4, 11)
+        assert values.dtype == reference.dtype
+        assert abs(values - reference).max() < 1e-14
+
+
+    def test_complex(self):
+        x = sympy.symbols("x")
+        values = lambdify_fused([x], [x**2, sympy.I*x])(linspace(0.0, 1.0, 5))
+
+        assert values.dtype == complexfloating
+        assert abs(values[1,:] - 1.0j*linspace(0.0, 1.0, 5)).max() == 0.0
+
+
+    def test_constants(self):
+        x = sympy.symbols("x")
+        values = lambdify_fused([x], [sympy.Integer(2), sympy.Rational(1,2), x])(linspace(0.0, 1.0, 5))
+
+        assert values.shape == (3, 5)
+        assert abs(values[0,:] - 2.0).max() == 0.0
+        assert abs(values[1,:] - 0.5).max() == 0.0
+        assert abs(values[2,:] - linspace(0.0, 1.0, 5)).max() == 0.0
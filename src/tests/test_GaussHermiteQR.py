@@ -0,0 +1,67 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+GaussHermiteQR class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from timeit import default_timer
+from numpy import abs, exp, sqrt, pi, real
+
+from WaveBlocksND import GaussHermiteQR
+
+
+class TestGaussHermiteQR:
+
+    def build_rules(self, order):
+        QRe = GaussHermiteQR(order)
+        QRn = GaussHermiteQR(order, options={"method": "newton"})
+        return QRe, QRn
+
+
+    def test_number_nodes(self):
+        for order in [1, 7, 20, 33, 128]:
+            QRe, QRn = self.build_rules(order)
+            assert QRn.get_number_nodes() == order
+            assert QRn.get_nodes().shape == (1, order)
+            assert QRn.get_weights().shape == (1, order)
+
+
+    def test_nodes(self):
+        for order in [20, 21, 50, 101, 200]:
+            QRe, QRn = self.build_rules(order)
+            assert abs(real(QRe.get_nodes()) - QRn.get_nodes()).max() < 1e-12
+
+
+    def test_weights(self):
+        for order in [20, 21, 50, 101, 200]:
+            QRe, QRn = self.build_rules(order)
+            we = QRe.get_weights()
+            wn = QRn.get_weights()
+            assert (abs(we - wn) / we).max() < 1e-11
+
+
+    def test_exactness(self):
+        # The weights include the factor exp(x**2)
+        QRe, QRn = self.build_rules(300)
+        x = QRn.get_nodes()
+        w = QRn.get_weights()
+        assert abs((w * exp(-x**2)).sum() - sqrt(pi)) < 1e-12
+        assert abs((w * x**2 * exp(-x**2)).sum() - 0.5*sqrt(pi)) < 1e-12
+
+
+    def test_linear_cost(self):
+        # Doubling the order must not quadruple the time
+        times = []
+        for order in [4000, 8000]:
+            QR = GaussHermiteQR(order, options={"method": "newton"})
+            best = float("inf")
+            for r in xrange(3):
+                start = default_timer()
+                QR._compute_rule_newton()
+                best = min(best, default_timer() - start)
+            times.append(best)
+        assert times[1] < 3.0 * times[0]
@@ -0,0 +1,70 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+GaussianIntegral class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import abs, eye, array, dot, complexfloating
+from scipy.linalg import inv
+
+from WaveBlocksND import BlockFactory, GaussianIntegral, DirectInhomogeneousQuadrature, TensorProductQR, GaussHermiteQR
+
+
+class TestGaussianIntegral:
+
+    def create_packet(self, q, p, A, B, S):
+        D = A.shape[0]
+        Q = array(A, dtype=complexfloating)
+        P = dot(B + 1.0j*inv(dot(A, A.T)), A)
+        description = {"type": "HagedornWavepacket",
+                       "dimension": D,
+                       "ncomponents": 1,
+                       "eps": 0.5,
+                       "Pi": [q, p, Q, P, S],
+                       "basis_shapes": [{"type": "HyperbolicCutShape", "dimension": D, "K": 4}]}
+        packet = BlockFactory().create_wavepacket(description)
+        packet.set_coefficient(0, (0,0), 0.8 + 0.1j)
+        return packet
+
+
+    def test_stacked(self):
+        A = array([[1.0, 0.2], [-0.1, 0.9]])
+        B = array([[0.1, 0.05], [0.05, -0.2]])
+        pacbras = [ self.create_packet(array([[0.1*j], [-0.2*j]]), array([[0.3], [0.1*j]]),
+                                       A + 0.1*j*eye(2), j*B, 0.1*j) for j in xrange(4) ]
+        packets = [ self.create_packet(array([[0.1*j], [-0.2*j+0.5]]), array([[0.3], [0.1*j]]),
+                                       A + 0.1*j*eye(2), (j+0.5)*B, 0.1*j) for j in xrange(3) ]
+
+        GI = GaussianIntegral()
+        M = GI.perform_quadrature_stacked(pacbras, packets, 0, 0)
+        assert M.shape == (4, 3)
+
+        for row, pacbra in enumerate(pacbras):
+            for col, packet in enumerate(packets):
+                GI.initialize_packet(pacbra, packet)
+                GI.initialize_operator()
+                assert abs(M[row,col] - GI.perform_quadrature(0, 0)) < 1e-14
+
+
+    def test_direct_quadrature(self):
+        A = array([[1.0, 0.2], [-0.1, 0.9]])
+        B = array([[0.1, 0.05], [0.05, -0.2]])
+        pacbra = self.create_packet(array([[0.1], [-0.2]]), array([[0.3], [0.0]]), A, B, 0.1)
+
+        GI = GaussianIntegral()
+        DQ = DirectInhomogeneousQuadrature(TensorProductQR(2 * [GaussHermiteQR(40)]))
+
+        for dq, dp in [(0.0, 0.0), (0.4, 0.0), (0.0, 0.6), (-0.3, 0.5)]:
+            packet = self.create_packet(array([[0.1+dq], [-0.2-dq]]), array([[0.3+dp], [-dp]]),
+                                        A + 0.1*eye(2), -B, 0.3)
+            results = []
+            for QE in [GI, DQ]:
+                QE.initialize_packet(pacbra, packet)
+                QE.initialize_operator()
+                QE.prepare([0], [0])
+                results.append(QE.perform_quadrature(0, 0))
+            assert abs(results[0] - results[1]) < 1e-12
@@ -0,0 +1,65 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+RecursiveIntegral class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import abs, eye, zeros, array, dot, complexfloating
+from scipy.linalg import inv
+
+from WaveBlocksND import BlockFactory, RecursiveIntegral, SymbolicIntegral
+
+
+class TestRecursiveIntegral:
+
+    def create_packet(self, D, K, q, p, A, B, S=0.0):
+        Q = array(A, dtype=complexfloating)
+        P = dot(B + 1.0j*inv(dot(A, A.T)), A)
+        description = {"type": "HagedornWavepacket",
+                       "dimension": D,
+                       "ncomponents": 1,
+                       "eps": 0.5,
+                       "Pi": [q, p, Q, P, S],
+                       "basis_shapes": [{"type": "HyperbolicCutShape", "dimension": D, "K": K}]}
+        return BlockFactory().create_wavepacket(description)
+
+
+    def build_matrix(self, QE, pacbra, packet):
+        QE.initialize_packet(pacbra, packet)
+        QE.initialize_operator(matrix=True)
+        QE.prepare([0], [0])
+        return QE.perform_build_matrix(0, 0)
+
+
+    def test_orthonormality(self):
+        for D in [1, 2, 3]:
+            packet = self.create_packet(D, 8, 0.2*eye(D)[:,:1], -0.4*eye(D)[:,:1],
+                                        eye(D) + 0.3*eye(D,k=1), 0.2*(eye(D,k=1) + eye(D,k=-1)))
+            M = self.build_matrix(RecursiveIntegral(), packet, packet)
+            assert abs(M - eye(M.shape[0])).max() < 1e-12
+
+
+    def test_symbolic_1d(self):
+        pacbra = self.create_packet(1, 6, 0.3, -0.2, array([[0.8]]), array([[-0.3]]))
+        packet = self.create_packet(1, 8, -0.1, 0.4, array([[1.2]]), array([[0.0]]), 0.1)
+        Mr = self.build_matrix(RecursiveIntegral(), pacbra, packet)
+        Ms = self.build_matrix(SymbolicIntegral(), pacbra, packet)
+        assert abs(Mr - Ms).max() < 1e-10
+
+
+    def test_quadrature_2d(self):
+        D = 2
+        pacbra = self.create_packet(D, 6, array([[0.2],[-0.1]]), array([[0.3],[0.0]]),
+                                    array([[1.0, 0.2],[0.0, 1.1]]), array([[0.1, 0.05],[0.05, -0.2]]))
+        packet = self.create_packet(D, 5, zeros((D,1)), zeros((D,1)), eye(D), zeros((D,D)))
+        Mr = self.build_matrix(RecursiveIntegral(), pacbra, packet)
+
+        QE = BlockFactory().create_quadrature({"type": "DirectInhomogeneousQuadrature",
+                                               "qr": {"type": "TensorProductQR",
+                                                      "qr_rules": D * [{"type": "GaussHermiteQR", "order": 40}]}})
+        Mq = self.build_matrix(QE, pacbra, packet)
+        assert abs(Mr - Mq).max() < 1e-8
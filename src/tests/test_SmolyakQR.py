@@ -0,0 +1,35 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+SmolyakQR class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import abs
+
+from WaveBlocksND import SmolyakQR, GaussHermiteQR
+
+
+class TestSmolyakQR:
+
+    def create_rule(self, directory):
+        rules = dict([ (i, GaussHermiteQR(i)) for i in xrange(1, 5) ])
+        return SmolyakQR(3, 4, rules, options={"cache_directory": directory})
+
+
+    def test_construction_time(self, tmpdir):
+        directory = str(tmpdir)
+
+        QR = self.create_rule(directory)
+        assert QR.get_construction_time() is None
+        nodes = QR.get_nodes()
+        assert QR.get_construction_time() > 0.0
+        assert len(tmpdir.listdir()) == 2
+
+        # The second rule is loaded from the cache
+        QR = self.create_rule(directory)
+        assert abs(QR.get_nodes() - nodes).max() == 0.0
+        assert QR.get_construction_time() > 0.0
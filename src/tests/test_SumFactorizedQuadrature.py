@@ -0,0 +1,79 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+SumFactorizedQuadrature class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import abs, eye, diag, dot, array, linspace, complexfloating
+from numpy.random import RandomState
+from scipy.linalg import inv
+
+from WaveBlocksND import BlockFactory, HomogeneousInnerProduct
+
+
+class TestSumFactorizedQuadrature:
+
+    def create_packet(self, D, A, B):
+        Q = array(A, dtype=complexfloating)
+        P = dot(B + 1.0j*inv(dot(A, A.T)), A)
+        description = {"type": "HagedornWavepacket",
+                       "dimension": D,
+                       "ncomponents": 2,
+                       "eps": 0.3,
+                       "Pi": [linspace(-0.2, 0.3, D).reshape(-1,1), linspace(0.5, -0.1, D).reshape(-1,1), Q, P, 0.0],
+                       "basis_shapes": [{"type": "HyperCubicShape", "dimension": D, "limits": [4, 3, 5][:D]},
+                                        {"type": "HyperCubicShape", "dimension": D, "limits": [2, 5, 3][:D]}]}
+        packet = BlockFactory().create_wavepacket(description)
+        random = RandomState(D)
+        packet.set_coefficients([ random.randn(K.get_basis_size(),1) for K in packet.get_basis_shapes() ])
+        return packet
+
+
+    def create_innerproducts(self, D):
+        qr = {"type": "TensorProductQR", "qr_rules": D * [{"type": "GaussHermiteQR", "order": 10}]}
+        factory = BlockFactory()
+        SF = factory.create_quadrature({"type": "SumFactorizedQuadrature", "qr": qr})
+        DH = factory.create_quadrature({"type": "DirectHomogeneousQuadrature", "qr": qr})
+        return SF, HomogeneousInnerProduct(SF), HomogeneousInnerProduct(DH)
+
+
+    def separable(self, nodes, position=None, entry=None):
+        # A quadratic potential with a linear coupling of the components
+        r, c = entry
+        V = sum([ (d + 1.0) * nodes[d,:]**2 for d in xrange(nodes.shape[0]) ])
+        return (V if r == c else 0.2 * nodes[0,:]).reshape(1,-1)
+
+
+    def nonseparable(self, nodes, position=None, entry=None):
+        r, c = entry
+        V = nodes[0,:] * nodes[-1,:] * (1.0 + nodes[0,:]) + 0.5 * nodes[-1,:]**2
+        return ((r + c + 1.0) * V).reshape(1,-1)
+
+
+    def test_direct(self):
+        for D in [1, 2, 3]:
+            packet = self.create_packet(D, diag(linspace(1.0, 1.5, D)), diag(linspace(0.2, -0.3, D)))
+            for operator in [None, self.separable, self.nonseparable]:
+                SF, IPsf, IPdh = self.create_innerproducts(D)
+                Msf = IPsf.build_matrix(packet, operator=operator)
+                assert SF._factorized
+                Mdh = IPdh.build_matrix(packet, operator=operator)
+                assert abs(Msf - Mdh).max() < 1e-12 * abs(Mdh).max()
+
+                Isf = IPsf.quadrature(packet, operator=operator, summed=True)
+                Idh = IPdh.quadrature(packet, operator=operator, summed=True)
+                assert abs(Isf - Idh) < 1e-12 * abs(Idh)
+
+
+    def test_fallback(self):
+        D = 2
+        packet = self.create_packet(D, eye(D) + 0.3*eye(D, k=1), diag(linspace(0.2, -0.3, D)))
+        SF, IPsf, IPdh = self.create_innerproducts(D)
+        Msf = IPsf.build_matrix(packet, operator=self.separable)
+        assert not SF._factorized
+        Mdh = IPdh.build_matrix(packet, operator=self.separable)
+        assert abs(Msf - Mdh).max() == 0.0
@@ -0,0 +1,77 @@
+"""The WaveBlocks Project
+
+This file contains unit tests for the
+SymbolicIntegral class.
+
+@author: R. Bourquin
+@copyright: Copyright (C) 2013 R. Bourquin
+@license: Modified BSD License
+"""
+
+from numpy import abs, zeros, conjugate, dot, exp, squeeze, complexfloating
+from numpy.random import RandomState
+
+from WaveBlocksND import BlockFactory, SymbolicIntegral
+
+
+class TestSymbolicIntegral:
+
+    def create_packet(self, K, Pi):
+        description = {"type": "HagedornWavepacket",
+                       "dimension": 1,
+                       "ncomponents": 1,
+                       "eps": 0.5,
+                       "Pi": Pi,
+                       "basis_shapes": [{"type": "HyperCubicShape", "dimension": 1, "limits": [K]}]}
+        packet = BlockFactory().create_wavepacket(description)
+        random = RandomState(K)
+        packet.set_coefficients([random.randn(K,1) + 1.0j*random.randn(K,1)])
+        return packet
+
+
+    def create_packets(self, K, L):
+        pacbra = self.create_packet(K, [0.3, -0.2, 1.0+0.5j, -0.1+0.95j, 0.0])
+        packet = self.create_packet(L, [-0.1, 0.4, 1.2, 1.0j/1.2, 0.1])
+        return pacbra, packet
+
+
+    def reference_matrix(self, SI, pacbra, packet):
+        # Valid only after the factors of this pair of packets got cached
+        eps = packet.get_eps()
+        Pibra = pacbra.get_parameters(component=0)
+        Piket = packet.get_parameters(component=0)
+        ik = pacbra.get_basis_shapes(component=0).get_index_table()[:,0]
+        il = packet.get_basis_shapes(component=0).get_index_table()[:,0]
+
+        M = zeros((ik.size, il.size), dtype=complexfloating)
+        for r, k in enumerate(ik):
+            for c, l in enumerate(il):
+                M[r,c] = SI.exact_result_higher(Pibra[:4], Piket[:4], eps, k, l)
+
+        phase = exp(1.0j/eps**2 * (Piket[4]-conjugate(Pibra[4])))
+        return squeeze(phase) * M
+
+
+    def test_build_matrix(self):
+        for K, L in [(6, 9), (9, 6), (1, 7)]:
+            pacbra, packet = self.create_packets(K, L)
+            SI = SymbolicIntegral()
+            SI.initialize_packet(pacbra, packet)
+            SI.initialize_operator(matrix=True)
+            M = SI.perform_build_matrix(0, 0)
+            Mref = self.reference_matrix(SI, pacbra, packet)
+            assert M.shape == (K, L)
+            assert abs(M - Mref).max() < 1e-12
+
+
+    def test_quadrature(self):
+        for K, L in [(6, 9), (9, 6), (1, 7)]:
+            pacbra, packet = self.create_packets(K, L)
+            SI = SymbolicIntegral()
+            SI.initialize_packet(pacbra, packet)
+            SI.initialize_operator()
+            I = SI.perform_quadrature(0, 0)
+            Mref = self.reference_matrix(SI, pacbra, packet)
+            cbra = pacbra.get_coefficient_vector(component=0)
+            cket = packet.get_coefficient_vector(component=0)
+            assert abs(I - dot(conjugate(cbra).T, dot(Mref, cket))).max() < 1e-12